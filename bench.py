@@ -0,0 +1,420 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from io import BytesIO
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+import db
+import fc
+import export
+from date_index import DateIndex
+from excel_reader import read_excel_streaming
+from fraud_engine import score_customers, velocity_windows
+from identity import resolve_identities
+from numeric import parse_numeric
+from perf import current_rss, sample_peak_rss
+from cache import LRUCache
+from pdf_report import build_pdf, rasterize_all
+from reconcile import reconcile
+from synthetic import RAW_PAYMENT_VALUES, make_db_merge_sources, make_fraud_frame, to_csv_upload
+
+# =========================================================
+# DB Merge ve Fraud Benchmark'ları (arayüzsüz)
+# Kullanım:
+#   python bench.py --rows 10000 100000 1000000
+#   python bench.py --only db fraud --rows 10000 5000000 --json sonuc.json
+#   python bench.py --only db --rows 100000 --json yeni.json --compare eski.json
+# =========================================================
+
+
+def make_payment_series(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    values = np.array(RAW_PAYMENT_VALUES, dtype=object)
+    return pd.Series(values[rng.integers(0, len(values), size=rows)], name="payment_method")
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def bench_payment(rows_list):
+    print("== standardize_payment_method (apply) vs PaymentMatcher.standardize ==")
+    for rows in rows_list:
+        series = make_payment_series(rows)
+
+        old, old_s = _timed(lambda: series.apply(lambda x: db.standardize_payment_method(x, db.PAYMENT_MAPPING)))
+        new, new_s = _timed(lambda: db.PAYMENT_MATCHER.standardize(series))
+
+        identical = old.astype(object).equals(new.astype(object))
+        print(f"{rows:>10,} satır | apply: {old_s:8.3f} sn | matcher: {new_s:8.3f} sn | "
+              f"hız: {old_s / new_s:7.1f}x | aynı sonuç: {identical}")
+
+
+# =========================================================
+# Sayı Ayrıştırma: eski _clean_numeric_column vs numeric.parse_numeric
+# =========================================================
+
+def legacy_clean_numeric_column(series):
+    """db.py'deki eski uygulama (karşılaştırma için birebir kopya)."""
+    s = series.astype(str)
+    s = s.str.replace(r"[^0-9,.\-]", "", regex=True)
+    tr_format = s.str.contains(r"\.\d{3},\d{2}$")
+    s = s.where(~tr_format, s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    only_comma = s.str.contains(",") & ~s.str.contains(r"\.")
+    s = s.where(~only_comma, s.str.replace(",", ".", regex=False))
+    both = s.str.contains(",") & s.str.contains(r"\.") & ~tr_format
+    s = s.where(~both, s.str.replace(",", "", regex=False))
+    return pd.to_numeric(s, errors="coerce").fillna(0)
+
+
+def _format_tr(value):
+    text = f"{value:,.2f}"
+    return text.replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+def make_numeric_column(rows, locale="tr", seed=7, distinct=5_000):
+    """
+    Karışık biçimli tutar sütunu ve beklenen değerleri üretir: sayı hücreleri,
+    'TL' ekli metinler, binlik ayırıcılı metinler, kuruşsuz tutarlar ("12.345")
+    ve boş hücreler. Gerçek ihracatlardaki gibi tutarlar sınırlı bir havuzdan gelir.
+    """
+    rng = np.random.default_rng(seed)
+    pool = np.round(rng.uniform(0, 50_000, size=distinct), 2)
+    truth = pool[rng.integers(0, distinct, size=rows)]
+    kind = rng.integers(0, 5, size=rows)
+    values = np.empty(rows, dtype=object)
+    for i in range(rows):
+        text = _format_tr(truth[i]) if locale == "tr" else f"{truth[i]:,.2f}"
+        if kind[i] == 0:
+            values[i] = float(truth[i])
+        elif kind[i] == 1:
+            values[i] = text + " TL"
+        elif kind[i] == 2:
+            values[i] = text
+        elif kind[i] == 3:
+            truth[i] = np.round(truth[i])
+            whole = f"{truth[i]:,.0f}"
+            values[i] = whole.replace(",", ".") if locale == "tr" else whole
+        else:
+            values[i] = None
+            truth[i] = np.nan
+    return pd.Series(values, name="total_price"), truth
+
+
+def _accuracy(result, truth):
+    result = np.asarray(result, dtype=float)
+    expected_blank = np.isnan(truth)
+    ok = np.where(expected_blank, np.isnan(result) | (result == 0), np.isclose(result, truth))
+    return ok.mean() * 100
+
+
+def bench_numeric(rows_list):
+    print("== _clean_numeric_column (eski) vs parse_numeric ==")
+    for locale in ["tr", "en"]:
+        for rows in rows_list:
+            # Benzersiz değerler metin üretimini pahalı yapar; büyük boyutlarda örnek tekrarlanır
+            base_rows = min(rows, 200_000)
+            series, truth = make_numeric_column(base_rows, locale)
+            repeat = int(np.ceil(rows / base_rows))
+            series = pd.Series(np.tile(series.to_numpy(), repeat)[:rows], name=series.name)
+            truth = np.tile(truth, repeat)[:rows]
+
+            old, old_s = _timed(lambda: legacy_clean_numeric_column(series))
+            (new, report), new_s = _timed(lambda: parse_numeric(series, return_report=True))
+
+            print(f"[{locale}] {rows:>10,} satır | eski: {old_s:7.3f} sn, doğruluk %{_accuracy(old, truth):6.2f} | "
+                  f"yeni: {new_s:7.3f} sn, doğruluk %{_accuracy(new, truth):6.2f} | "
+                  f"locale: {report['locale']}, çözülemeyen: {report['unparseable']}")
+
+
+# =========================================================
+# Aşama Ölçümü: süre + tepe bellek, JSON kaydı
+# =========================================================
+
+class StageRecorder:
+    """
+    Her aşamanın duvar saati süresini ve tepe belleğini (aşama başındaki kullanımın
+    üstü, MB) kaydeder. Varsayılan ölçüm RSS örneklemesidir ve süreyi etkilemez.
+    trace_memory=True ise Python ayırmaları tracemalloc ile de ölçülür; tracemalloc
+    openpyxl gibi Python ağırlıklı aşamaları birkaç kat yavaşlatır.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.records = []
+
+    @contextmanager
+    def stage(self, suite, rows, name):
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            traced_baseline = tracemalloc.get_traced_memory()[0]
+        rss_baseline = current_rss()
+        with sample_peak_rss() as rss:
+            start = time.perf_counter()
+            yield
+            seconds = time.perf_counter() - start
+
+        record = {"suite": suite, "rows": rows, "stage": name, "seconds": seconds, "peak_rss_mb": None,
+                  "peak_traced_mb": None}
+        if rss_baseline is not None:
+            record["peak_rss_mb"] = (rss["peak"] - rss_baseline) / 1024 ** 2
+        if self.trace_memory:
+            record["peak_traced_mb"] = (tracemalloc.get_traced_memory()[1] - traced_baseline) / 1024 ** 2
+        self.records.append(record)
+
+        memory = "".join(
+            f" | {label}: {record[key]:9.1f} MB"
+            for key, label in [("peak_rss_mb", "tepe RSS"), ("peak_traced_mb", "tepe tracemalloc")]
+            if record[key] is not None
+        )
+        print(f"[{suite}] {rows:>10,} satır | {name:<20} {seconds:8.3f} sn{memory}", flush=True)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(trace_memory):
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "trace_memory": trace_memory,
+    }
+
+
+# =========================================================
+# DB Merge Hattı: okuma → normalize → birleştirme → küp → grafik/PDF → dışa aktarma
+# =========================================================
+
+def _chart_inputs(cube):
+    """db.run()'daki altı grafiğin girdilerini küpten üretir."""
+    facts = cube["facts"]
+    sales = facts[facts["process_type"] == "Sell"]
+    purchase = facts[facts["process_type"] == "Buy"]
+    pivot_dow = facts.assign(day_of_week=facts["day"].dt.dayofweek).groupby(
+        ["day_of_week", "process_type"])["total"].sum().unstack(fill_value=0).reindex(columns=["Buy", "Sell"],
+                                                                                     fill_value=0)
+    partner = facts.groupby("partner_mc")["total"].sum().sort_values(ascending=False)
+    payment = facts.groupby("payment_method")["total"].sum().sort_values(ascending=False)
+    return [
+        ("Zaman Bazlı Trend", db.draw_daily_trend, (sales.groupby(sales["day"].dt.date)["total"].sum(),
+                                                    purchase.groupby(purchase["day"].dt.date)["total"].sum())),
+        ("Haftanın Günleri", db.draw_day_of_week, (pivot_dow,)),
+        ("Partner", db.draw_breakdown, (partner, "Çubuk (Bar)", "Partner", "Partner", "TL", "skyblue",
+                                        plt.cm.Paired.colors, 90, False)),
+        ("Ödeme Yöntemi", db.draw_breakdown, (payment, "Pasta (Pie)", "Ödeme", "Ödeme", "TL", "darkred",
+                                              plt.cm.Pastel1.colors, 140, True)),
+        ("Müşteri Top 10", db.draw_top_bar, (cube["customers"]["total"].nlargest(10), "Müşteri", "TL", "green")),
+        ("Ürün Top 10", db.draw_top_bar, (cube["products"]["total"].nlargest(10), "Ürün", "TL", "indigo")),
+    ]
+
+
+def bench_db_merge(rows_list, recorder, excel_max_rows):
+    """
+    Dört sentetik ihracat (TR/MC × Buy/Sell). Dosya başına satır excel_max_rows'u
+    aşmıyorsa veriler önce .xlsx'e yazılıp akışlı okuyucuyla geri okunur.
+    """
+    for rows in rows_list:
+        sources = make_db_merge_sources(rows)
+
+        def stage(name):
+            return recorder.stage("db", rows, name)
+
+        if rows // 4 <= excel_max_rows:
+            workbooks = [(export.to_xlsx(df), source, process_type) for df, source, process_type in sources]
+            with stage("read_excel"):
+                sources = [(read_excel_streaming(BytesIO(data)), source, process_type)
+                           for data, source, process_type in workbooks]
+            del workbooks
+
+        raw_totals = pd.concat([df.iloc[:, 5] for df, _, _ in sources], ignore_index=True)
+        raw_payments = pd.concat([df.iloc[:, 7] for df, _, _ in sources], ignore_index=True)
+        with stage("numeric_parse"):
+            parse_numeric(raw_totals)
+        with stage("payment_standardize"):
+            db.PAYMENT_MATCHER.standardize(raw_payments)
+        del raw_totals, raw_payments
+
+        with stage("normalize"):
+            normalized = [db.normalize_dataframe(df, db.ADVANCED_MAPPING, source, process_type)
+                          for df, source, process_type in sources]
+        del sources
+        with stage("merge"):
+            merged_df = db.merge_dataframes(normalized)
+        del normalized
+
+        with stage("date_index"):
+            date_index = DateIndex(merged_df, "order_date")
+        with stage("aggregate_cube"):
+            cube = db.build_aggregate_cube(date_index.frame, date_index.day_keys)
+        with stage("resolve_customers"):
+            db.get_resolved_customers(("bench", rows), date_index.frame)
+        with stage("reconcile"):
+            reconcile(date_index.frame)
+
+        # Boş grafik önbelleğiyle: raporun ilk üretimi (havuz açılışı dahil)
+        charts = [(title, ((rows, title), draw_func, args)) for title, draw_func, args in _chart_inputs(cube)]
+        with stage("charts_first_build"):
+            figures = rasterize_all(charts, LRUCache(max_entries=len(charts)))
+        with stage("pdf"):
+            build_pdf(db.cube_summary(cube["facts"]), figures)
+
+        for fmt in export.EXPORT_FORMATS:
+            if fmt == "xlsx" and rows > excel_max_rows:
+                continue
+            with stage(f"export_{fmt}"):
+                export.export_bytes(date_index.frame, fmt)
+
+
+# =========================================================
+# Fraud Hattı: CSV okuma → tarih indeksi → özellikler / skor / velocity / kimlik
+# =========================================================
+
+def bench_fraud(rows_list, recorder):
+    for rows in rows_list:
+        upload = to_csv_upload(make_fraud_frame(rows))
+
+        def stage(name):
+            return recorder.stage("fraud", rows, name)
+
+        with stage("read_csv"):
+            frame = pd.read_csv(BytesIO(upload.getvalue()))
+            frame.columns = frame.columns.str.strip().str.lower()
+        with stage("date_index"):
+            date_index = DateIndex(frame.assign(**{"create date": pd.to_datetime(frame["create date"])}),
+                                   "create date")
+        del frame
+
+        start_date, end_date = date_index.min_date, date_index.max_date
+        filtered = date_index.slice(start_date, end_date)
+        day_keys = date_index.day_slice(start_date, end_date)
+
+        with stage("customer_features"):
+            features, _, _ = fc.frame_customer_features(filtered, day_keys)
+        with stage("score_customers"):
+            score_customers(features)
+        with stage("numeric_parse"):
+            totals = parse_numeric(filtered["total"])
+        with stage("velocity"):
+            velocity_windows(filtered.assign(total=totals))
+        with stage("resolve_identities"):
+            fc.resolve_customer_names(filtered)
+        with stage("stream_features"):
+            fc.stream_customer_features(upload, start_date, end_date)
+
+
+def check_identity():
+    """Kimlik çözümleme davranış kontrolleri. Dönüş: başarısız kontrollerin listesi."""
+    checks = {
+        "isimsiz farklı kimlikler ayrı kalır": (
+            resolve_identities(pd.Series([None, None, None]), pd.Series(["A1", "B2", "C3"])).tolist(),
+            ["ID A1", "ID B2", "ID C3"],
+        ),
+        "isimsiz satır kimliği üzerinden isme bağlanır": (
+            resolve_identities(pd.Series(["Ahmet Yılmaz", None]), pd.Series(["A1", "A1"])).tolist(),
+            ["Ahmet Yılmaz", "Ahmet Yılmaz"],
+        ),
+    }
+    print("== Kimlik çözümleme kontrolleri ==")
+    failures = []
+    for name, (actual, expected) in checks.items():
+        ok = actual == expected
+        print(f"{'✓' if ok else '✗'} {name}" + ("" if ok else f": {actual} != {expected}"))
+        if not ok:
+            failures.append(name)
+    return failures
+
+
+# =========================================================
+# Sürümler Arası Karşılaştırma
+# =========================================================
+
+def compare_runs(baseline, current, threshold=0.2, min_seconds=0.05):
+    """
+    Aynı (suite, satır, aşama) kayıtlarını karşılaştırır. Süresi threshold oranından
+    (ve min_seconds'tan) fazla artan aşamaları gerileme olarak döndürür.
+    """
+    old = {(r["suite"], r["rows"], r["stage"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"== Karşılaştırma: {baseline['meta'].get('git_commit')} → {current['meta'].get('git_commit')} ==")
+    for record in current["results"]:
+        before = old.get((record["suite"], record["rows"], record["stage"]))
+        if before is None:
+            continue
+        ratio = record["seconds"] / before["seconds"] if before["seconds"] else float("inf")
+        regressed = ratio > 1 + threshold and record["seconds"] - before["seconds"] > min_seconds
+        if regressed:
+            regressions.append(dict(record, baseline_seconds=before["seconds"], ratio=ratio))
+        print(f"[{record['suite']}] {record['rows']:>10,} satır | {record['stage']:<20} "
+              f"{before['seconds']:8.3f} → {record['seconds']:8.3f} sn ({ratio:5.2f}x){'  ⚠️ GERİLEME' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DB Merge ve Fraud performans ölçümleri")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--only", nargs="+", choices=["payment", "numeric", "db", "fraud"],
+                        help="Yalnızca seçilen benchmark'ları çalıştır")
+    parser.add_argument("--json", help="Aşama ölçümlerinin yazılacağı JSON dosyası")
+    parser.add_argument("--compare", help="Karşılaştırılacak önceki JSON dosyası")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Gerileme sayılacak süre artışı oranı")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="Python ayırmalarını tracemalloc ile de ölç (süreleri şişirir)")
+    parser.add_argument("--excel-max-rows", type=int, default=50_000,
+                        help="Dosya başına bu satır sayısına kadar .xlsx yazma/okuma da ölçülür")
+    args = parser.parse_args()
+    selected = set(args.only or ["payment", "numeric", "db", "fraud"])
+
+    if "payment" in selected:
+        bench_payment(args.rows)
+    if "numeric" in selected:
+        bench_numeric(args.rows)
+
+    recorder = StageRecorder(trace_memory=args.tracemalloc)
+    if "db" in selected:
+        bench_db_merge(args.rows, recorder, args.excel_max_rows)
+    failures = []
+    if "fraud" in selected:
+        failures = check_identity()
+        bench_fraud(args.rows, recorder)
+
+    run = {"meta": run_metadata(recorder.trace_memory), "results": recorder.records}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(run, f, ensure_ascii=False, indent=2)
+        print(f"Sonuçlar yazıldı: {args.json}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare_runs(baseline, run, args.threshold):
+            sys.exit(1)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,14 @@
 import logging
-import time
+
+import pandas as pd
 import streamlit as st
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+
+import jobs
+from bot_steps import Step, network_quiet, page_loaded, run_steps, url_excludes
+from driver_pool import get_driver_pool
+from http_checkout import ENDPOINTS_CONFIRMED, run_http_checkout
 
 # Log dosyası
 logging.basicConfig(filename="bot_log.txt", level=logging.INFO, format="%(asctime)s - %(message)s")
@@ -18,104 +19,113 @@ logging.basicConfig(filename="bot_log.txt", level=logging.INFO, format="%(asctim
 # =============================================================
 def streamlit_log(msg, log_box):
     logging.info(msg)
-    log_box.write(f"🟢 {msg}")
+    # Yük testindeki sanal kullanıcılar arayüz dışında çalışır (log_box=None)
+    if log_box is not None:
+        log_box.write(f"🟢 {msg}")
 
 
 # =============================================================
-# BOT FUNKSIYONU
+# CHECKOUT ADIMLARI
 # =============================================================
-def start_bot(phone, password, momento_code, log_box):
-    try:
-        streamlit_log("Bot başlatılıyor...", log_box)
+BASE_URL = "https://market.staging.minted.com.tr"
+
+OTP_ENABLE_SCRIPT = """
+    let btn = document.querySelector('.otp-submit-button');
+    btn.removeAttribute('disabled');
+    btn.classList.remove('button-disabled');
+"""
+
+
+def checkout_steps(base_url=BASE_URL):
+    """Momento checkout akışı; base_url yük testinde yerel staging taklidine yönlendirilebilir."""
+    return [
+        # Giriş
+        Step("login_page", "navigate", f"{base_url}/giris-yap", ready=[page_loaded],
+             message="Giriş sayfasına gidiliyor..."),
+        Step("fill_phone", "fill", (By.ID, "username"), "{phone}"),
+        Step("fill_password", "fill", (By.ID, "password"), "{password}", message="Telefon ve şifre giriliyor..."),
+        Step("login_submit", "click", (By.XPATH, "//span[contains(text(),'Devam Et')]"),
+             message="Devam Et tıklanıyor..."),
 
-        chrome_options = Options()
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--headless=new")
-        chrome_options.add_argument("--window-size=1920,1080")
+        # OTP
+        Step("otp_code1", "fill", (By.ID, "code"), "1"),
+        Step("otp_code2", "fill", (By.ID, "code2"), "2"),
+        Step("otp_code3", "fill", (By.ID, "code3"), "3"),
+        Step("otp_code4", "fill", (By.ID, "code4"), "4"),
+        Step("otp_enable", "script", OTP_ENABLE_SCRIPT),
+        Step("otp_submit", "click", (By.CSS_SELECTOR, ".otp-submit-button"), ready=[url_excludes("giris-yap")],
+             message="OTP doğrulanıyor..."),
+
+        # Ürün
+        Step("category_page", "navigate", f"{base_url}/gumus", ready=[page_loaded],
+             message="Gümüş kategorisine gidiliyor..."),
+        Step("product_page", "navigate", f"{base_url}/minted-50-gr-gumus", ready=[page_loaded],
+             message="Ürün sayfasına gidiliyor..."),
+        Step("add_to_basket", "click", (By.CLASS_NAME, "cartbutton-add-basket"), ready=lambda: [network_quiet()],
+             message="Ürün sepete ekleniyor..."),
+
+        # Adres & sepet & ödeme
+        Step("address_page", "navigate", f"{base_url}/adres", ready=[page_loaded],
+             message="Adres sayfasına gidiliyor..."),
+        Step("cart_page", "navigate", f"{base_url}/sepet", ready=[page_loaded],
+             message="Sepet sayfasına gidiliyor..."),
+        Step("payment_page", "navigate", f"{base_url}/odeme", ready=[page_loaded],
+             message="Ödeme sayfasına gidiliyor..."),
 
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        wait = WebDriverWait(driver, 20)
+        # Momento
+        Step("momento_select", "click", (By.XPATH, "//button[.//img[contains(@src, 'momento-logo')]]"),
+             ready=[EC.visibility_of_element_located((By.ID, "momentoNumber"))], message="Momento ödeme seçiliyor..."),
+        Step("momento_code", "fill", (By.ID, "momentoNumber"), "{momento_code}", message="Momento kodu giriliyor..."),
 
-        streamlit_log("Giriş sayfasına gidiliyor...", log_box)
-        driver.get("https://market.staging.minted.com.tr/giris-yap")
+        # Sözleşmeler & tamamla
+        Step("contract", "js_click", (By.ID, "_contract"), message="Sözleşmeler işaretleniyor..."),
+        Step("contract2", "js_click", (By.ID, "_contract2")),
+        Step("complete_order", "js_click", (By.XPATH, '//span[text()="Alışverişi Tamamla"]'),
+             ready=lambda: [network_quiet()], message="Alışveriş tamamlanıyor..."),
+    ]
 
-        wait.until(EC.presence_of_element_located((By.ID, "username"))).send_keys(phone)
-        wait.until(EC.presence_of_element_located((By.ID, "password"))).send_keys(password)
-        streamlit_log("Telefon ve şifre girildi.", log_box)
 
-        devam = wait.until(EC.element_to_be_clickable((By.XPATH, "//span[contains(text(),'Devam Et')]")))
-        devam.click()
-        streamlit_log("Devam Et tıklandı.", log_box)
+CHECKOUT_STEPS = checkout_steps()
 
-        # OTP
-        wait.until(EC.presence_of_element_located((By.ID, "code"))).send_keys("1")
-        driver.find_element(By.ID, "code2").send_keys("2")
-        driver.find_element(By.ID, "code3").send_keys("3")
-        driver.find_element(By.ID, "code4").send_keys("4")
-
-        driver.execute_script("""
-            let btn = document.querySelector('.otp-submit-button');
-            btn.removeAttribute('disabled');
-            btn.classList.remove('button-disabled');
-        """)
-
-        dogrula = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, ".otp-submit-button")))
-        dogrula.click()
-        streamlit_log("OTP doğrulandı.", log_box)
-
-        # Ürün adımları
-        streamlit_log("Gümüş kategorisine gidiliyor...", log_box)
-        time.sleep(5)
-        driver.get("https://market.staging.minted.com.tr/gumus")
-
-        streamlit_log("Ürün sayfasına gidiliyor...", log_box)
-        time.sleep(5)
-        driver.get("https://market.staging.minted.com.tr/minted-50-gr-gumus")
-
-        streamlit_log("Ürün sepete ekleniyor...", log_box)
-        sepete_ekle = wait.until(EC.element_to_be_clickable((By.CLASS_NAME, "cartbutton-add-basket")))
-        sepete_ekle.click()
-
-        # Adres & sepet
-        time.sleep(5)
-        streamlit_log("Adres sayfasına gidiliyor...", log_box)
-        driver.get("https://market.staging.minted.com.tr/adres")
-
-        time.sleep(5)
-        streamlit_log("Sepet sayfasına gidiliyor...", log_box)
-        driver.get("https://market.staging.minted.com.tr/sepet")
-
-        time.sleep(5)
-        streamlit_log("Ödeme sayfasına gidiliyor...", log_box)
-        driver.get("https://market.staging.minted.com.tr/odeme")
 
-        # Momento
-        streamlit_log("Momento ödeme seçiliyor...", log_box)
-        momento_button = wait.until(
-            EC.element_to_be_clickable((By.XPATH, "//button[.//img[contains(@src, 'momento-logo')]]"))
-        )
-        momento_button.click()
-
-        time.sleep(5)
-        kod_input = wait.until(EC.presence_of_element_located((By.ID, "momentoNumber")))
-        kod_input.send_keys(momento_code)
-        streamlit_log("Momento kodu girildi.", log_box)
+# =============================================================
+# BOT FUNKSIYONU
+# =============================================================
+def start_bot(phone, password, momento_code, log_box, pool=None, timings=None, steps=None):
+    """
+    Tarayıcı sıcak havuzdan alınır ve adımlar (varsayılan CHECKOUT_STEPS) sırayla çalıştırılır.
+    İşlem başarılıysa tarayıcı temizlenip havuza döner; herhangi bir adım hata verirse kapatılır.
+    timings listesi verilirse adım süreleri ({step, action, seconds, status, url}) ona eklenir.
+    """
+    pool = pool or get_driver_pool()
+    timings = [] if timings is None else timings
+    log = lambda msg: streamlit_log(msg, log_box)
+    try:
+        log("Bot başlatılıyor...")
+        context = {"phone": phone, "password": password, "momento_code": momento_code}
+        with pool.driver() as driver:
+            run_steps(driver, steps or CHECKOUT_STEPS, context, log=log, records=timings)
+        log(f"🏁 Alışveriş tamamlandı! ({sum(r['seconds'] for r in timings):.1f} sn)")
+        return True
 
-        # Sözleşmeler
-        for checkbox_id in ["_contract", "_contract2"]:
-            checkbox = wait.until(EC.presence_of_element_located((By.ID, checkbox_id)))
-            driver.execute_script("arguments[0].click();", checkbox)
-        streamlit_log("Sözleşmeler işaretlendi.", log_box)
+    except Exception as e:
+        logging.error(f"Hata oluştu: {e}")
+        streamlit_log(f"❌ HATA: {e}", log_box)
+        return str(e)
 
-        # Alışverişi tamamla
-        complete = wait.until(EC.element_to_be_clickable((By.XPATH, '//span[text()="Alışverişi Tamamla"]')))
-        driver.execute_script("arguments[0].click();", complete)
-        streamlit_log("Alışveriş tamamlandı!", log_box)
 
-        driver.quit()
+def start_http_bot(phone, password, momento_code, log_box, timings=None, base_url=BASE_URL):
+    """
+    Aynı senaryo tarayıcısız: sayfa ve form uçlarına doğrudan HTTP istekleri (http_checkout).
+    Dönüş ve timings biçimi start_bot ile aynıdır.
+    """
+    timings = [] if timings is None else timings
+    log = lambda msg: streamlit_log(msg, log_box)
+    try:
+        log("HTTP checkout başlatılıyor...")
+        context = {"phone": phone, "password": password, "momento_code": momento_code}
+        run_http_checkout(base_url, context, log=log, records=timings)
+        log(f"🏁 Alışveriş tamamlandı! ({sum(r['seconds'] for r in timings):.2f} sn)")
         return True
 
     except Exception as e:
@@ -124,6 +134,25 @@ def start_bot(phone, password, momento_code, log_box):
         return str(e)
 
 
+ENGINES = {"Tarayıcı (Selenium)": "browser", "HTTP (tarayıcısız)": "http"}
+
+
+def mask_phone(phone, visible=4):
+    """Telefonun son birkaç hanesi dışını gizler (iş başlıkları kalıcı listeye yazılır)."""
+    digits = str(phone).strip()
+    return "*" * max(len(digits) - visible, 0) + digits[-visible:]
+
+
+def checkout_job(engine, phone, password, momento_code):
+    """Arka plan işi: tek checkout. Dönüş: {"result": True veya hata metni, "timings": adım süreleri}."""
+    timings = []
+    if engine == "http":
+        result = start_http_bot(phone, password, momento_code, None, timings)
+    else:
+        result = start_bot(phone, password, momento_code, None, timings=timings)
+    return {"result": result, "timings": timings}
+
+
 # =============================================================
 # STREAMLIT ARAYÜZ
 # =============================================================
@@ -131,20 +160,57 @@ def run():
     st.title("💳 Minted Staging Test")
     st.write("Staging ortamında otomatik alım işlemi yapan bot")
 
+    col_mode, col_engine = st.columns(2)
+    mode = col_mode.radio("Mod", ["Tek alım", "Yük testi"], horizontal=True)
+    # HTTP motorunun uçları gerçek staging'de doğrulanana kadar yalnızca yük testinde (yerel taklide karşı) sunulur
+    engine_options = list(ENGINES) if mode == "Yük testi" or ENDPOINTS_CONFIRMED else ["Tarayıcı (Selenium)"]
+    engine = ENGINES[col_engine.radio(
+        "Motor", engine_options, horizontal=True,
+        help="HTTP motoru tarayıcı açmadan aynı akışı form istekleriyle yürütür; arayüz doğrulaması için Selenium kullanın. "
+             "Form uçları gerçek staging'de doğrulanmadığından HTTP motoru şimdilik yalnızca yerel taklide karşı çalışır.",
+    )]
+    if mode == "Yük testi":
+        from loadtest import load_test_panel  # loadtest bu modülü içe aktarır
+        load_test_panel(engine)
+        return
+
     phone = st.text_input("Telefon Numarası")
     password = st.text_input("Şifre", type="password")
     momento_code = st.text_input("Momento Kodu")
 
-    log_box = st.empty()  # canlı log alanı
+    pool = get_driver_pool()
+    if engine == "browser":
+        stats = pool.stats()
+        col_status, col_warm = st.columns([3, 1])
+        col_status.caption(
+            f"Tarayıcı havuzu: {stats['idle']} hazır, {stats['in_use']} kullanımda / {stats['size']} "
+            f"(açılan: {stats['created']}, yeniden kullanılan: {stats['reused']})"
+        )
+        if col_warm.button("Isıt", help="Havuzu önceden hazır tarayıcılarla doldurur"):
+            with st.spinner("Tarayıcılar açılıyor..."):
+                pool.warm()
+            st.rerun()
 
     if st.button("Başlat"):
         if not phone or not password or not momento_code:
             st.error("Lütfen tüm bilgileri eksiksiz girin!")
         else:
-            with st.spinner("Bot çalışıyor..."):
-                result = start_bot(phone, password, momento_code, log_box)
-
-            if result is True:
-                st.success("🏁 Bot işlemi başarıyla tamamladı!")
-            else:
-                st.error("❌ Bot hata verdi. Logları inceleyin.")
+            # Bot arka planda çalışır; sayfadan ayrılınca veya yeniden çalıştırmada sonuç kaybolmaz
+            jobs.submit("bot", f"Momento checkout · {mask_phone(phone)} · {engine}", checkout_job, engine, phone, password,
+                        momento_code)
+
+    job = jobs.latest("bot")
+    if job is not None and jobs.job_status(job):
+        outcome = job.result or {}
+        if outcome.get("result") is True:
+            st.success("🏁 Bot işlemi başarıyla tamamladı!")
+        else:
+            st.error(f"❌ Bot hata verdi: {outcome.get('result')}")
+
+        timings = outcome.get("timings")
+        if timings:
+            step_df = pd.DataFrame(timings)
+            slowest = step_df.loc[step_df["seconds"].idxmax()]
+            st.caption(f"Toplam {step_df['seconds'].sum():.2f} sn · en yavaş adım: "
+                       f"{slowest['step']} ({slowest['seconds']:.2f} sn)")
+            st.dataframe(step_df, use_container_width=True, hide_index=True)
@@ -0,0 +1,145 @@
+import json
+import logging
+import time
+
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from jobs import report_progress
+from perf import stage
+
+# =========================================================
+# Koşul Tabanlı Adım Motoru
+# =========================================================
+# Bot akışı Step listesi olarak tanımlanır. Her adım bir eylem (navigate / fill /
+# click / js_click / script / wait) ve isteğe bağlı hazır olma koşullarından
+# oluşur; sabit time.sleep yerine koşul sağlanana kadar (en fazla timeout) beklenir.
+# Her adımın süresi perf aşaması olarak ve bot_log.txt'ye JSON satırı olarak yazılır.
+
+STEP_TIMEOUT = 20
+POLL_FREQUENCY = 0.1
+NETWORK_QUIET_SECONDS = 0.5
+
+
+# ---------------------------------------------------------
+# Hazır olma koşulları (WebDriverWait.until ile kullanılır)
+# ---------------------------------------------------------
+
+def page_loaded(driver):
+    return driver.execute_script("return document.readyState") == "complete"
+
+
+def url_excludes(fragment):
+    """Adres çubuğu artık fragment içermiyorsa (ör. giriş sayfasından çıkıldıysa) sağlanır."""
+    return lambda driver: fragment not in driver.current_url
+
+
+class network_quiet:
+    """
+    Sayfanın yüklediği kaynak sayısı `seconds` boyunca değişmediğinde sağlanır
+    (sepete ekleme gibi arka plan isteklerinin bitmesini beklemek için).
+    Henüz bitmemiş istekler Performance API'de görünmediğinden bu bir yaklaşımdır.
+    """
+
+    def __init__(self, seconds=NETWORK_QUIET_SECONDS):
+        self.seconds = seconds
+        self._count = None
+        self._since = None
+
+    def __call__(self, driver):
+        count = driver.execute_script("return performance.getEntriesByType('resource').length")
+        now = time.monotonic()
+        if count != self._count:
+            self._count, self._since = count, now
+            return False
+        return now - self._since >= self.seconds
+
+
+# ---------------------------------------------------------
+# Adım tanımı
+# ---------------------------------------------------------
+
+class Step:
+    """
+    action:
+      navigate  target = URL
+      fill      target = locator, value = "{phone}" gibi bağlamla biçimlenen metin
+      click     target = locator (tıklanabilir olana kadar beklenir)
+      js_click  target = locator (var olana kadar beklenir, JS ile tıklanır)
+      script    target = JavaScript kodu
+      wait      yalnızca ready koşulları
+    ready: eylemden sonra sağlanması gereken koşullar (her biri driver -> bool).
+    Durum tutan koşullar (network_quiet) her çalıştırmada yeniden oluşturulsun diye
+    ready bir fabrika olarak da verilebilir: ready=lambda: [network_quiet()].
+    """
+
+    def __init__(self, name, action, target=None, value=None, ready=(), message=None, timeout=STEP_TIMEOUT):
+        self.name = name
+        self.action = action
+        self.target = target
+        self.value = value
+        self.ready = ready
+        self.message = message
+        self.timeout = timeout
+
+    def execute(self, driver, context):
+        wait = WebDriverWait(driver, self.timeout, poll_frequency=POLL_FREQUENCY)
+
+        if self.action == "navigate":
+            driver.get(self.target)
+        elif self.action == "fill":
+            wait.until(EC.presence_of_element_located(self.target)).send_keys(self.value.format(**context))
+        elif self.action == "click":
+            wait.until(EC.element_to_be_clickable(self.target)).click()
+        elif self.action == "js_click":
+            element = wait.until(EC.presence_of_element_located(self.target))
+            driver.execute_script("arguments[0].click();", element)
+        elif self.action == "script":
+            driver.execute_script(self.target)
+        elif self.action != "wait":
+            raise ValueError(f"Bilinmeyen adım eylemi: {self.action}")
+
+        conditions = self.ready() if callable(self.ready) else self.ready
+        for condition in conditions:
+            wait.until(condition, message=f"{self.name}: hazır olma koşulu {self.timeout} sn içinde sağlanmadı")
+
+
+class StepFailed(Exception):
+    def __init__(self, step, error):
+        super().__init__(f"'{step.name}' adımı başarısız: {type(error).__name__}: {error}")
+        self.step = step
+        self.error = error
+
+
+def run_steps(driver, steps, context=None, log=None, records=None):
+    """
+    Adımları sırayla çalıştırır. records listesine adım başına
+    {step, action, seconds, status, url} eklenir (hata olsa da o ana kadarki süreler kalır).
+    log(msg): adım mesajlarını arayüze yazan isteğe bağlı fonksiyon.
+    """
+    context = context or {}
+    records = [] if records is None else records
+    for i, step in enumerate(steps):
+        if step.message and log:
+            log(step.message)
+        # Arka plan işi olarak çalışıyorsa ilerleme çubuğu adım adım ilerler
+        report_progress(i / len(steps), step.message or step.name)
+        status = "ok"
+        start = time.perf_counter()
+        try:
+            with stage(f"step_{step.name}"):
+                step.execute(driver, context)
+        except Exception as e:
+            status = f"error: {type(e).__name__}"
+            raise StepFailed(step, e) from e
+        finally:
+            record = {
+                "step": step.name,
+                "action": step.action,
+                "seconds": round(time.perf_counter() - start, 4),
+                "status": status,
+                "url": step.target if step.action == "navigate" else None,
+            }
+            records.append(record)
+            logging.info(json.dumps({"event": "bot_step", **record}, ensure_ascii=False))
+    return records
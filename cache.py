@@ -0,0 +1,81 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+# =========================================================
+# Sınırlı Boyutlu LRU Önbellek
+# =========================================================
+
+class LRUCache:
+    """
+    Thread-safe, en fazla `max_entries` kayıt tutan LRU önbellek.
+    Dolunca en uzun süredir kullanılmayan kayıt atılır.
+    """
+
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_or_create(self, key, factory):
+        """Kayıt yoksa factory() ile üretir ve saklar."""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+# =========================================================
+# Hash Yardımcıları
+# =========================================================
+
+def content_hash(data: bytes):
+    """Dosya içeriğinin SHA-256 özetini döndürür."""
+    return hashlib.sha256(data).hexdigest()
+
+
+# Streamlit her yüklemeye değişmeyen bir file_id verir; dosya içeriği yeniden çalıştırmalarda
+# tekrar hash'lenmez. file_id'si olmayan dosya nesnelerinde (testler, bench) her seferinde hesaplanır.
+_UPLOAD_HASHES = LRUCache(max_entries=64)
+
+
+def upload_hash(uploaded_file):
+    """Yüklenen dosyanın içerik özeti (yükleme başına bir kez hesaplanır)."""
+    file_id = getattr(uploaded_file, "file_id", None)
+    if file_id is None:
+        return content_hash(uploaded_file.getvalue())
+    return _UPLOAD_HASHES.get_or_create(file_id, lambda: content_hash(uploaded_file.getvalue()))
+
+
+def config_hash(config):
+    """Eşleştirme sözlükleri gibi JSON'a çevrilebilir ayarların özetini döndürür."""
+    payload = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
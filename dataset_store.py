@@ -0,0 +1,461 @@
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# =========================================================
+# Kolon Bazlı Veri Deposu (Parquet)
+# =========================================================
+# Birleştirilmiş DB Merge verisi source / process_type / ay bazında bölümlenmiş
+# Parquet dosyalarına yazılır:
+#   data_store/source=TR/process_type=Buy/month=2025-01/part-0.parquet
+# Okurken yalnızca istenen sütunlar ve bölümler, memory-map ile okunur.
+
+STORE_DIR = Path("data_store")
+PARTITION_COLUMNS = ["source", "process_type", "month"]
+UNKNOWN_MONTH = "unknown"
+KEY_COLUMN = "order_id"
+ORDER_KEYS = ["source", "process_type", KEY_COLUMN]
+HASH_COLUMN = "_row_hash"
+AGGREGATES_DIR = "_aggregates"
+# Sipariş -> ay bölümü indeksi: tarihi başka aya taşınan siparişin eski satırları bulunur
+ORDER_INDEX_FILE = "_order_index.parquet"
+
+# Önceden hesaplanan toplamlar: her biri source + process_type + boyut bazında
+# satır sayısı, total_price ve amount toplamı tutar. Toplamalar toplanabilir
+# olduğu için yeni/silinen satırlar üzerinden artımlı güncellenir.
+AGGREGATE_DIMENSIONS = {
+    "daily": "day",
+    "partner": "partner_mc",
+    "payment": "payment_method",
+    "customer": "customer_name",
+    "product": "product_currency",
+}
+AGGREGATE_VALUES = ["total_price", "amount"]
+
+
+def to_arrow_table(df):
+    """
+    Karışık tipli object sütunları (örn. hem sayı hem metin olan order_id)
+    Arrow'un kabul edeceği string tipine çevirir.
+    """
+    converted = {col: df[col].astype("string") for col in df.columns if df[col].dtype == object}
+    if converted:
+        df = df.assign(**converted)
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _unify_schemas(schemas):
+    """
+    Farklı yazımlarda tipi değişmiş sütunları ortak tipe indirger:
+    sayısal tipler float64'e, geri kalan uyuşmazlıklar string'e çekilir.
+    """
+    fields = {}
+    for schema in schemas:
+        for field in schema:
+            fields.setdefault(field.name, []).append(field.type)
+
+    unified = []
+    for name, types in fields.items():
+        distinct = set(types)
+        if len(distinct) == 1:
+            field_type = types[0]
+        elif all(pa.types.is_integer(t) or pa.types.is_floating(t) or pa.types.is_null(t) for t in distinct):
+            field_type = pa.float64()
+        else:
+            field_type = pa.string()
+        unified.append(pa.field(name, field_type))
+    return pa.schema(unified)
+
+
+def row_hashes(df):
+    """Satır içeriğinin özetini döndürür; tip farkları (5 / "5") aynı özeti verir."""
+    return pd.util.hash_pandas_object(df.astype("string"), index=False).to_numpy()
+
+
+def compute_aggregates(df, date_column="order_date"):
+    """Her boyut için source/process_type bazında count + toplamlar üretir."""
+    df = df.assign(day=pd.to_datetime(df[date_column], errors="coerce").dt.normalize())
+    aggregates = {}
+    for name, dimension in AGGREGATE_DIMENSIONS.items():
+        if dimension not in df.columns:
+            continue
+        keys = ["source", "process_type", dimension]
+        agg = df.groupby(keys, dropna=False).agg(
+            count=(dimension, "size"),
+            **{col: (col, "sum") for col in AGGREGATE_VALUES if col in df.columns},
+        )
+        aggregates[name] = agg.reset_index()
+    return aggregates
+
+
+def _aggregate_columns(date_column):
+    """compute_aggregates'in okuduğu sütunlar."""
+    return ["source", "process_type", date_column, *AGGREGATE_DIMENSIONS.values(), *AGGREGATE_VALUES]
+
+
+def merge_aggregates(base, added=None, removed=None):
+    """base + added - removed; sayısı sıfıra düşen gruplar atılır."""
+    merged = {}
+    for name in set(base) | set(added or {}) | set(removed or {}):
+        parts = []
+        if name in base:
+            parts.append(base[name])
+        if added and name in added:
+            parts.append(added[name])
+        if removed and name in removed:
+            negative = removed[name].copy()
+            value_cols = ["count"] + [c for c in AGGREGATE_VALUES if c in negative.columns]
+            negative[value_cols] = -negative[value_cols]
+            parts.append(negative)
+
+        keys = ["source", "process_type", AGGREGATE_DIMENSIONS[name]]
+        combined = pd.concat(parts, ignore_index=True).groupby(keys, dropna=False, as_index=False).sum()
+        merged[name] = combined[combined["count"] > 0].reset_index(drop=True)
+    return merged
+
+
+def order_months(df, date_column="order_date"):
+    """Siparişlerin bulunduğu ay bölümleri: (source, process_type, order_id, month); anahtarsızlar atlanır."""
+    frame = pd.DataFrame({
+        "source": df["source"].astype("string").to_numpy(),
+        "process_type": df["process_type"].astype("string").to_numpy(),
+        KEY_COLUMN: df[KEY_COLUMN].astype("string").to_numpy(),
+        "month": month_keys(df[date_column]).astype("string").to_numpy(),
+    })
+    return frame.dropna(subset=[KEY_COLUMN]).drop_duplicates().reset_index(drop=True)
+
+
+def _without(frame, keys, on):
+    """frame'den `on` sütunları keys'teki bir satırla eşleşen satırları atar (anti-join)."""
+    matched = frame[on].merge(keys[on].drop_duplicates(), on=on, how="left", indicator=True)["_merge"]
+    return frame[(matched == "left_only").to_numpy()]
+
+
+def _order_fingerprints(frame):
+    """
+    Sipariş başına satır sayısı ve satır özetlerinin (taşmalı) toplamı: satır sırasından
+    bağımsız, tek bir kalem değişince değişen sipariş özeti.
+    """
+    if frame.empty:
+        return pd.DataFrame({**{col: pd.Series(dtype="string") for col in ORDER_KEYS},
+                             "rows": pd.Series(dtype="int64"), "fingerprint": pd.Series(dtype="uint64")})
+    groups = frame.groupby(ORDER_KEYS, sort=False)
+    codes = groups.ngroup().to_numpy()
+    fingerprint = np.zeros(groups.ngroups, dtype=np.uint64)
+    np.add.at(fingerprint, codes, frame[HASH_COLUMN].to_numpy(dtype=np.uint64))
+    orders = groups.size().rename("rows").reset_index()
+    orders["fingerprint"] = fingerprint
+    return orders
+
+
+def month_keys(dates):
+    """Tarih serisini 'YYYY-MM' bölüm anahtarına çevirir; tarihsizler 'unknown' olur."""
+    dates = pd.to_datetime(dates, errors="coerce")
+    # strftime satır satır çalışır; önce sayısal anahtar üretip benzersizleri biçimlendiriyoruz
+    codes = dates.dt.year * 100 + dates.dt.month
+    labels = {code: f"{int(code) // 100:04d}-{int(code) % 100:02d}" for code in codes.dropna().unique()}
+    return codes.map(labels).fillna(UNKNOWN_MONTH)
+
+
+class DatasetStore:
+    """Bölümlenmiş Parquet veri deposu."""
+
+    def __init__(self, root=STORE_DIR):
+        self.root = Path(root)
+
+    def _partition_dir(self, source, process_type, month):
+        return self.root / f"source={source}" / f"process_type={process_type}" / f"month={month}"
+
+    def _files(self, sources=None, process_types=None, months=None):
+        """Bölüm dizin adlarına göre budanmış Parquet dosya listesi."""
+        if not self.root.exists():
+            return []
+        files = []
+        for path in sorted(self.root.glob("source=*/process_type=*/month=*/*.parquet")):
+            source, process_type, month = self._partition_of(path)
+            if sources and source not in sources:
+                continue
+            if process_types and process_type not in process_types:
+                continue
+            if months and month not in months:
+                continue
+            files.append(path)
+        return files
+
+    def _partition_of(self, path):
+        parts = dict(part.split("=", 1) for part in path.parent.relative_to(self.root).parts)
+        return parts["source"], parts["process_type"], parts["month"]
+
+    def is_empty(self):
+        return not self._files()
+
+    def version(self):
+        """Depo içeriği değiştiğinde değişen anahtar (önbellekler için)."""
+        return tuple((str(p), p.stat().st_mtime_ns, p.stat().st_size) for p in self._files())
+
+    def partitions(self):
+        """Depodaki (source, process_type, month) bölümlerini listeler."""
+        return sorted({self._partition_of(path) for path in self._files()})
+
+    def months(self):
+        return sorted({month for _, _, month in self.partitions()})
+
+    def _write_partitions(self, df, date_column, replace):
+        """
+        Veriyi bölümlerine ayırıp yazar. replace=True ise bölüm dizini yenilenir,
+        aksi halde bölüme yeni bir parça dosyası eklenir.
+        """
+        keys = df[PARTITION_COLUMNS[:2]].assign(month=month_keys(df[date_column]))
+        # Arrow dönüşümü bir kez yapılır, bölümler satır indeksleriyle alınır
+        table = to_arrow_table(df.drop(columns=PARTITION_COLUMNS[:2]))
+        part_name = "part-0.parquet" if replace else f"part-{time.time_ns()}.parquet"
+        written = []
+
+        for (source, process_type, month), rows in keys.groupby(PARTITION_COLUMNS, sort=False).indices.items():
+            part_dir = self._partition_dir(source, process_type, month)
+            if replace and part_dir.exists():
+                shutil.rmtree(part_dir)
+            part_dir.mkdir(parents=True, exist_ok=True)
+
+            pq.write_table(table.take(rows), part_dir / part_name)
+            written.append((source, process_type, month))
+
+        return written
+
+    def write(self, df, date_column="order_date"):
+        """
+        Veriyi bölümlere ayırıp yazar. Yazılan her bölüm tamamen yenilenir,
+        diğer bölümlere dokunulmaz. Toplamlar yalnızca yenilenen bölümlerin eski ve
+        yeni içeriği üzerinden güncellenir.
+        Dönüş: yazılan bölüm listesi.
+        """
+        df = df.assign(**{HASH_COLUMN: row_hashes(df)})
+        partitions = set(map(tuple, df[PARTITION_COLUMNS[:2]].assign(month=month_keys(df[date_column]))
+                             .drop_duplicates().itertuples(index=False)))
+        base = self.load_aggregates()
+        # Toplamı olmayan (eski) dolu depoda artımlı güncelleme yapılamaz, baştan hesaplanır
+        incremental = bool(base) or self.is_empty()
+        removed = self._load_partitions(partitions, _aggregate_columns(date_column)) if incremental else None
+        order_index = self.load_order_index()
+
+        written = self._write_partitions(df, date_column, replace=True)
+        replaced = pd.DataFrame(sorted(partitions), columns=PARTITION_COLUMNS, dtype="string")
+        self.save_order_index(pd.concat([_without(order_index, replaced, PARTITION_COLUMNS),
+                                         order_months(df, date_column)], ignore_index=True))
+        if incremental:
+            self.save_aggregates(merge_aggregates(
+                base,
+                added=compute_aggregates(df, date_column),
+                removed=compute_aggregates(removed, date_column) if not removed.empty else None,
+            ))
+        else:
+            self.save_aggregates(compute_aggregates(self.load(columns=_aggregate_columns(date_column)), date_column))
+        return written
+
+    def _load_partitions(self, partitions, columns=None):
+        """Verilen (source, process_type, month) bölümlerinin tamamını okur."""
+        frames = [
+            self.load(columns=columns, sources=[source], process_types=[process_type], months=[month])
+            for source, process_type, month in sorted(partitions)
+        ]
+        frames = [frame for frame in frames if not frame.empty]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def append(self, df, date_column="order_date"):
+        """
+        Artımlı ekleme: gelen veri (source, process_type, order_id) siparişleri üzerinden
+        depodakiyle karşılaştırılır. Bir siparişin tüm satırları (sepet kalemleri) birlikte
+        ele alınır: satır özetleri aynıysa sipariş atlanır, farklıysa depodaki tüm satırları
+        silinip gelen tüm satırları yazılır. Toplamlar sadece bu fark üzerinden güncellenir.
+        order_id'si boş satırlar her zaman yeni kabul edilir. Yalnızca gelen satırların ay
+        bölümleri, 'unknown' ve sipariş indeksine göre gelen siparişlerin daha önce
+        bulunduğu aylar okunur; tarihi başka aya taşınan siparişin eski satırları silinir.
+        Dönüş: {"new": n, "changed": n, "unchanged": n} (gelen satır sayıları)
+        """
+        df = df.assign(**{HASH_COLUMN: row_hashes(df)})
+        key = df[KEY_COLUMN].astype("string")
+
+        # Yalnızca gelen satırların düştüğü ve gelen siparişlerin önceden bulunduğu ay bölümleri
+        # okunur (maliyet geçmişle değil farkla büyür)
+        order_index = self.load_order_index()
+        incoming_months = order_months(df, date_column)
+        previous_months = order_index.merge(incoming_months[ORDER_KEYS].drop_duplicates(), on=ORDER_KEYS)
+        partitions = pd.concat([
+            df[PARTITION_COLUMNS[:2]].assign(month=month_keys(df[date_column])),
+            previous_months[PARTITION_COLUMNS],
+        ]).astype("string").drop_duplicates()
+        existing = self._existing_keys(partitions.itertuples(index=False))
+        incoming = pd.DataFrame({
+            "source": df["source"].to_numpy(),
+            "process_type": df["process_type"].to_numpy(),
+            KEY_COLUMN: key.to_numpy(),
+            HASH_COLUMN: pd.array(df[HASH_COLUMN].to_numpy(), dtype="UInt64"),
+        })
+        orders = _order_fingerprints(incoming.dropna(subset=[KEY_COLUMN])).merge(
+            _order_fingerprints(existing), on=ORDER_KEYS, how="left", suffixes=("", "_old"),
+        )
+        orders["known"] = orders["rows_old"].notna()
+        orders["changed"] = orders["known"] & ((orders["rows"] != orders["rows_old"])
+                                               | (orders["fingerprint"] != orders["fingerprint_old"]))
+
+        # Sipariş durumu satırlara taşınır; anahtarsız satırlar eşleşmez ve yeni sayılır
+        status = incoming[ORDER_KEYS].merge(orders[ORDER_KEYS + ["known", "changed"]], on=ORDER_KEYS, how="left")
+        is_known = status["known"].fillna(False).to_numpy(bool)
+        is_changed = status["changed"].fillna(False).to_numpy(bool)
+        is_new = ~is_known
+
+        # Değişen siparişlerin depodaki tüm satırları dosyalarından çıkarılır
+        removed = self._remove_rows(existing, orders[orders["changed"]])
+
+        delta = df[is_new | is_changed]
+        if not delta.empty:
+            self._write_partitions(delta, date_column, replace=False)
+
+        if not delta.empty or not removed.empty:
+            changed_orders = orders.loc[orders["changed"], ORDER_KEYS].astype("string")
+            self.save_order_index(pd.concat([_without(order_index, changed_orders, ORDER_KEYS),
+                                             order_months(delta, date_column)], ignore_index=True))
+            self.save_aggregates(merge_aggregates(
+                self.load_aggregates(),
+                added=compute_aggregates(delta, date_column) if not delta.empty else None,
+                removed=compute_aggregates(removed, date_column) if not removed.empty else None,
+            ))
+
+        return {
+            "new": int(is_new.sum()),
+            "changed": int(is_changed.sum()),
+            "unchanged": int((is_known & ~is_changed).sum()),
+        }
+
+    def _existing_keys(self, partitions):
+        """
+        Verilen (source, process_type, month) bölümlerindeki anahtar + özet + dosya bilgisini okur.
+        Tarihi boş satırlar 'unknown' bölümüne yazıldığı için her source/process_type için
+        bu bölüm de her zaman okunur.
+        """
+        months = {}
+        for source, process_type, month in partitions:
+            months.setdefault((source, process_type), {UNKNOWN_MONTH}).add(month)
+
+        frames = []
+        for (source, process_type), pair_months in sorted(months.items()):
+            for path in self._files(sources=[source], process_types=[process_type], months=pair_months):
+                table = pq.read_table(path, columns=[KEY_COLUMN, HASH_COLUMN], memory_map=True)
+                frame = table.to_pandas()
+                frame[KEY_COLUMN] = frame[KEY_COLUMN].astype("string")
+                frame[HASH_COLUMN] = frame[HASH_COLUMN].astype("UInt64")
+                frame["source"] = source
+                frame["process_type"] = process_type
+                frame["_file"] = str(path)
+                frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame({
+                "source": pd.Series(dtype="string"), "process_type": pd.Series(dtype="string"),
+                KEY_COLUMN: pd.Series(dtype="string"), HASH_COLUMN: pd.Series(dtype="UInt64"),
+                "_file": pd.Series(dtype="string"),
+            })
+        return pd.concat(frames, ignore_index=True).dropna(subset=[KEY_COLUMN])
+
+    def _remove_rows(self, existing, keys):
+        """Verilen siparişlerin tüm satırlarını dosyalarından siler; silinen satırları döndürür."""
+        if keys.empty:
+            return pd.DataFrame()
+
+        targets = existing.merge(keys[["source", "process_type", KEY_COLUMN]], on=["source", "process_type", KEY_COLUMN])
+        removed = []
+        for file_name, rows in targets.groupby("_file"):
+            path = Path(file_name)
+            source, process_type, _ = self._partition_of(path)
+            table = pq.read_table(path)
+            frame_keys = table.column(KEY_COLUMN).to_pandas().astype("string")
+            drop_mask = frame_keys.isin(set(rows[KEY_COLUMN])).to_numpy()
+
+            old_rows = table.filter(pa.array(drop_mask)).to_pandas()
+            old_rows["source"] = source
+            old_rows["process_type"] = process_type
+            removed.append(old_rows)
+
+            kept = table.filter(pa.array(~drop_mask))
+            if kept.num_rows:
+                pq.write_table(kept, path)
+            else:
+                path.unlink()
+
+        return pd.concat(removed, ignore_index=True)
+
+    def load_order_index(self):
+        """
+        Sipariş -> ay bölümü indeksini okur. İndeksi olmayan (eski) dolu depoda
+        bir kez tüm dosyaların yalnızca anahtar sütunundan kurulur.
+        """
+        path = self.root / ORDER_INDEX_FILE
+        if path.exists():
+            return pd.read_parquet(path).astype("string")
+
+        frames = []
+        for file in self._files():
+            source, process_type, month = self._partition_of(file)
+            keys = pq.read_table(file, columns=[KEY_COLUMN]).column(KEY_COLUMN).to_pandas().astype("string")
+            frames.append(pd.DataFrame({"source": source, "process_type": process_type,
+                                        KEY_COLUMN: keys.to_numpy(), "month": month}))
+        if not frames:
+            return pd.DataFrame({col: pd.Series(dtype="string") for col in ORDER_KEYS + ["month"]})
+        index = pd.concat(frames, ignore_index=True).astype("string").dropna(subset=[KEY_COLUMN]).drop_duplicates()
+        self.save_order_index(index)
+        return index
+
+    def save_order_index(self, index):
+        self.root.mkdir(parents=True, exist_ok=True)
+        index = index.astype("string").drop_duplicates().reset_index(drop=True)
+        pq.write_table(to_arrow_table(index), self.root / ORDER_INDEX_FILE)
+
+    def load_aggregates(self):
+        """Önceden hesaplanmış toplamları okur."""
+        agg_dir = self.root / AGGREGATES_DIR
+        return {
+            name: pd.read_parquet(agg_dir / f"{name}.parquet")
+            for name in AGGREGATE_DIMENSIONS
+            if (agg_dir / f"{name}.parquet").exists()
+        }
+
+    def save_aggregates(self, aggregates):
+        agg_dir = self.root / AGGREGATES_DIR
+        agg_dir.mkdir(parents=True, exist_ok=True)
+        for name, frame in aggregates.items():
+            pq.write_table(to_arrow_table(frame), agg_dir / f"{name}.parquet")
+
+    def load(self, columns=None, sources=None, process_types=None, months=None):
+        """
+        Depoyu okur. columns verilirse yalnızca o sütunlar okunur (column pruning);
+        sources / process_types / months verilirse diğer bölümler hiç açılmaz.
+        """
+        files = self._files(sources, process_types, months)
+        if not files:
+            return pd.DataFrame()
+
+        schema = _unify_schemas(pq.read_schema(path) for path in files)
+        read_columns = [c for c in columns if c in schema.names] if columns else None
+
+        tables = []
+        for path in files:
+            table = pq.read_table(path, columns=read_columns, memory_map=True)
+            table = table.cast(pa.schema([schema.field(name) for name in table.schema.names]))
+
+            # Bölüm bilgisi dosyada değil dizin adında tutulur
+            source, process_type = self._partition_of(path)[:2]
+            if columns is None or "source" in columns:
+                table = table.append_column("source", pa.array([source] * table.num_rows, pa.string()))
+            if columns is None or "process_type" in columns:
+                table = table.append_column("process_type", pa.array([process_type] * table.num_rows, pa.string()))
+            tables.append(table)
+
+        df = pa.concat_tables(tables, promote_options="permissive").to_pandas()
+        if columns is None or HASH_COLUMN not in columns:
+            df = df.drop(columns=[HASH_COLUMN], errors="ignore")
+        return df
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+# =========================================================
+# Tarihe Göre Ön-İndekslenmiş Veri
+# =========================================================
+# Tarih filtresi her değiştiğinde tüm satırlar üzerinde boolean maske kurmak
+# yerine veri bir kez tarihe göre sıralanır. Tarih aralığı sorguları iki
+# searchsorted (ikili arama) ile bulunan bir dilime dönüşür; gün anahtarları
+# da bir kez hesaplanıp dilimle birlikte kullanılır.
+
+
+class DateIndex:
+    """
+    Tarih sütununa göre sıralanmış DataFrame.
+    Tarihi boş (NaT) satırlar sona dizilir; tarih aralığı sorgularına hiç girmez.
+    """
+
+    def __init__(self, df, date_column):
+        self.date_column = date_column
+        self.frame = df.sort_values(date_column, kind="stable", na_position="last").reset_index(drop=True)
+
+        stamps = self.frame[date_column].to_numpy(dtype="datetime64[ns]")
+        self.valid_rows = int((~np.isnat(stamps)).sum())
+        self._stamps = stamps[:self.valid_rows]
+        # Gün anahtarları (gece yarısı) bir kez hesaplanır; frame ile hizalıdır, NaT satırlarda NaT
+        self.day_keys = stamps.astype("datetime64[D]").astype("datetime64[ns]")
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def min_date(self):
+        return pd.Timestamp(self._stamps[0]).date() if self.valid_rows else None
+
+    @property
+    def max_date(self):
+        return pd.Timestamp(self._stamps[-1]).date() if self.valid_rows else None
+
+    def bounds(self, start_date, end_date):
+        """[start_date, end_date] gün aralığının (her iki uç dahil) satır sınırları: (lo, hi)."""
+        start = np.datetime64(pd.Timestamp(start_date).normalize(), "ns")
+        end = np.datetime64(pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1), "ns")
+        lo = int(np.searchsorted(self._stamps, start, side="left"))
+        hi = int(np.searchsorted(self._stamps, end, side="left"))
+        return lo, max(lo, hi)
+
+    def slice(self, start_date, end_date):
+        """Tarih aralığındaki satırlar (kopyalamadan, sıralı dilim)."""
+        lo, hi = self.bounds(start_date, end_date)
+        return self.frame.iloc[lo:hi]
+
+    def day_slice(self, start_date, end_date):
+        """slice() ile hizalı gün anahtarları."""
+        lo, hi = self.bounds(start_date, end_date)
+        return self.day_keys[lo:hi]
@@ -1,4 +1,7 @@
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import pandas as pd
 import streamlit as st
 import matplotlib.pyplot as plt
@@ -6,8 +9,21 @@ import numpy as np
 from io import BytesIO
 import re
 from datetime import datetime
-from fpdf import FPDF
-import tempfile
+from functools import partial
+from matplotlib.figure import Figure
+import pyarrow as pa
+
+from cache import LRUCache, config_hash, upload_hash
+from numeric import parse_numeric
+from excel_reader import iter_excel_chunks
+from dataset_store import DatasetStore, to_arrow_table
+from date_index import DateIndex
+from identity import resolve_identities, clean_customer_ids
+from reconcile import reconcile, DEFAULT_AMOUNT_TOLERANCE
+from export import export_section
+from pdf_report import create_pdf_report, rasterize
+from perf import stage, timed
+import jobs
 
 # ----------------------------------------------------------------------
 # 📚 GELİŞMİŞ EŞLEŞTİRME LİSTELERİ (STABİLİTE İÇİN)
@@ -61,49 +77,76 @@ STANDARD_COLUMNS = [
 # ⚙️ YARDIMCI FONKSİYONLAR
 # ----------------------------------------------------------------------
 
+def _clean_header(name):
+    """Tek bir başlığı/alias'ı temizler: Boşlukları siler, küçültür."""
+    return str(name).strip().lower().replace(" ", "_").replace("-", "_").replace(".", "")
+
+
 def _clean_column_names(columns):
     """Excel başlıklarını temizler: Boşlukları siler, küçültür."""
-    return [str(c).strip().lower().replace(" ", "_").replace("-", "_").replace(".", "") for c in columns]
+    return [_clean_header(c) for c in columns]
+
+
+def compile_alias_index(mapping_config):
+    """
+    Eşleştirme sözlüğünü bir kez derler: temiz başlık -> aday standart sütunlar.
+    Adaylar öncelik sırasıyla tutulur: önce sözlükteki sütun sırası, sonra alias sırası.
+    """
+    index = {}
+    for col_rank, (standard_col, aliases) in enumerate(mapping_config.items()):
+        for alias_rank, alias in enumerate(aliases):
+            candidates = index.setdefault(_clean_header(alias), [])
+            if all(std != standard_col for _, _, std in candidates):
+                candidates.append((col_rank, alias_rank, standard_col))
+    return {alias: tuple(candidates) for alias, candidates in index.items()}
+
+
+ALIAS_INDEX = compile_alias_index(ADVANCED_MAPPING)
+
+
+def resolve_headers(headers, alias_index=ALIAS_INDEX):
+    """
+    Temizlenmiş başlıkları tek geçişte standart sütunlara eşler.
+    Her standart sütun en yüksek öncelikli başlığı alır; her başlık en fazla bir sütuna gider.
+    Dönüş: (yeniden adlandırma sözlüğü, eşleşmeyen başlıklar listesi)
+    """
+    matches = []
+    for header in dict.fromkeys(headers):
+        for col_rank, alias_rank, standard_col in alias_index.get(header, ()):
+            matches.append((col_rank, alias_rank, header, standard_col))
+    matches.sort()
 
+    rename_dict = {}
+    taken = set()
+    for _, _, header, standard_col in matches:
+        if header in rename_dict or standard_col in taken:
+            continue
+        rename_dict[header] = standard_col
+        taken.add(standard_col)
 
-def _clean_numeric_column(series):
-    """Sayısal verileri temizler (TL, virgül, nokta karmaşasını çözer)."""
-    s = series.astype(str)
-    s = s.str.replace(r"[^0-9,.\-]", "", regex=True)
-    tr_format = s.str.contains(r"\.\d{3},\d{2}$")
-    s = s.where(~tr_format, s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
-    only_comma = s.str.contains(",") & ~s.str.contains(r"\.")
-    s = s.where(~only_comma, s.str.replace(",", ".", regex=False))
-    both = s.str.contains(",") & s.str.contains(r"\.") & ~tr_format
-    s = s.where(~both, s.str.replace(",", "", regex=False))
-    return pd.to_numeric(s, errors="coerce").fillna(0)
+    unmatched = [h for h in dict.fromkeys(headers) if h not in rename_dict]
+    return rename_dict, unmatched
 
 
-def normalize_dataframe(df, mapping_config, source, process_type):
+@timed("normalize")
+def normalize_dataframe(df, mapping_config, source, process_type, return_report=False, locales=None):
     """
     Excel verisini alır, akıllı eşleştirme ile standart hale getirir.
+    return_report=True ise (df, rapor) döner; rapor eşleşen ve eşleşmeyen başlıkları
+    ve sayısal sütunlarda kullanılan ondalık ayırıcıyı (locales) içerir.
+    locales: {sütun: locale}; verilen sütunlarda locale yeniden tespit edilmez.
     """
     # 1. Excel başlıklarını temizle (Örn: "Order Date " -> "order_date")
     clean_headers = _clean_column_names(df.columns)
     df.columns = clean_headers
 
-    rename_dict = {}
-
-    # 2. Akıllı Eşleştirme Döngüsü
-    # Standart sütunları tek tek geziyoruz (Örn: 'order_date')
-    for standard_col, aliases in mapping_config.items():
-        # Bu standart sütun için olası takma adları (alias) geziyoruz
-        for alias in aliases:
-            # Alias'ı da temizliyoruz ki eşleşme garanti olsun
-            clean_alias = alias.strip().lower().replace(" ", "_").replace("-", "_")
-
-            # Eğer temizlenmiş alias, Excel'in başlıklarında varsa EŞLEŞTİ!
-            if clean_alias in df.columns:
-                rename_dict[clean_alias] = standard_col
-                break  # Bir tane bulduk yeter, diğer aliaslara bakmaya gerek yok
+    # 2. Akıllı Eşleştirme: derlenmiş alias indeksinde tek geçişte arama
+    alias_index = ALIAS_INDEX if mapping_config is ADVANCED_MAPPING else compile_alias_index(mapping_config)
+    rename_dict, unmatched = resolve_headers(clean_headers, alias_index)
 
-    # 3. İsimleri Değiştir
-    df = df.rename(columns=rename_dict)
+    # 3. İsimleri Değiştir (eşleşmeyip bir hedef sütunla aynı adı taşıyan başlıklar atılır)
+    shadowed = [h for h in unmatched if h in rename_dict.values()]
+    df = df.drop(columns=shadowed).rename(columns=rename_dict)
 
     # 4. Çift sütunları engelle
     df = df.loc[:, ~df.columns.duplicated()]
@@ -115,26 +158,40 @@ def normalize_dataframe(df, mapping_config, source, process_type):
     if "partner_mc" not in df.columns or source == "TR":
         df["partner_mc"] = "TR"
 
-    # Sayısal Temizlik
+    # Sayısal Temizlik (çözülemeyen değerler NaN olur ve raporlanır)
+    unparseable = {}
+    detected_locales = {}
     for col in ["amount", "total_price", "margin"]:
         if col in df.columns:
-            df[col] = _clean_numeric_column(df[col])
+            df[col], numeric_report = parse_numeric(df[col], locale=(locales or {}).get(col), return_report=True)
+            if numeric_report["locale"]:
+                detected_locales[col] = numeric_report["locale"]
+            if numeric_report["unparseable"]:
+                unparseable[col] = numeric_report["unparseable"]
 
-    # Olmayan standart sütunları boş (NA) olarak ekle
+    # Olmayan standart sütunları boş (NA) olarak ekle; sayısal sütunlar sayısal kalsın
     for col in STANDARD_COLUMNS:
         if col not in df.columns:
-            df[col] = pd.NA
+            df[col] = np.nan if col in ("amount", "total_price", "margin") else pd.NA
 
     # Sütun sırasını standartlaştır
     df = df[[col for col in STANDARD_COLUMNS if col in df.columns]]
+
+    if return_report:
+        report = {"matched": rename_dict, "unmatched": unmatched, "unparseable": unparseable,
+                  "locales": detected_locales}
+        return df, report
     return df
 
 
 def clean_merged_ids(df):
+    # TR satırları metne çevrileceği için sütunlar önce object yapılır (int64 sütuna str yazılamaz)
     if "order_id" in df.columns:
+        df["order_id"] = df["order_id"].astype(object)
         df.loc[df["source"] == "TR", "order_id"] = df.loc[df["source"] == "TR", "order_id"].astype(str).str.replace(
             r"[.,]", "", regex=True)
     if "customer_id" in df.columns:
+        df["customer_id"] = df["customer_id"].astype(object)
         df.loc[df["source"] == "TR", "customer_id"] = df.loc[df["source"] == "TR", "customer_id"].astype(
             str).str.replace(r"[.,]", "", regex=True)
     return df
@@ -161,54 +218,526 @@ def standardize_payment_method(value, mapping_dict):
     return str(value).title()
 
 
-# PDF için Türkçe Karakter Temizleyici
-def clean_text_for_pdf(text):
-    if not isinstance(text, str):
-        return str(text)
-    replacements = {
-        'ş': 's', 'Ş': 'S', 'ı': 'i', 'İ': 'I', 'ğ': 'g', 'Ğ': 'G',
-        'ü': 'u', 'Ü': 'U', 'ö': 'o', 'Ö': 'O', 'ç': 'c', 'Ç': 'C'
+def _clean_payment_text(text):
+    return str(text).strip().lower().replace(" ", "").replace("-", "")
+
+
+class PaymentMatcher:
+    """
+    PAYMENT_MAPPING'den bir kez derlenen eşleştirici.
+    standardize_payment_method ile birebir aynı sonucu verir (ilk eşleşen kazanır),
+    fakat her farklı değer yalnızca bir kez eşleştirilir.
+    """
+
+    def __init__(self, mapping_dict):
+        # (temiz alias, standart ad, kapsama kontrolü yapılsın mı) - sözlük sırası korunur
+        self._rules = []
+        for standard_name, aliases in mapping_dict.items():
+            for alias in aliases:
+                alias_clean = _clean_payment_text(alias)
+                self._rules.append((alias_clean, standard_name, len(alias_clean) > 3))
+
+    def match(self, value):
+        if pd.isna(value) or str(value).strip() == "":
+            return "Belirsiz"
+
+        val_clean = _clean_payment_text(value)
+        for alias_clean, standard_name, allow_contains in self._rules:
+            if alias_clean == val_clean or (allow_contains and alias_clean in val_clean):
+                return standard_name
+
+        return str(value).title()
+
+    def standardize(self, series):
+        """Seriyi factorize eder, benzersiz değerleri eşleştirip tüm satırlara geri yayar."""
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        # Son eleman NA kodu (-1) için kullanılır
+        mapped = np.array([self.match(u) for u in uniques] + ["Belirsiz"], dtype=object)
+        return pd.Series(mapped[codes], index=series.index, name=series.name)
+
+
+PAYMENT_MATCHER = PaymentMatcher(PAYMENT_MAPPING)
+
+
+@timed("merge")
+def merge_dataframes(dataframes):
+    """Normalize edilmiş tabloları birleştirir, ID ve ödeme yöntemlerini standartlaştırır."""
+    merged_df = pd.concat(dataframes, ignore_index=True)
+    merged_df = clean_merged_ids(merged_df)
+
+    # 🆕 YENİ EKLENEN: ÖDEME YÖNTEMİ STANDARTLAŞTIRMA MANTIĞI
+    if "payment_method" in merged_df.columns:
+        with stage("payment_mapping"):
+            merged_df["payment_method"] = PAYMENT_MATCHER.standardize(merged_df["payment_method"])
+
+    merged_df = merged_df.assign(
+        product_currency=lambda df: df["product_name"].astype(str) + " / " + df["currency"].astype(str))
+
+    if "order_date" in merged_df.columns:
+        merged_df["order_date"] = pd.to_datetime(merged_df["order_date"], errors='coerce')
+
+    return merged_df
+
+
+# ----------------------------------------------------------------------
+# 🧊 TOPLAM KÜPÜ (TÜM GRAFİK VE TABLOLARIN KAYNAĞI)
+# ----------------------------------------------------------------------
+
+CUBE_DIMENSIONS = ["day", "process_type", "partner_mc", "payment_method"]
+_CUBE_CACHE = LRUCache(max_entries=32)
+
+
+@timed("aggregation")
+def build_aggregate_cube(df, day_keys=None):
+    """
+    Filtrelenmiş veriden tek seferde kompakt bir küp üretir:
+    - facts: gün × process_type × partner × ödeme yöntemi bazında toplamlar
+    - customers / products: müşteri ve ürün özetleri
+    Grafikler ve tablolar tam veri yerine bu küpü dilimler.
+    day_keys verilirse (DateIndex'ten, df ile hizalı) gün anahtarları yeniden hesaplanmaz.
+    """
+    df = df.assign(day=day_keys if day_keys is not None else df["order_date"].dt.normalize())
+
+    facts = df.groupby(CUBE_DIMENSIONS, dropna=False).agg(
+        rows=("process_type", "size"),
+        count=("order_id", "count"),
+        total=("total_price", "sum"),
+        amount=("amount", "sum"),
+        margin_sum=("margin", "sum"),
+        margin_count=("margin", "count"),
+    ).reset_index()
+
+    customers = df.groupby("customer_name").agg(count=("order_id", "count"), total=("total_price", "sum"))
+    products = df.groupby("product_currency").agg(amount=("amount", "sum"), total=("total_price", "sum"))
+
+    return {"facts": facts, "customers": customers, "products": products}
+
+
+def get_aggregate_cube(cache_key, df, day_keys=None):
+    """Küpü (veri seti, tarih aralığı, ödeme filtresi) anahtarıyla önbellekten döndürür."""
+    return _CUBE_CACHE.get_or_create(cache_key, lambda: build_aggregate_cube(df, day_keys))
+
+
+def get_resolved_customers(cache_key, df):
+    """
+    Müşteri özetini ham isim yerine çözümlenmiş kimliğe göre gruplar (yazım / Türkçe
+    karakter farkları). TR ve MC müşteri numaraları ayrı sistemlerden geldiği için
+    kaynakla birlikte kullanılır.
+    """
+    def build():
+        customer_ids = None
+        if "customer_id" in df.columns:
+            customer_ids = df["source"].astype("string") + ":" + clean_customer_ids(df["customer_id"])
+        with stage("identity_resolution"):
+            identity = resolve_identities(df["customer_name"], customer_ids).rename("customer_name")
+        return df.groupby(identity).agg(count=("order_id", "count"), total=("total_price", "sum"))
+
+    return _CUBE_CACHE.get_or_create((cache_key, "resolved_customers"), build)
+
+
+_RECON_CACHE = LRUCache(max_entries=4)
+
+
+def get_reconciliation(cache_key, df, amount_tolerance, use_fallback):
+    """TR ↔ MC mutabakatını (veri seti + filtreler + parametreler) anahtarıyla önbellekten döndürür."""
+    return _RECON_CACHE.get_or_create(
+        (cache_key, amount_tolerance, use_fallback),
+        timed("reconciliation")(lambda: reconcile(df, amount_tolerance=amount_tolerance, use_fallback=use_fallback)),
+    )
+
+
+def cube_summary(facts):
+    """Özet metrikleri küpten hesaplar."""
+    by_process = facts.groupby("process_type")[["rows", "total"]].sum()
+    total_purchase_val = by_process["total"].get("Buy", 0)
+    total_sales_val = by_process["total"].get("Sell", 0)
+    sales_txn_count = by_process["rows"].get("Sell", 0)
+    purchase_txn_count = by_process["rows"].get("Buy", 0)
+    margin_count = facts["margin_count"].sum()
+
+    return {
+        "total_purchase": total_purchase_val,
+        "total_sales": total_sales_val,
+        "total_amount": facts["amount"].sum(),
+        "avg_margin": facts["margin_sum"].sum() / margin_count if margin_count > 0 else np.nan,
+        "aov_sales": total_sales_val / sales_txn_count if sales_txn_count > 0 else 0,
+        "aov_purchase": total_purchase_val / purchase_txn_count if purchase_txn_count > 0 else 0,
     }
-    for search, replace in replacements.items():
-        text = text.replace(search, replace)
-    return text
 
 
-# PDF Oluşturma Motoru
-def create_pdf_report(summary_data, figures_list):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", 'B', 16)
+# ----------------------------------------------------------------------
+# 📦 YÜKLEME ÖNBELLEĞİ
+# ----------------------------------------------------------------------
+
+# Her widget değişikliğinde Streamlit betiği baştan çalışır. Excel okuma ve
+# normalizasyon sonucu; dosya içeriği + kaynak + işlem tipi + eşleştirme
+# ayarına göre saklanır, böylece aynı dosya tekrar işlenmez.
+INGEST_CACHE_MAX_ENTRIES = 16
+_INGEST_CACHE = LRUCache(max_entries=INGEST_CACHE_MAX_ENTRIES)
+
 
-    # Başlık
-    pdf.cell(190, 10, clean_text_for_pdf("Sell ve Buy Raporu"), ln=True, align='C')
-    pdf.ln(10)
+def ingest_cache_key(file_hash, source, process_type, mapping_config):
+    return (file_hash, source, process_type, config_hash(mapping_config))
 
-    # Özet Tablo
-    pdf.set_font("Arial", '', 12)
-    pdf.cell(190, 10, clean_text_for_pdf("GENEL OZET:"), ln=True)
-    pdf.set_font("Arial", '', 10)
 
-    for key, value in summary_data.items():
-        pdf.cell(100, 8, clean_text_for_pdf(f"{key}: {value}"), ln=True)
+def uploads_cached(uploads, mapping_config=ADVANCED_MAPPING):
+    """Tüm dosyaların okuma sonucu (hata dahil) önbellekte mi?"""
+    return all(_INGEST_CACHE.get(ingest_cache_key(upload_hash(f), source, process_type, mapping_config)) is not None
+               for f, source, process_type in uploads)
 
-    pdf.ln(5)
 
-    # Grafikleri Sırayla Ekle
-    for title, fig in figures_list:
-        if fig:
-            pdf.add_page()
-            pdf.set_font("Arial", 'B', 14)
-            pdf.cell(190, 10, clean_text_for_pdf(title), ln=True, align='C')
+def _cached_failure(error):
+    """Okunamayan dosyanın önbellek kaydı: aynı dosya her yeniden çalıştırmada tekrar ayrıştırılmaz."""
+    return None, {"error": error}
 
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmpfile:
-                fig.savefig(tmpfile.name, format="png", bbox_inches="tight")
-                pdf.image(tmpfile.name, x=10, y=30, w=190)
-                tmpfile_path = tmpfile.name
 
-            os.remove(tmpfile_path)
+@timed("upload_parse")
+def parse_upload_bytes(file_bytes, source, process_type, mapping_config=ADVANCED_MAPPING):
+    """
+    Excel baytlarını parça parça okuyup normalize eder.
+    Bellek kullanımı dosya boyutuyla değil parça boyutuyla ölçeklenir.
+    Bir sütunun ondalık ayırıcısı, metin değeri görülen ilk parçada belirlenir ve sonraki
+    parçalara aynen uygulanır ("1.234" her parçada aynı sayı olarak okunur).
+    Dönüş: (normalize edilmiş df, başlık eşleştirme raporu)
+    """
+    chunks = []
+    report = None
+    locales = {}
+    for chunk in iter_excel_chunks(BytesIO(file_bytes)):
+        chunk, chunk_report = normalize_dataframe(chunk, mapping_config, source, process_type, return_report=True,
+                                                  locales=locales)
+        chunks.append(chunk)
+        locales.update(chunk_report["locales"])
+        if report is None:
+            report = chunk_report
+        else:
+            for col, count in chunk_report["unparseable"].items():
+                report["unparseable"][col] = report["unparseable"].get(col, 0) + count
+    if report is not None:
+        report["locales"] = locales
 
-    return pdf.output(dest='S').encode('latin-1', 'replace')
+    if not chunks:
+        df = normalize_dataframe(pd.DataFrame(), mapping_config, source, process_type)
+        return df, {"matched": {}, "unmatched": [], "unparseable": {}, "locales": {}}
+    return pd.concat(chunks, ignore_index=True), report
+
+
+def load_upload(uploaded_file, source, process_type, mapping_config=ADVANCED_MAPPING):
+    """
+    Yüklenen Excel dosyasını okuyup normalize eder; sonucu önbellekten döndürür.
+    Dönüş: (normalize edilmiş df, başlık eşleştirme raporu)
+    """
+    key = ingest_cache_key(upload_hash(uploaded_file), source, process_type, mapping_config)
+
+    cached = _INGEST_CACHE.get(key)
+    if cached is not None:
+        if cached[0] is None:
+            raise ValueError(cached[1]["error"])
+        return cached
+
+    try:
+        df, report = parse_upload_bytes(uploaded_file.getvalue(), source, process_type, mapping_config)
+    except Exception as e:
+        _INGEST_CACHE.put(key, _cached_failure(str(e)))
+        raise
+    result = (df, dict(report, file_hash=key[0]))
+    _INGEST_CACHE.put(key, result)
+    return result
+
+
+# ----------------------------------------------------------------------
+# ⚡ PARALEL YÜKLEME (PROCESS POOL)
+# ----------------------------------------------------------------------
+
+# openpyxl okuması CPU'ya bağlı ve tek iş parçacıklıdır. Birden fazla dosya
+# önbellekte yoksa ayrı süreçlerde okunur; sonuçlar Arrow IPC olarak döner.
+# Streamlit sunucusu çok iş parçacıklı olduğu için süreçler "spawn" ile açılır.
+INGEST_MAX_WORKERS = min(8, os.cpu_count() or 1)
+_INGEST_POOL = None
+
+
+def _get_ingest_pool():
+    global _INGEST_POOL
+    if _INGEST_POOL is None:
+        _INGEST_POOL = ProcessPoolExecutor(
+            max_workers=INGEST_MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _INGEST_POOL
+
+
+def _reset_ingest_pool():
+    global _INGEST_POOL
+    if _INGEST_POOL is not None:
+        _INGEST_POOL.shutdown(wait=False, cancel_futures=True)
+    _INGEST_POOL = None
+
+
+def frame_to_ipc(df):
+    """DataFrame'i Arrow IPC stream baytlarına çevirir."""
+    table = to_arrow_table(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def frame_from_ipc(data):
+    return pa.ipc.open_stream(data).read_all().to_pandas()
+
+
+def _ingest_worker(file_bytes, source, process_type, mapping_config):
+    """Alt süreçte çalışır: dosyayı okuyup normalize eder, sonucu Arrow IPC olarak döndürür."""
+    df, report = parse_upload_bytes(file_bytes, source, process_type, mapping_config)
+    return frame_to_ipc(df), report
+
+
+@timed("upload_ingest")
+def ingest_uploads(uploads, mapping_config=ADVANCED_MAPPING):
+    """
+    Birden fazla dosyayı paralel okur. uploads: [(uploaded_file, source, process_type)]
+    Dönüş: her dosya için {"source", "process_type", "df", "report", "error"} sözlüğü (aynı sırayla).
+    Hata veren dosya diğerlerini durdurmaz; hatası kendi kaydında döner. Okunamayan dosyanın
+    hatası da önbelleğe alınır (çöken çalışan süreç gibi geçici hatalar hariç).
+    """
+    results = []
+    pending = []
+    for uploaded_file, source, process_type in uploads:
+        key = ingest_cache_key(upload_hash(uploaded_file), source, process_type, mapping_config)
+        result = {"name": getattr(uploaded_file, "name", f"{source} {process_type}"),
+                  "source": source, "process_type": process_type, "df": None, "report": None, "error": None}
+        cached = _INGEST_CACHE.get(key)
+        if cached is None:
+            pending.append((result, key, uploaded_file.getvalue()))
+        elif cached[0] is None:
+            result["error"] = cached[1]["error"]
+        else:
+            result["df"], result["report"] = cached
+        results.append(result)
+
+    def _store(result, key, df, report):
+        cached = (df, dict(report, file_hash=key[0]))
+        _INGEST_CACHE.put(key, cached)
+        result["df"], result["report"] = cached
+
+    def _fail(result, key, error):
+        _INGEST_CACHE.put(key, _cached_failure(str(error)))
+        result["error"] = str(error)
+
+    # Tek dosya için süreç açmaya değmez
+    if len(pending) == 1:
+        result, key, file_bytes = pending[0]
+        try:
+            _store(result, key, *parse_upload_bytes(file_bytes, result["source"], result["process_type"],
+                                                    mapping_config))
+        except Exception as e:
+            _fail(result, key, e)
+        return results
+
+    if pending:
+        pool = _get_ingest_pool()
+        futures = [
+            (result, key, pool.submit(_ingest_worker, file_bytes, result["source"], result["process_type"],
+                                      mapping_config))
+            for result, key, file_bytes in pending
+        ]
+        for result, key, future in futures:
+            try:
+                data, report = future.result()
+                _store(result, key, frame_from_ipc(data), report)
+            except BrokenProcessPool as e:
+                _reset_ingest_pool()
+                result["error"] = f"Çalışan süreç çöktü: {e}"
+            except Exception as e:
+                _fail(result, key, e)
+
+    return results
+
+
+# ----------------------------------------------------------------------
+# 💾 KAYITLI VERİ DEPOSU
+# ----------------------------------------------------------------------
+
+STORE = DatasetStore()
+MERGED_COLUMNS = STANDARD_COLUMNS + ["product_currency"]
+# Analiz sayfasının (küp, müşteri birleştirme, mutabakat, filtreler) okuduğu sütunlar;
+# kalanlar yalnızca ham veri dışa aktarılırken okunur
+ANALYSIS_COLUMNS = [
+    "source", "process_type", "order_id", "customer_id", "customer_name", "amount", "total_price",
+    "payment_method", "order_date", "partner_mc", "margin", "product_currency",
+]
+_STORE_CACHE = LRUCache(max_entries=4)
+
+
+def load_stored_dataset(months=None, columns=ANALYSIS_COLUMNS):
+    """Depodaki birleşik verinin istenen sütunlarını (istenen aylar için) okur; depo değişmedikçe önbellekten döner."""
+    key = (STORE.version(), tuple(months or ()), tuple(columns))
+    cached = _STORE_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    with stage("store_load"):
+        df = STORE.load(columns=columns, months=months)
+    df = df[[col for col in columns if col in df.columns]]
+    _STORE_CACHE.put(key, df)
+    return df
+
+
+def load_stored_export(months, start_date, end_date, payment_methods):
+    """
+    Ham veri dışa aktarımı için depodaki tüm sütunları okur ve analizdeki tarih / ödeme
+    filtrelerini uygular. Yalnızca dosya hazırlanırken çağrılır; sonuç önbelleğe alınmaz.
+    """
+    with stage("store_load"):
+        df = STORE.load(columns=MERGED_COLUMNS, months=months)
+    df = df[[col for col in MERGED_COLUMNS if col in df.columns]]
+    df = df.sort_values("order_date", kind="stable", na_position="last").reset_index(drop=True)
+    keep = np.ones(len(df), dtype=bool)
+    if start_date and end_date:
+        days = df["order_date"].dt.normalize()
+        keep &= ((days >= pd.Timestamp(start_date)) & (days <= pd.Timestamp(end_date))).to_numpy()
+    if payment_methods:
+        keep &= df["payment_method"].isin(payment_methods).to_numpy()
+    return df[keep]
+
+
+# ----------------------------------------------------------------------
+# 🗂️ BİRLEŞİK VERİ ÖNBELLEĞİ (TARİHE GÖRE İNDEKSLİ)
+# ----------------------------------------------------------------------
+
+# Birleştirme her yeniden çalıştırmada tekrarlanmaz. Veri bir kez order_date'e
+# göre sıralanır; tarih filtresi ikili arama ile bir dilime dönüşür.
+_MERGED_CACHE = LRUCache(max_entries=4)
+
+
+def get_indexed_dataset(dataset_key, build):
+    """
+    build() -> birleşik df. Sonuç veri seti anahtarıyla saklanır.
+    Dönüş: {"index": DateIndex, "payment_methods": filtre seçenekleri}
+    """
+    def _index():
+        df = build()
+        return {
+            "index": DateIndex(df, "order_date"),
+            "payment_methods": sorted(df["payment_method"].dropna().unique().tolist()),
+        }
+
+    return _MERGED_CACHE.get_or_create(dataset_key, _index)
+
+
+def prepare_upload_dataset(uploads, mapping_config=ADVANCED_MAPPING):
+    """
+    Arka plan işi: dosyaları okuyup birleştirir ve indeksli veri setini önbelleğe koyar.
+    İş bitince sayfadaki ingest_uploads / get_indexed_dataset çağrıları önbellekten döner.
+    """
+    jobs.report_progress(0.05, f"{len(uploads)} dosya okunuyor...")
+    ingested = ingest_uploads(uploads, mapping_config)
+    ok = [item for item in ingested if not item["error"]]
+    if ok:
+        jobs.report_progress(0.7, "Dosyalar birleştiriliyor ve indeksleniyor...")
+        file_keys = tuple((item["report"]["file_hash"], item["source"], item["process_type"]) for item in ok)
+        get_indexed_dataset(("upload", file_keys), lambda: merge_dataframes([item["df"] for item in ok]))
+    return {"files": len(ok), "errors": len(ingested) - len(ok)}
+
+
+# ----------------------------------------------------------------------
+# 🖼️ GRAFİKLER (İSTEK ÜZERİNE ÇİZİM + PNG ÖNBELLEĞİ)
+# ----------------------------------------------------------------------
+
+# Grafikler yalnızca bölümü açıkken veya PDF istendiğinde çizilir. Çizilen PNG
+# (küp anahtarı, bölüm, metrik, grafik tipi) ile saklanır. Figürler pyplot'a kaydedilmeyen
+# Figure nesneleridir; kapatılmaları gerekmez ve PDF için iş parçacıklarında paralel çizilebilir.
+CHART_CACHE_MAX_ENTRIES = 48
+_CHART_CACHE = LRUCache(max_entries=CHART_CACHE_MAX_ENTRIES)
+
+
+def render_chart_png(cache_key, draw_func, *args):
+    """draw_func(*args) ile çizilen grafiğin PNG baytlarını (önbellekten) döndürür."""
+    return _CHART_CACHE.get_or_create(cache_key, timed("chart_render")(lambda: rasterize(draw_func, *args)))
+
+
+def draw_daily_trend(daily_sales, daily_purchase):
+    fig_line = Figure(figsize=(10, 5))
+    ax_line = fig_line.subplots()
+
+    if not daily_sales.empty:
+        daily_sales.plot(kind="line", ax=ax_line, marker="o", color="green", linewidth=2, label="Sell")
+
+    if not daily_purchase.empty:
+        daily_purchase.plot(kind="line", ax=ax_line, marker="o", color="red", linewidth=2, linestyle="--",
+                            label="Buy")
+
+    ax_line.set_title("Günlük Ciro Karşılaştırması (Buy vs Sell)")
+    ax_line.set_ylabel("Tutar (TL)")
+    ax_line.set_xlabel("Tarih")
+    ax_line.grid(True, linestyle="--", alpha=0.5)
+    ax_line.legend()
+    ax_line.tick_params(axis="x", rotation=45)
+    fig_line.tight_layout()
+    return fig_line
+
+
+def draw_day_of_week(pivot_dow):
+    fig_dow = Figure(figsize=(10, 5))
+    ax_dow = fig_dow.subplots()
+
+    x_indexes = np.arange(len(pivot_dow.index))
+    width = 0.35
+
+    ax_dow.bar(x_indexes + width / 2, pivot_dow["Sell"], width, label="Sell", color="green")
+    ax_dow.bar(x_indexes - width / 2, pivot_dow["Buy"], width, label="Buy", color="red")
+
+    ax_dow.set_title("Haftanın Günlerine Göre Dağılım (Buy vs Sell)")
+    ax_dow.set_ylabel("Tutar (TL)")
+    ax_dow.set_xticks(x_indexes)
+    ax_dow.set_xticklabels(pivot_dow.index, rotation=45)
+    ax_dow.legend()
+    fig_dow.tight_layout()
+    return fig_dow
+
+
+def draw_breakdown(chart_data, chart_type, bar_title, pie_title, ylabel_text, color_bar, pie_colors, startangle,
+                   rotate_labels):
+    """Partner / ödeme yöntemi için çubuk veya pasta grafiği."""
+    fig = Figure(figsize=(8, 4))
+    ax = fig.subplots()
+
+    if chart_type == "Çubuk (Bar)":
+        chart_data.plot(kind="bar", ax=ax, color=color_bar)
+        ax.set_ylabel(ylabel_text)
+        ax.set_title(bar_title)
+        if rotate_labels:
+            plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
+        else:
+            ax.tick_params(axis="x", rotation=0)
+    else:
+        ax.pie(chart_data, labels=chart_data.index, autopct='%1.1f%%', startangle=startangle, colors=pie_colors)
+        ax.set_title(pie_title)
+
+    fig.tight_layout()
+    return fig
+
+
+def draw_top_bar(chart_data, title, ylabel_text, color_bar):
+    """Müşteri / ürün Top 10 çubuk grafiği."""
+    fig = Figure(figsize=(8, 4))
+    ax = fig.subplots()
+    chart_data.plot(kind="bar", ax=ax, color=color_bar)
+    ax.set_ylabel(ylabel_text)
+    ax.set_title(title)
+    plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
+    fig.tight_layout()
+    return fig
+
+
+def chart_section(cache_key, toggle_key, draw_func, *args):
+    """
+    Bölüm açıksa grafiği (önbellekten) gösterir. PDF için grafik tanımını döndürür;
+    gizli bölümlerin grafikleri PDF istendiğinde paralel çizilir.
+    """
+    if st.toggle("Grafiği göster", value=True, key=toggle_key):
+        st.image(render_chart_png(cache_key, draw_func, *args), use_container_width=True)
+    return cache_key, draw_func, args
 
 
 # ----------------------------------------------------------------------
@@ -219,43 +748,116 @@ def run():
     st.set_page_config(page_title="DB Merge", page_icon="🗂️", layout="centered")
     st.title("🗂️ DB Merge – Dosya Birleştirme ve Raporlama")
 
-    # --- Dosyaları Yükle ---
-    st.header("📥 Dosyaları Yükle")
-
-    tr_purchase_file = st.file_uploader("TR Buy", type=["xlsx"], key="tr_purchase")
-    mc_purchase_file = st.file_uploader("MC Buy", type=["xlsx"], key="mc_purchase")
-    tr_sales_file = st.file_uploader("TR Sell", type=["xlsx"], key="tr_sales")
-    mc_sales_file = st.file_uploader("MC Sell", type=["xlsx"], key="mc_sales")
-
-    dataframes = []
-
-    # NOT: Artık tek bir "ADVANCED_MAPPING" kullanıyoruz.
-    # Kod akıllı olduğu için hangi sütunu görürse onu alacak.
-    if tr_purchase_file: dataframes.append(
-        normalize_dataframe(pd.read_excel(tr_purchase_file, engine="openpyxl"), ADVANCED_MAPPING, "TR", "Buy"))
-    if mc_purchase_file: dataframes.append(
-        normalize_dataframe(pd.read_excel(mc_purchase_file, engine="openpyxl"), ADVANCED_MAPPING, "MC", "Buy"))
-    if tr_sales_file: dataframes.append(
-        normalize_dataframe(pd.read_excel(tr_sales_file, engine="openpyxl"), ADVANCED_MAPPING, "TR", "Sell"))
-    if mc_sales_file: dataframes.append(
-        normalize_dataframe(pd.read_excel(mc_sales_file, engine="openpyxl"), ADVANCED_MAPPING, "MC", "Sell"))
-
-    if dataframes:
-        merged_df = pd.concat(dataframes, ignore_index=True)
-        merged_df = clean_merged_ids(merged_df)
-
-        # 🆕 YENİ EKLENEN: ÖDEME YÖNTEMİ STANDARTLAŞTIRMA MANTIĞI
-        if "payment_method" in merged_df.columns:
-            merged_df["payment_method"] = merged_df["payment_method"].apply(
-                lambda x: standardize_payment_method(x, PAYMENT_MAPPING)
-            )
-
-        merged_df = merged_df.assign(
-            product_currency=lambda df: df["product_name"].astype(str) + " / " + df["currency"].astype(str))
-
-        if "order_date" in merged_df.columns:
-            merged_df["order_date"] = pd.to_datetime(merged_df["order_date"], errors='coerce')
+    data_mode = st.radio("Veri Kaynağı:", ["📥 Dosya Yükle", "💾 Kayıtlı Veri"], horizontal=True, key="rb_data_mode")
+    merged_df = None
+    dataset_key = None
+
+    if data_mode == "📥 Dosya Yükle":
+        # --- Dosyaları Yükle ---
+        st.header("📥 Dosyaları Yükle")
+
+        tr_purchase_file = st.file_uploader("TR Buy", type=["xlsx"], key="tr_purchase")
+        mc_purchase_file = st.file_uploader("MC Buy", type=["xlsx"], key="mc_purchase")
+        tr_sales_file = st.file_uploader("TR Sell", type=["xlsx"], key="tr_sales")
+        mc_sales_file = st.file_uploader("MC Sell", type=["xlsx"], key="mc_sales")
+
+        # Ek dosyalar: her biri için kaynak ve işlem tipi seçilir
+        extra_files = st.file_uploader("➕ Ek Dosyalar", type=["xlsx"], accept_multiple_files=True, key="extra_files")
+        extra_uploads = []
+        for i, extra_file in enumerate(extra_files or []):
+            col_e1, col_e2 = st.columns(2)
+            with col_e1:
+                extra_source = st.selectbox(f"{extra_file.name} – Kaynak", ["TR", "MC"], key=f"extra_source_{i}")
+            with col_e2:
+                extra_process = st.selectbox(f"{extra_file.name} – İşlem Tipi", ["Buy", "Sell"],
+                                             key=f"extra_process_{i}")
+            extra_uploads.append((extra_file, extra_source, extra_process))
+
+        dataframes = []
+
+        # NOT: Artık tek bir "ADVANCED_MAPPING" kullanıyoruz.
+        # Kod akıllı olduğu için hangi sütunu görürse onu alacak.
+        # Normalize edilmiş tablolar önbellekten gelir, yeniden çalıştırmalarda Excel tekrar okunmaz.
+        # Önbellekte olmayan dosyalar paralel süreçlerde okunur.
+        uploads = [
+            (tr_purchase_file, "TR", "Buy"),
+            (mc_purchase_file, "MC", "Buy"),
+            (tr_sales_file, "TR", "Sell"),
+            (mc_sales_file, "MC", "Sell"),
+        ]
+        uploads = [upload for upload in uploads if upload[0]] + extra_uploads
+
+        header_reports = {}
+        file_keys = []
+        ingested = []
+        if uploads:
+            # Okuma ve birleştirme arka planda; sonuç süreç önbelleklerinde tutulduğu için diske yazılmaz
+            # Tüm dosyalar önbellekteyse iş açılmaz; önbellekten düşen dosya varsa iş yeniden çalışır
+            if uploads_cached(uploads):
+                ingested = ingest_uploads(uploads)
+            else:
+                upload_key = [(upload_hash(f), source, process_type) for f, source, process_type in uploads]
+                job = jobs.submit("db_merge", f"DB Merge · {len(uploads)} dosya", prepare_upload_dataset, uploads,
+                                  key=upload_key, persist=False)
+                if jobs.job_status(job):
+                    ingested = ingest_uploads(uploads)
+        for item in ingested:
+            label = f"{item['source']} {item['process_type']} ({item['name']})"
+            if item["error"]:
+                st.error(f"❌ {label} okunamadı: {item['error']}")
+                continue
+            dataframes.append(item["df"])
+            file_keys.append((item["report"]["file_hash"], item["source"], item["process_type"]))
+            if item["report"]["unmatched"]:
+                header_reports[label] = item["report"]["unmatched"]
+            if item["report"]["unparseable"]:
+                counts = ", ".join(f"{col}: {count}" for col, count in item["report"]["unparseable"].items())
+                st.warning(f"⚠️ {label} – sayıya çevrilemeyen hücreler boş bırakıldı ({counts})")
+
+        if header_reports:
+            with st.expander("ℹ️ Eşleşmeyen Sütun Başlıkları"):
+                for label, headers in header_reports.items():
+                    st.write(f"**{label}:** {', '.join(headers)}")
+
+        if dataframes:
+            dataset = get_indexed_dataset(("upload", tuple(file_keys)), lambda: merge_dataframes(dataframes))
+            merged_df = dataset["index"].frame
+            dataset_key = ("upload", tuple(file_keys))
+
+            col_s1, col_s2 = st.columns(2)
+            with col_s1:
+                if st.button("💾 Veriyi Depoya Kaydet"):
+                    written = STORE.write(merged_df)
+                    st.success(f"✅ {len(written)} bölüm kaydedildi.")
+            with col_s2:
+                if st.button("➕ Yeni Kayıtları Ekle (Artımlı)"):
+                    result = STORE.append(merged_df)
+                    st.success(f"✅ Yeni: {result['new']} | Değişen: {result['changed']} | "
+                               f"Zaten kayıtlı: {result['unchanged']}")
+
+    else:
+        # --- Kayıtlı Veri ---
+        st.header("💾 Kayıtlı Veri")
+
+        if STORE.is_empty():
+            st.info("Depoda kayıtlı veri yok. Önce dosya yükleyip kaydedin.")
+        else:
+            available_months = STORE.months()
+            selected_months = st.multiselect("📆 Aylar (boş = tümü):", available_months)
+            dataset_key = ("store", hash(STORE.version()), tuple(selected_months))
+            dataset = get_indexed_dataset(dataset_key, lambda: load_stored_dataset(selected_months))
+            merged_df = dataset["index"].frame
+            st.caption(f"Depodan {len(merged_df)} kayıt okundu.")
+
+            daily_agg = STORE.load_aggregates().get("daily")
+            if daily_agg is not None and not daily_agg.empty:
+                with st.expander("📊 Depo Geneli Günlük Toplamlar"):
+                    st.dataframe(
+                        daily_agg.pivot_table(index="day", columns="process_type", values="total_price", aggfunc="sum"),
+                        use_container_width=True,
+                    )
 
+    if merged_df is not None and not merged_df.empty:
         # --- FİLTRELEME ALANI ---
         st.markdown("---")
         st.subheader("🔍 Detaylı Filtreleme")
@@ -266,24 +868,25 @@ def run():
         with col_date2:
             end_date = st.date_input("Bitiş Tarihi", value=None)
 
-        available_payment_methods = sorted(merged_df["payment_method"].dropna().unique().tolist())
+        available_payment_methods = dataset["payment_methods"]
         selected_payment_methods = st.multiselect(
             "💳 Ödeme Yöntemi Seçiniz:",
             available_payment_methods
         )
 
-        # Filtreleri Uygula
+        # Filtreleri Uygula (tarih: sıralı veride ikili arama ile dilim)
+        date_index = dataset["index"]
+        day_keys = date_index.day_keys
         if start_date and end_date:
-            start_ts = pd.to_datetime(start_date)
-            end_ts = pd.to_datetime(end_date) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-            merged_df = merged_df[
-                (merged_df["order_date"] >= start_ts) &
-                (merged_df["order_date"] <= end_ts)
-                ]
+            lo, hi = date_index.bounds(start_date, end_date)
+            merged_df = date_index.frame.iloc[lo:hi]
+            day_keys = day_keys[lo:hi]
             st.info(f"📅 Tarih Filtresi: **{start_date}** - **{end_date}**")
 
         if selected_payment_methods:
-            merged_df = merged_df[merged_df["payment_method"].isin(selected_payment_methods)]
+            keep = merged_df["payment_method"].isin(selected_payment_methods).to_numpy()
+            merged_df = merged_df[keep]
+            day_keys = day_keys[keep]
             st.info(f"💳 Seçilen Ödeme Yöntemleri: **{', '.join(selected_payment_methods)}**")
 
         if not (start_date and end_date) and not selected_payment_methods:
@@ -291,21 +894,24 @@ def run():
 
         st.success(f"🎉 **Analiz Hazır!** Gösterilen Kayıt Sayısı: **{len(merged_df)}**")
 
+        # Tüm grafik ve tablolar bu küpten beslenir; metrik/grafik tipi değişince yeniden hesaplanmaz
+        cube_key = (dataset_key, start_date, end_date, tuple(selected_payment_methods))
+        cube = get_aggregate_cube(cube_key, merged_df, day_keys)
+        facts = cube["facts"]
+
         # --- ÖZET BİLGİLER ---
         st.subheader("📈 Özet Bilgiler")
 
-        total_purchase_val = merged_df[merged_df["process_type"] == "Buy"]["total_price"].sum()
-        total_sales_val = merged_df[merged_df["process_type"] == "Sell"]["total_price"].sum()
+        summary = cube_summary(facts)
+        total_purchase_val = summary["total_purchase"]
+        total_sales_val = summary["total_sales"]
         diff_val = total_sales_val - total_purchase_val
-        total_amount = merged_df["amount"].sum()
-        avg_margin = merged_df["margin"].mean()
+        total_amount = summary["total_amount"]
+        avg_margin = summary["avg_margin"]
 
         # AOV Hesabı
-        sales_txn_count = len(merged_df[merged_df["process_type"] == "Sell"])
-        aov_sales = total_sales_val / sales_txn_count if sales_txn_count > 0 else 0
-
-        purchase_txn_count = len(merged_df[merged_df["process_type"] == "Buy"])
-        aov_purchase = total_purchase_val / purchase_txn_count if purchase_txn_count > 0 else 0
+        aov_sales = summary["aov_sales"]
+        aov_purchase = summary["aov_purchase"]
 
         # Satır 1
         col1, col2, col3 = st.columns(3)
@@ -332,10 +938,10 @@ def run():
             "Toplam Buy": f"{total_purchase_val:,.2f} TL",
             "Toplam Sell": f"{total_sales_val:,.2f} TL",
             "Fark": f"{diff_val:,.2f} TL",
-            "Urun Miktari": f"{total_amount:,.0f}",
+            "Ürün Miktarı": f"{total_amount:,.0f}",
             "Margin": f"%{avg_margin:,.2f}",
             "Ortalama Sepet (Sell)": f"{aov_sales:,.2f} TL",
-            "Ortalama Islem (Buy)": f"{aov_purchase:,.2f} TL"
+            "Ortalama İşlem (Buy)": f"{aov_purchase:,.2f} TL"
         }
 
         pdf_figures = []
@@ -346,33 +952,15 @@ def run():
         st.markdown("---")
         st.subheader("📈 Zaman İçindeki İşlem Trendi (Buy vs Sell)")
 
-        sales_data = merged_df[merged_df["process_type"] == "Sell"].copy()
-        purchase_data = merged_df[merged_df["process_type"] == "Buy"].copy()
+        sales_data = facts[facts["process_type"] == "Sell"]
+        purchase_data = facts[facts["process_type"] == "Buy"]
 
         if not sales_data.empty or not purchase_data.empty:
-            fig_line, ax_line = plt.subplots(figsize=(10, 5))
-
-            if not sales_data.empty:
-                sales_data["day_only"] = sales_data["order_date"].dt.date
-                daily_sales = sales_data.groupby("day_only")["total_price"].sum()
-                daily_sales.plot(kind="line", ax=ax_line, marker="o", color="green", linewidth=2, label="Sell")
-
-            if not purchase_data.empty:
-                purchase_data["day_only"] = purchase_data["order_date"].dt.date
-                daily_purchase = purchase_data.groupby("day_only")["total_price"].sum()
-                daily_purchase.plot(kind="line", ax=ax_line, marker="o", color="red", linewidth=2, linestyle="--",
-                                    label="Buy")
-
-            ax_line.set_title("Günlük Ciro Karşılaştırması (Buy vs Sell)")
-            ax_line.set_ylabel("Tutar (TL)")
-            ax_line.set_xlabel("Tarih")
-            ax_line.grid(True, linestyle="--", alpha=0.5)
-            ax_line.legend()
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            st.pyplot(fig_line)
-
-            pdf_figures.append(("Zaman Bazli Trend", fig_line))
+            daily_sales = sales_data.groupby(sales_data["day"].dt.date)["total"].sum()
+            daily_purchase = purchase_data.groupby(purchase_data["day"].dt.date)["total"].sum()
+
+            chart_line = chart_section((cube_key, "line"), "tg_line", draw_daily_trend, daily_sales, daily_purchase)
+            pdf_figures.append(("Zaman Bazlı Trend", chart_line))
         else:
             st.warning("Grafik için veri yok.")
 
@@ -381,38 +969,24 @@ def run():
         # =========================================================================
         st.subheader("📅 Haftanın Günleri Analizi (Buy vs Sell)")
 
-        analysis_df = merged_df.copy()
+        analysis_df = facts
 
         if not analysis_df.empty:
-            analysis_df["day_of_week"] = analysis_df["order_date"].dt.dayofweek
+            analysis_df = analysis_df.assign(day_of_week=analysis_df["day"].dt.dayofweek)
 
             day_map = {
                 0: "Pazartesi", 1: "Salı", 2: "Çarşamba", 3: "Perşembe",
                 4: "Cuma", 5: "Cumartesi", 6: "Pazar"
             }
 
-            pivot_dow = analysis_df.groupby(["day_of_week", "process_type"])["total_price"].sum().unstack(fill_value=0)
+            pivot_dow = analysis_df.groupby(["day_of_week", "process_type"])["total"].sum().unstack(fill_value=0)
             pivot_dow.index = pivot_dow.index.map(day_map)
 
             if "Buy" not in pivot_dow.columns: pivot_dow["Buy"] = 0
             if "Sell" not in pivot_dow.columns: pivot_dow["Sell"] = 0
 
-            fig_dow, ax_dow = plt.subplots(figsize=(10, 5))
-
-            x_indexes = np.arange(len(pivot_dow.index))
-            width = 0.35
-
-            ax_dow.bar(x_indexes + width / 2, pivot_dow["Sell"], width, label="Sell", color="green")
-            ax_dow.bar(x_indexes - width / 2, pivot_dow["Buy"], width, label="Buy", color="red")
-
-            ax_dow.set_title("Haftanın Günlerine Göre Dağılım (Buy vs Sell)")
-            ax_dow.set_ylabel("Tutar (TL)")
-            ax_dow.set_xticks(x_indexes)
-            ax_dow.set_xticklabels(pivot_dow.index, rotation=45)
-            ax_dow.legend()
-
-            st.pyplot(fig_dow)
-            pdf_figures.append(("Haftanin Gunleri (Buy vs Sell)", fig_dow))
+            chart_dow = chart_section((cube_key, "dow"), "tg_dow", draw_day_of_week, pivot_dow)
+            pdf_figures.append(("Haftanın Günleri (Buy vs Sell)", chart_dow))
         else:
             st.info("Analiz için veri bulunamadı.")
 
@@ -428,7 +1002,7 @@ def run():
             partner_chart_type = st.radio("Grafik Tipi:", ["Çubuk (Bar)", "Pasta (Pie)"], key="rb_partner",
                                           horizontal=True)
 
-        partner_agg = merged_df.groupby("partner_mc").agg(count=("order_id", "count"), total=("total_price", "sum"))
+        partner_agg = facts.groupby("partner_mc")[["count", "total"]].sum()
 
         if partner_metric == "İşlem Adedi":
             partner_agg = partner_agg.sort_values(by="count", ascending=False)
@@ -442,20 +1016,12 @@ def run():
             color_bar = "steelblue"
 
         if not partner_agg.empty:
-            fig_p, ax_p = plt.subplots(figsize=(8, 4))
-
-            if partner_chart_type == "Çubuk (Bar)":
-                chart_data.plot(kind="bar", ax=ax_p, color=color_bar)
-                ax_p.set_ylabel(ylabel_text)
-                ax_p.set_title(f"Partner Bazlı - {partner_metric}")
-                plt.xticks(rotation=0)
-            else:
-                ax_p.pie(chart_data, labels=chart_data.index, autopct='%1.1f%%', startangle=90,
-                         colors=plt.cm.Paired.colors)
-                ax_p.set_title(f"Partner Dağılımı ({partner_metric})")
-
-            st.pyplot(fig_p)
-            pdf_figures.append((f"Partner Analizi ({partner_metric})", fig_p))
+            chart_partner = chart_section(
+                (cube_key, "partner", partner_metric, partner_chart_type), "tg_partner", draw_breakdown,
+                chart_data, partner_chart_type, f"Partner Bazlı - {partner_metric}",
+                f"Partner Dağılımı ({partner_metric})", ylabel_text, color_bar, plt.cm.Paired.colors, 90, False,
+            )
+            pdf_figures.append((f"Partner Analizi ({partner_metric})", chart_partner))
 
             partner_display = partner_agg.copy()
             partner_display.columns = ["İşlem Adedi", "Toplam Tutar (TL)"]
@@ -477,7 +1043,7 @@ def run():
             payment_chart_type = st.radio("Grafik Tipi:", ["Çubuk (Bar)", "Pasta (Pie)"], key="rb_payment",
                                           horizontal=True)
 
-        payment_agg = merged_df.groupby("payment_method").agg(count=("order_id", "count"), total=("total_price", "sum"))
+        payment_agg = facts.groupby("payment_method")[["count", "total"]].sum()
 
         if payment_metric == "İşlem Adedi":
             payment_agg = payment_agg.sort_values(by="count", ascending=False)
@@ -491,21 +1057,12 @@ def run():
             color_bar = "darkred"
 
         if not payment_agg.empty:
-            fig_pm, ax_pm = plt.subplots(figsize=(8, 4))
-
-            if payment_chart_type == "Çubuk (Bar)":
-                chart_data.plot(kind="bar", ax=ax_pm, color=color_bar)
-                ax_pm.set_ylabel(ylabel_text)
-                ax_pm.set_title(f"Ödeme Yöntemi - {payment_metric}")
-                plt.setp(ax_pm.get_xticklabels(), rotation=45, ha="right")
-            else:
-                ax_pm.pie(chart_data, labels=chart_data.index, autopct='%1.1f%%', startangle=140,
-                          colors=plt.cm.Pastel1.colors)
-                ax_pm.set_title(f"Ödeme Yöntemi Dağılımı ({payment_metric})")
-
-            plt.tight_layout()
-            st.pyplot(fig_pm)
-            pdf_figures.append((f"Odeme Yontemi ({payment_metric})", fig_pm))
+            chart_payment = chart_section(
+                (cube_key, "payment", payment_metric, payment_chart_type), "tg_payment", draw_breakdown,
+                chart_data, payment_chart_type, f"Ödeme Yöntemi - {payment_metric}",
+                f"Ödeme Yöntemi Dağılımı ({payment_metric})", ylabel_text, color_bar, plt.cm.Pastel1.colors, 140, True,
+            )
+            pdf_figures.append((f"Ödeme Yöntemi ({payment_metric})", chart_payment))
 
             payment_display = payment_agg.copy()
             payment_display.columns = ["İşlem Adedi", "Toplam Tutar (TL)"]
@@ -524,8 +1081,13 @@ def run():
         # --- MÜŞTERİ ---
         st.subheader("👤 En Çok İşlem Yapan Müşteriler (Top 10)")
         customer_metric = st.selectbox("Grafik Kriteri:", ["İşlem Adedi", "Toplam Harcama (TL)"], key="sb_customer")
+        resolve_customers = st.toggle("🧬 Aynı müşterinin farklı yazımlarını birleştir", value=False,
+                                      key="tg_resolve_customers")
 
-        cust_agg = merged_df.groupby("customer_name").agg(count=("order_id", "count"), total=("total_price", "sum"))
+        if resolve_customers:
+            cust_agg = get_resolved_customers(cube_key, merged_df)
+        else:
+            cust_agg = cube["customers"]
 
         if customer_metric == "İşlem Adedi":
             cust_agg = cust_agg.sort_values(by="count", ascending=False).head(10)
@@ -539,14 +1101,11 @@ def run():
             color_bar = "darkgreen"
 
         if not cust_agg.empty:
-            fig_cust, ax_cust = plt.subplots(figsize=(8, 4))
-            chart_data.plot(kind="bar", ax=ax_cust, color=color_bar)
-            ax_cust.set_ylabel(ylabel_text)
-            ax_cust.set_title(f"Müşteri (Top 10) - {customer_metric}")
-            plt.setp(ax_cust.get_xticklabels(), rotation=45, ha="right")
-            plt.tight_layout()
-            st.pyplot(fig_cust)
-            pdf_figures.append(("Musteri Top 10", fig_cust))
+            chart_cust = chart_section(
+                (cube_key, "customer", customer_metric, resolve_customers), "tg_customer", draw_top_bar,
+                chart_data, f"Müşteri (Top 10) - {customer_metric}", ylabel_text, color_bar,
+            )
+            pdf_figures.append(("Müşteri Top 10", chart_cust))
 
             cust_display = cust_agg.copy()
             cust_display.columns = ["İşlem Adedi", "Toplam Harcama (TL)"]
@@ -560,7 +1119,7 @@ def run():
         st.subheader("🛒 En Çok Satılan Ürünler (Top 10)")
         product_metric = st.selectbox("Grafik Kriteri:", ["Satış Miktarı (Qty)", "Toplam Ciro (TL)"], key="sb_product")
 
-        prod_agg = merged_df.groupby("product_currency").agg(amount=("amount", "sum"), total=("total_price", "sum"))
+        prod_agg = cube["products"]
 
         if product_metric == "Satış Miktarı (Qty)":
             prod_agg = prod_agg.sort_values(by="amount", ascending=False).head(10)
@@ -574,14 +1133,11 @@ def run():
             color_bar = "indigo"
 
         if not prod_agg.empty:
-            fig_prod, ax_prod = plt.subplots(figsize=(8, 4))
-            chart_data.plot(kind="bar", ax=ax_prod, color=color_bar)
-            ax_prod.set_ylabel(ylabel_text)
-            ax_prod.set_title(f"Ürün (Top 10) - {product_metric}")
-            plt.setp(ax_prod.get_xticklabels(), rotation=45, ha="right")
-            plt.tight_layout()
-            st.pyplot(fig_prod)
-            pdf_figures.append(("Urun Top 10", fig_prod))
+            chart_prod = chart_section(
+                (cube_key, "product", product_metric), "tg_product", draw_top_bar,
+                chart_data, f"Ürün (Top 10) - {product_metric}", ylabel_text, color_bar,
+            )
+            pdf_figures.append(("Ürün Top 10", chart_prod))
 
             prod_display = prod_agg.copy()
             prod_display.columns = ["Satış Miktarı", "Toplam Ciro (TL)"]
@@ -591,6 +1147,47 @@ def run():
         else:
             st.info("Veri yok.")
 
+        # =========================================================================
+        # 5. TR ↔ MC MUTABAKAT
+        # =========================================================================
+        st.markdown("---")
+        st.header("🔁 TR ↔ MC Mutabakat")
+        st.caption("Siparişler önce işlem tipi + sipariş numarası ile eşlenir; numarası tutmayanlar için "
+                   "aynı müşteri, aynı gün ve tutar toleransı ile yedek eşleştirme yapılır.")
+
+        if st.toggle("Mutabakatı göster", value=False, key="tg_recon"):
+            col_r1, col_r2 = st.columns(2)
+            with col_r1:
+                amount_tolerance = st.number_input("Tutar toleransı (TL)", min_value=0.0,
+                                                   value=DEFAULT_AMOUNT_TOLERANCE, step=0.01, format="%.2f")
+            with col_r2:
+                use_fallback = st.checkbox("Yedek eşleştirme (müşteri + gün + tutar)", value=True)
+
+            with st.spinner("Kaynaklar eşleştiriliyor..."):
+                recon = get_reconciliation(cube_key, merged_df, amount_tolerance, use_fallback)
+
+            recon_labels = {
+                "matched": "✅ Eşleşen",
+                "amount_mismatch": "⚠️ Tutar Farkı",
+                "missing_right": "❌ MC'de Yok (yalnız TR)",
+                "missing_left": "❌ TR'de Yok (yalnız MC)",
+            }
+            recon_cols = st.columns(4)
+            for col, (name, label) in zip(recon_cols, recon_labels.items()):
+                col.metric(label, f"{len(recon[name]):,}")
+
+            for tab, (name, label) in zip(st.tabs(list(recon_labels.values())), recon_labels.items()):
+                with tab:
+                    result = recon[name]
+                    if result.empty:
+                        st.info("Kayıt yok.")
+                        continue
+                    st.dataframe(result.head(1000), use_container_width=True)
+                    if len(result) > 1000:
+                        st.caption(f"İlk 1000 satır gösteriliyor (toplam {len(result):,}).")
+                    export_section((cube_key, amount_tolerance, use_fallback, name), result,
+                                   f"mutabakat_{name}", key=f"exp_recon_{name}")
+
         # =========================================================================
         # 📥 İNDİRME ALANI
         # =========================================================================
@@ -599,23 +1196,29 @@ def run():
 
         col_d1, col_d2 = st.columns(2)
 
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            merged_df.to_excel(writer, index=False)
         with col_d1:
-            st.download_button("📥 Excel Olarak İndir", output.getvalue(), "merged_data.xlsx",
-                               "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+            # Dosya yalnızca istenince üretilir; aynı veri ve filtreler için önbellekten gelir.
+            # Kayıtlı veride analiz budanmış sütunlarla çalışır, tüm sütunlar dosya hazırlanırken okunur.
+            export_df = merged_df
+            if data_mode == "💾 Kayıtlı Veri":
+                export_df = partial(load_stored_export, tuple(selected_months), start_date, end_date,
+                                    tuple(selected_payment_methods))
+            export_section(cube_key, export_df, "merged_data", key="exp_merged", rows=len(merged_df))
 
         with col_d2:
+            pdf_key = (config_hash(pdf_summary), [cache_key for _, (cache_key, _, _) in pdf_figures])
             if st.button("📄 PDF Raporu Oluştur"):
-                with st.spinner("PDF hazırlanıyor..."):
-                    pdf_bytes = create_pdf_report(pdf_summary, pdf_figures)
-                    st.download_button(
-                        label="⬇️ PDF'i İndir",
-                        data=pdf_bytes,
-                        file_name="Rapor.pdf",
-                        mime="application/pdf"
-                    )
+                # Gizli bölümlerin grafikleri de işte (önbellekten veya paralel olarak ilk kez) çizilir
+                jobs.submit("pdf", "PDF raporu", create_pdf_report, pdf_summary, pdf_figures, _CHART_CACHE,
+                            key=pdf_key)
+            pdf_job = jobs.latest("pdf", pdf_key)
+            if pdf_job is not None and jobs.job_status(pdf_job):
+                st.download_button(
+                    label="⬇️ PDF'i İndir",
+                    data=pdf_job.result,
+                    file_name="Rapor.pdf",
+                    mime="application/pdf"
+                )
 
     # --- FOOTER (YENİ EKLENEN İMZA) ---
     st.markdown("---")
@@ -0,0 +1,206 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+from perf import stage
+
+# =========================================================
+# Sıcak (Hazır) WebDriver Havuzu
+# =========================================================
+# ChromeDriverManager().install() her çağrıda sürüm sorgusu yapar (~1-2 sn) ve
+# her çalıştırmada yeni bir Chrome soğuk açılır (~10 sn). Burada sürücü yolu
+# süreç başına bir kez çözülür; tarayıcılar çalıştırmalar arasında çerez ve
+# depolama temizlenerek yeniden kullanılır. Hata veren, yanıt vermeyen veya
+# max_uses kez kullanılmış tarayıcı havuza geri konmaz, kapatılır (gerekirse öldürülür).
+
+POOL_SIZE = int(os.environ.get("BOT_POOL_SIZE", "2"))
+MAX_USES = 20
+IDLE_TIMEOUT = 15 * 60
+ACQUIRE_TIMEOUT = 120
+RESET_ORIGINS = ["https://market.staging.minted.com.tr"]
+
+_DRIVER_PATH = None
+_DRIVER_PATH_LOCK = threading.Lock()
+
+
+def chrome_options():
+    options = Options()
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=1920,1080")
+    return options
+
+
+def driver_path():
+    """chromedriver yolunu süreç başına bir kez çözer (BOT_CHROMEDRIVER ile sabitlenebilir)."""
+    global _DRIVER_PATH
+    with _DRIVER_PATH_LOCK:
+        if _DRIVER_PATH is None:
+            _DRIVER_PATH = os.environ.get("BOT_CHROMEDRIVER") or ChromeDriverManager().install()
+        return _DRIVER_PATH
+
+
+def create_driver():
+    return webdriver.Chrome(service=Service(driver_path()), options=chrome_options())
+
+
+def kill_driver(driver):
+    """Tarayıcıyı kapatır; quit() başarısız olursa chromedriver süreci öldürülür."""
+    try:
+        driver.quit()
+    except Exception as e:
+        logging.warning(f"WebDriver kapatılamadı, süreç öldürülüyor: {e}")
+        process = getattr(getattr(driver, "service", None), "process", None)
+        if process is not None:
+            process.kill()
+
+
+def reset_driver(driver, origins=RESET_ORIGINS):
+    """Bir sonraki çalıştırma temiz başlasın: çerezler, depolama ve önbellek temizlenir, boş sayfaya dönülür."""
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+    for origin in origins:
+        driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+    driver.get("about:blank")
+
+
+class _PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.last_used = time.monotonic()
+
+
+class DriverPool:
+    """
+    En fazla `size` tarayıcı. driver() bağlam yöneticisi boşta bir tarayıcı verir
+    (yoksa yenisini açar, sınıra ulaşıldıysa bekler). Blok hatasız biterse tarayıcı
+    temizlenip havuza döner; hata olursa kapatılır.
+    """
+
+    def __init__(self, size=POOL_SIZE, factory=create_driver, reset=reset_driver, max_uses=MAX_USES,
+                 idle_timeout=IDLE_TIMEOUT):
+        self.size = size
+        self._factory = factory
+        self._reset = reset
+        self.max_uses = max_uses
+        self.idle_timeout = idle_timeout
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self.created = 0
+        self.reused = 0
+
+    def _take_idle(self):
+        """Boşta ve süresi dolmamış bir tarayıcı; süresi dolanlar kapatılır."""
+        expired = []
+        pooled = None
+        with self._lock:
+            now = time.monotonic()
+            while self._idle:
+                candidate = self._idle.pop()
+                if now - candidate.last_used > self.idle_timeout:
+                    expired.append(candidate)
+                    continue
+                pooled = candidate
+                break
+        for item in expired:
+            kill_driver(item.driver)
+        return pooled
+
+    @contextmanager
+    def driver(self, timeout=ACQUIRE_TIMEOUT):
+        with stage("driver_acquire"):
+            if not self._slots.acquire(timeout=timeout):
+                raise TimeoutError(f"{timeout} sn içinde boş tarayıcı bulunamadı (havuz boyutu {self.size}).")
+            try:
+                pooled = self._take_idle()
+                if pooled is None:
+                    pooled = _PooledDriver(self._factory())
+                    self.created += 1
+                else:
+                    self.reused += 1
+            except BaseException:
+                self._slots.release()
+                raise
+
+        with self._lock:
+            self._in_use += 1
+        healthy = False
+        try:
+            yield pooled.driver
+            healthy = True
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            pooled.uses += 1
+            try:
+                self._release(pooled, healthy)
+            finally:
+                self._slots.release()
+
+    def _release(self, pooled, healthy):
+        if healthy and pooled.uses < self.max_uses:
+            try:
+                self._reset(pooled.driver)
+            except Exception as e:
+                # CDP zaman aşımı gibi WebDriver dışı hatalarda da süreç sızdırılmaz, kapatılır
+                logging.warning(f"Tarayıcı temizlenemedi, kapatılıyor: {e}")
+            else:
+                pooled.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(pooled)
+                return
+        kill_driver(pooled.driver)
+
+    def warm(self, count=None):
+        """Havuzu önceden `count` (varsayılan: size) tarayıcıyla doldurur."""
+        count = min(count or self.size, self.size)
+        with self._lock:
+            missing = count - len(self._idle) - self._in_use
+        for _ in range(max(missing, 0)):
+            if not self._slots.acquire(blocking=False):
+                break
+            try:
+                pooled = _PooledDriver(self._factory())
+                self.created += 1
+                with self._lock:
+                    self._idle.append(pooled)
+            finally:
+                self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {"size": self.size, "idle": len(self._idle), "in_use": self._in_use,
+                    "created": self.created, "reused": self.reused}
+
+    def shutdown(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            kill_driver(pooled.driver)
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_driver_pool():
+    """Süreç genelinde tek havuz (Streamlit yeniden çalıştırmalarında korunur)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = DriverPool()
+            atexit.register(_POOL.shutdown)
+        return _POOL
@@ -0,0 +1,61 @@
+import pandas as pd
+from openpyxl import load_workbook
+
+# =========================================================
+# Akış Tabanlı (Düşük Bellekli) Excel Okuyucu
+# =========================================================
+# pd.read_excel tüm çalışma kitabını openpyxl'in tam DOM modunda açar; büyük
+# dosyalarda bellek dosya boyutuyla birlikte büyür. Burada read_only modu ile
+# satırlar tek tek okunur ve chunksize satırlık DataFrame parçaları üretilir.
+
+DEFAULT_CHUNKSIZE = 50_000
+
+
+def _header_names(header_row):
+    """Boş başlıkları pandas gibi 'Unnamed: i' olarak adlandırır."""
+    return [
+        f"Unnamed: {i}" if value is None else value
+        for i, value in enumerate(header_row)
+    ]
+
+
+def iter_excel_chunks(file, chunksize=DEFAULT_CHUNKSIZE, sheet_name=None):
+    """
+    Excel dosyasını read_only modda okur ve DataFrame parçaları (chunk) üretir.
+    İlk satır başlık kabul edilir, tamamen boş satırlar atlanır.
+    """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.active
+        # read_only modda boyut bilgisi hatalı olabilir, pandas da aynısını yapar
+        sheet.reset_dimensions()
+
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _header_names(header)
+        width = len(columns)
+
+        chunk = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            # Satır son dolu hücresinde biter; eksik sütunlar None ile tamamlanır
+            chunk.append(tuple(row[:width]) + (None,) * (width - len(row)))
+            if len(chunk) >= chunksize:
+                yield pd.DataFrame(chunk, columns=columns)
+                chunk = []
+
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns)
+    finally:
+        workbook.close()
+
+
+def read_excel_streaming(file, chunksize=DEFAULT_CHUNKSIZE, sheet_name=None):
+    """Tüm parçaları birleştirip tek DataFrame döndürür (DOM modu olmadan)."""
+    chunks = list(iter_excel_chunks(file, chunksize=chunksize, sheet_name=sheet_name))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
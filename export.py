@@ -0,0 +1,113 @@
+import gzip
+import io
+from io import BytesIO
+
+import pyarrow.parquet as pq
+import streamlit as st
+from openpyxl import Workbook
+
+from cache import LRUCache
+from dataset_store import to_arrow_table
+from perf import stage
+
+# =========================================================
+# İsteğe Bağlı Dışa Aktarma (Excel / CSV.gz / Parquet)
+# =========================================================
+# Dosyalar her yeniden çalıştırmada değil, yalnızca kullanıcı istediğinde
+# üretilir ve (veri seti + filtre) anahtarıyla saklanır. Veri parça parça
+# yazılır; tüm tablonun metin/satır kopyası aynı anda bellekte tutulmaz.
+
+EXPORT_CHUNK_ROWS = 50_000
+LARGE_EXPORT_ROWS = 100_000
+EXPORT_CACHE_MAX_ENTRIES = 6
+_EXPORT_CACHE = LRUCache(max_entries=EXPORT_CACHE_MAX_ENTRIES)
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# biçim -> (etiket, dosya uzantısı, mime)
+EXPORT_FORMATS = {
+    "xlsx": ("Excel (.xlsx)", "xlsx", XLSX_MIME),
+    "csv.gz": ("CSV (sıkıştırılmış, .csv.gz)", "csv.gz", "application/gzip"),
+    "parquet": ("Parquet (.parquet)", "parquet", "application/octet-stream"),
+}
+
+
+def _iter_chunks(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def to_xlsx(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    openpyxl write-only çalışma kitabı: satırlar hücre nesnesi tutulmadan doğrudan
+    XML'e akıtılır (pd.to_excel tüm sayfayı bellekte kurar).
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append([str(col) for col in df.columns])
+    for chunk in _iter_chunks(df, chunk_rows):
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append(row)
+
+    output = BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+def to_csv_gz(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    """UTF-8 (BOM'lu, Excel Türkçe karakterleri doğru açsın) sıkıştırılmış CSV; parça parça yazılır."""
+    output = BytesIO()
+    with gzip.GzipFile(fileobj=output, mode="wb", compresslevel=6) as gz:
+        with io.TextIOWrapper(gz, encoding="utf-8-sig", newline="") as text:
+            if df.empty:
+                df.to_csv(text, index=False)
+            for i, chunk in enumerate(_iter_chunks(df, chunk_rows)):
+                chunk.to_csv(text, index=False, header=(i == 0))
+    return output.getvalue()
+
+
+def to_parquet(df):
+    output = BytesIO()
+    pq.write_table(to_arrow_table(df), output, compression="zstd")
+    return output.getvalue()
+
+
+_WRITERS = {"xlsx": to_xlsx, "csv.gz": to_csv_gz, "parquet": to_parquet}
+
+
+def export_bytes(df, fmt):
+    with stage(f"export_{fmt}"):
+        return _WRITERS[fmt](df)
+
+
+def cached_export(cache_key, df, fmt):
+    """
+    Dışa aktarılan dosyayı (anahtar, biçim) başına bir kez üretir.
+    df, veriyi döndüren bir fonksiyon da olabilir; o zaman veri yalnızca dosya üretilirken okunur.
+    """
+    return _EXPORT_CACHE.get_or_create((cache_key, fmt), lambda: export_bytes(df() if callable(df) else df, fmt))
+
+
+def export_section(cache_key, df, file_stem, key, rows=None):
+    """
+    Biçim seçimi + 'Hazırla' düğmesi. Dosya yalnızca düğmeye basılınca üretilir;
+    aynı veri/filtre için tekrar üretilmez ve indirme düğmesi sonraki çalıştırmalarda da görünür.
+    df bir fonksiyonsa satır sayısı uyarısı için rows verilmelidir.
+    """
+    fmt = st.selectbox("Biçim:", list(EXPORT_FORMATS), format_func=lambda f: EXPORT_FORMATS[f][0],
+                       key=f"{key}_format")
+    label, extension, mime = EXPORT_FORMATS[fmt]
+    rows = len(df) if rows is None else rows
+    if fmt == "xlsx" and rows > LARGE_EXPORT_ROWS:
+        st.caption(f"ℹ️ {rows:,} satır: Excel dosyası birkaç saniye sürebilir, CSV.gz / Parquet çok daha hızlıdır.")
+
+    if (cache_key, fmt) not in _EXPORT_CACHE:
+        if not st.button(f"⚙️ {label} dosyasını hazırla", key=f"{key}_build"):
+            return
+        with st.spinner("Dosya hazırlanıyor..."):
+            cached_export(cache_key, df, fmt)
+
+    data = _EXPORT_CACHE.get((cache_key, fmt))
+    if data is not None:
+        st.download_button(f"📥 {label} İndir", data, f"{file_stem}.{extension}", mime, key=f"{key}_download")
@@ -1,7 +1,451 @@
+import os
+import shutil
+import tempfile
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-from io import BytesIO
+
+from cache import LRUCache, upload_hash
+from perf import stage, timed
+import jobs
+from export import export_section
+from excel_reader import read_excel_streaming
+from numeric import parse_numeric
+from date_index import DateIndex
+from identity import resolve_identities
+from fraud_engine import (
+    DEFAULT_VELOCITY_WINDOWS, velocity_windows, velocity_summary,
+    DEFAULT_ANOMALY_THRESHOLD, partial_features, merge_partial_features, relabel_partial_features, finalize_features,
+    customer_features, score_customers,
+)
+
+# =========================================================
+# Akış Tabanlı (Out-of-Core) Fraud Toplama
+# =========================================================
+# Çok büyük CSV dosyaları tamamen belleğe alınmaz: yalnızca gerekli sütunlar
+# parça parça okunur ve müşteri bazında toplamlar tutulur. Bellek kullanımı
+# satır sayısıyla değil farklı müşteri sayısıyla ölçeklenir.
+
+FRAUD_COLUMNS = ["create date", "name-surname", "total"]
+# Varsa kimlik çözümlemede kullanılan müşteri numarası sütunları
+CUSTOMER_ID_COLUMNS = ["customer id", "customer_id", "customer-id", "user id", "user_id"]
+CSV_CHUNKSIZE = 200_000
+LARGE_FILE_BYTES = 50 * 1024 * 1024
+SPILL_COPY_BYTES = 8 * 1024 * 1024
+_DATE_RANGE_CACHE = LRUCache(max_entries=8)
+# (dosya hash'i, başlangıç, bitiş) -> (skorlanmış müşteriler, satır sayısı, çözülemeyen sayısı)
+# Limit veya eşik değiştirildiğinde özellikler yeniden hesaplanmaz.
+_SCORE_CACHE = LRUCache(max_entries=8)
+# (veri anahtarı, pencere eşikleri) -> (müşteri özeti, şüpheli işlemler, çözülemeyen sayısı)
+_VELOCITY_CACHE = LRUCache(max_entries=8)
+# dosya hash'i -> okunmuş DataFrame / tarihe göre sıralanmış DateIndex
+_FRAME_CACHE = LRUCache(max_entries=4)
+
+
+def _iter_csv_chunks(uploaded_file, columns, chunksize=CSV_CHUNKSIZE):
+    """CSV'yi yalnızca istenen sütunlarla parça parça okur; başlıklar küçük harfe çekilir."""
+    uploaded_file.seek(0)
+    reader = pd.read_csv(
+        uploaded_file,
+        usecols=lambda c: c.strip().lower() in columns,
+        dtype=str,
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        chunk.columns = chunk.columns.str.strip().str.lower()
+        yield chunk
+
+
+@timed("date_range_scan")
+def stream_date_range(uploaded_file, chunksize=CSV_CHUNKSIZE):
+    """Yalnızca 'create date' sütununu okuyarak en küçük/en büyük tarihi ve satır sayısını bulur."""
+    key = upload_hash(uploaded_file)
+    cached = _DATE_RANGE_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    min_date, max_date, rows = None, None, 0
+    for chunk in _iter_csv_chunks(uploaded_file, ["create date"], chunksize):
+        dates = pd.to_datetime(chunk["create date"], errors="coerce")
+        rows += len(chunk)
+        if dates.notna().any():
+            min_date = dates.min() if min_date is None else min(min_date, dates.min())
+            max_date = dates.max() if max_date is None else max(max_date, dates.max())
+
+    result = (min_date, max_date, rows)
+    _DATE_RANGE_CACHE.put(key, result)
+    return result
+
+
+def customer_id_column(columns):
+    """Dosyadaki ilk müşteri numarası sütunu (yoksa None)."""
+    return next((col for col in CUSTOMER_ID_COLUMNS if col in columns), None)
+
+
+@timed("identity_resolution")
+def resolve_customer_names(df):
+    """'name-surname' sütununu çözümlenmiş kimlikle (yazım / Türkçe karakter farkları, müşteri no) değiştirir."""
+    id_col = customer_id_column(df.columns)
+    identity = resolve_identities(df["name-surname"], df[id_col] if id_col else None)
+    return df.assign(**{"name-surname": identity})
+
+
+def resolve_with_spinner(df):
+    with st.spinner("Müşteri kimlikleri eşleştiriliyor..."):
+        return resolve_customer_names(df)
+
+
+@timed("stream_aggregation")
+def stream_customer_features(uploaded_file, start_date, end_date, chunksize=CSV_CHUNKSIZE, resolve=False):
+    """
+    CSV'yi parça parça okuyup tarih aralığındaki satırlardan müşteri bazında
+    özellikleri (toplam, adet, en yüksek sepet, farklı gün) çıkarır.
+    resolve=True ise ham isimlerin ara sonuçları sonda çözümlenmiş kimliklerde birleştirilir.
+    Dönüş: (DataFrame[name-surname, FEATURE_COLUMNS...], satır sayısı, çözülemeyen sayısı)
+    """
+    merged = None
+    name_ids = []
+    rows = 0
+    unparseable = 0
+    locale = None
+    start_ts = pd.Timestamp(start_date)
+    end_ts = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+
+    for chunk in _iter_csv_chunks(uploaded_file, FRAUD_COLUMNS + CUSTOMER_ID_COLUMNS, chunksize):
+        dates = pd.to_datetime(chunk["create date"], errors="coerce")
+        chunk = chunk[(dates >= start_ts) & (dates < end_ts)]
+        if chunk.empty:
+            continue
+
+        # Ondalık ayırıcı ilk parçada belirlenir, sonraki parçalar aynı kuralla okunur
+        total, report = parse_numeric(chunk["total"], locale=locale, return_report=True)
+        locale = locale or report["locale"]
+        unparseable += report["unparseable"]
+        rows += len(chunk)
+
+        part = partial_features(chunk.assign(total=total, **{"create date": dates}))
+        merged = part if merged is None else merge_partial_features([merged, part])
+
+        id_col = customer_id_column(chunk.columns)
+        if resolve and id_col:
+            pairs = chunk[["name-surname", id_col]].dropna(subset=["name-surname"]).drop_duplicates()
+            name_ids.append(pairs.set_axis(["name-surname", "customer id"], axis=1))
+
+    if merged is None:
+        return customer_features(pd.DataFrame(columns=FRAUD_COLUMNS)), 0, unparseable
+
+    if resolve:
+        if name_ids:
+            pairs = pd.concat(name_ids, ignore_index=True).drop_duplicates()
+        else:
+            pairs = pd.DataFrame({"name-surname": merged[0].index, "customer id": pd.NA})
+        identity = resolve_identities(pairs["name-surname"], pairs["customer id"])
+        mapping = dict(zip(pairs["name-surname"], identity))
+        merged = relabel_partial_features(*merged, mapping)
+    return finalize_features(*merged), rows, unparseable
+
+
+def spill_upload(uploaded_file):
+    """
+    Yüklenen dosyayı geçici bir dosyaya parça parça kopyalar ve yolunu döndürür.
+    Arka plan sürecine dosyanın içeriği yerine yolu gönderilir; içerik sürece kopyalanmaz.
+    """
+    uploaded_file.seek(0)
+    with tempfile.NamedTemporaryFile(prefix="fraud_upload_", suffix=".csv", delete=False) as spool:
+        shutil.copyfileobj(uploaded_file, spool, SPILL_COPY_BYTES)
+    return spool.name
+
+
+def stream_scores_job(path, start_date, end_date, resolve):
+    """
+    Arka plan işi (ayrı süreçte çalışır; büyük CSV taraması GIL'i diğer oturumlardan almaz).
+    path: spill_upload ile yazılan geçici dosya; iş bitince silinir.
+    Dönüş: (skorlanmış müşteriler, satır sayısı, çözülemeyen sayısı)
+    """
+    try:
+        with open(path, "rb") as f:
+            features, rows, unparseable = stream_customer_features(f, start_date, end_date, resolve=resolve)
+    finally:
+        os.remove(path)
+    return score_customers(features), rows, unparseable
+
+
+def read_upload_frame(uploaded_file, file_key):
+    """Yüklenen dosyayı bir kez okur; başlıklar küçük harfe çekilir. Sonraki çalıştırmalar önbellekten döner."""
+    @timed("upload_parse")
+    def build():
+        if uploaded_file.name.endswith(".csv"):
+            df = pd.read_csv(uploaded_file)
+        else:
+            df = read_excel_streaming(uploaded_file)
+        df.columns = df.columns.str.strip().str.lower()
+        return df
+
+    return _FRAME_CACHE.get_or_create(("frame", file_key), build)
+
+
+def date_indexed_frame(df, file_key):
+    """'create date' sütununu çevirip veriyi bir kez tarihe göre sıralar (hatalı tarihte ValueError)."""
+    return _FRAME_CACHE.get_or_create(
+        ("index", file_key),
+        timed("date_index")(
+            lambda: DateIndex(df.assign(**{"create date": pd.to_datetime(df["create date"])}), "create date")),
+    )
+
+
+@timed("aggregation")
+def frame_customer_features(filtered_df, day_keys=None):
+    """Bellekteki (tarih filtresi uygulanmış) veriden müşteri özellikleri. Dönüş stream_customer_features ile aynıdır."""
+    total, report = parse_numeric(filtered_df["total"], return_report=True)
+    return customer_features(filtered_df.assign(total=total), day_keys=day_keys), len(filtered_df), report["unparseable"]
+
+
+def cached_customer_scores(file_key, start_date, end_date, compute):
+    """compute() -> (özellikler, satır, çözülemeyen); skorlanmış sonuç dosya ve tarih aralığı başına saklanır."""
+    def build():
+        features, rows, unparseable = compute()
+        with stage("scoring"):
+            return score_customers(features), rows, unparseable
+
+    return _SCORE_CACHE.get_or_create((file_key, start_date, end_date), build)
+
+
+# =========================================================
+# Sonuç Ekranı
+# =========================================================
+
+def show_fraud_results(scored, limit, anomaly_threshold, result_key):
+    """
+    Skorlanmış müşterilerden (score_customers çıktısı) fraud sonuçlarını, grafikleri ve
+    indirmeleri gösterir. Oranlar tüm müşteriler üzerinden hesaplanır; bar grafiği
+    okunabilirlik için yalnızca en yüksek 20 toplamı gösterir.
+    result_key: skorların anahtarı (dosya + tarih aralığı); indirme dosyaları yalnızca
+    istenince ve bu anahtar + limit/eşik başına bir kez üretilir.
+    """
+    frauds = scored[scored["total"] > limit].sort_values(by="total", ascending=False)
+    normal = scored[scored["total"] <= limit]
+
+    total_users = len(scored)
+    fraud_count = len(frauds)
+    normal_count = len(normal)
+
+    if fraud_count > 0:
+        st.error(f"🚨 {fraud_count} adet olası fraud tespit edildi!")
+        st.dataframe(frauds, use_container_width=True)
+    else:
+        st.success("✅ Hiçbir fraud tespit edilmedi.")
+
+    fraud_ratio = (fraud_count / total_users) * 100 if total_users > 0 else 0
+    normal_ratio = 100 - fraud_ratio
+
+    st.markdown("### 📊 Fraud / Normal İşlem Oranı")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Fraud Oranı", f"{fraud_ratio:.2f}%")
+    with col2:
+        st.metric("Normal Oranı", f"{normal_ratio:.2f}%")
+
+    if total_users > 0:
+        fig, ax = plt.subplots()
+        ax.pie(
+            [fraud_count, normal_count],
+            labels=["Fraud", "Normal"],
+            autopct="%1.1f%%",
+            colors=["#FF4B4B", "#4CAF50"],
+            startangle=90,
+            explode=(0.1, 0)
+        )
+        ax.axis("equal")
+        st.pyplot(fig)
+
+    st.markdown("### 📈 Anomali Skoru (Robust Z / MAD)")
+    st.caption("Her müşterinin toplamı, işlem sayısı, ortalama ve en yüksek sepeti ile farklı gün sayısı "
+               "tüm müşterilerin medyanı ve MAD'ine göre ölçeklenir; skor en yüksek sapmadır.")
+    anomalies = scored[scored["anomaly_score"] >= anomaly_threshold]
+    anomaly_ratio = (len(anomalies) / total_users) * 100 if total_users > 0 else 0
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Anomali Müşteri", f"{len(anomalies)}")
+    with col2:
+        st.metric("Anomali Oranı", f"{anomaly_ratio:.2f}%")
+
+    if len(anomalies) > 0:
+        st.dataframe(anomalies, use_container_width=True)
+    else:
+        st.success(f"✅ Skoru {anomaly_threshold} ve üzeri olan müşteri yok.")
+
+    st.markdown("### 🧍‍♂️ Kullanıcı Bazlı Toplam Total Grafiği")
+    grouped = scored.nlargest(20, "total")
+    colors = grouped["total"].apply(lambda x: "#FF4B4B" if x > limit else "#4CAF50")
+    fig2, ax2 = plt.subplots(figsize=(10, 5))
+    ax2.bar(grouped["name-surname"], grouped["total"], color=colors)
+    ax2.axhline(y=limit, color="orange", linestyle="--", label=f"Limit ({limit})")
+    ax2.set_ylabel("Toplam Total")
+    ax2.set_xlabel("Kullanıcılar")
+    ax2.set_xticks(range(len(grouped)))
+    ax2.set_xticklabels(grouped["name-surname"], rotation=45, ha="right")
+    ax2.legend()
+    st.pyplot(fig2)
+
+    st.markdown("### 📥 Rapor İndir")
+
+    if fraud_count > 0:
+        st.write("🚨 Fraud Liste")
+        export_section((result_key, "fraud", limit), frauds, "fraud_list", key="exp_fraud")
+
+    if normal_count > 0:
+        st.write("✅ Normal Liste")
+        export_section((result_key, "normal", limit), normal, "normal_list", key="exp_normal")
+
+    if len(anomalies) > 0:
+        st.write("📈 Anomali Liste")
+        export_section((result_key, "anomaly", anomaly_threshold), anomalies, "anomaly_list", key="exp_anomaly")
+
+
+def identity_toggle():
+    return st.checkbox(
+        "🧬 Aynı kişinin farklı yazımlarını birleştir (büyük/küçük harf, Türkçe karakter, küçük yazım hataları, müşteri no)",
+        value=False,
+    )
+
+
+def limit_inputs():
+    """Limit ve anomali eşiği girişleri (değişiklikleri önbellekteki skorları yeniden kullanır)."""
+    limit = st.number_input("🚨 Fraud limitini belirleyin (örnek: 900.00)", min_value=0.0, step=100.0)
+    anomaly_threshold = st.number_input("📈 Anomali skoru eşiği (robust z)", min_value=0.0,
+                                        value=DEFAULT_ANOMALY_THRESHOLD, step=0.5)
+    return limit, anomaly_threshold
+
+
+def streaming_fraud_section(uploaded_file):
+    """Büyük CSV'ler için: dosya belleğe alınmadan tarih aralığı ve müşteri toplamları akışla hesaplanır."""
+    preview = pd.read_csv(uploaded_file, nrows=5)
+    st.success("✅ Dosya başarıyla yüklendi! (akış modu)")
+    st.dataframe(preview, use_container_width=True)
+
+    columns = set(preview.columns.str.strip().str.lower())
+    missing = [col for col in FRAUD_COLUMNS if col not in columns]
+    if missing:
+        st.error(f"❌ Gerekli sütunlar bulunamadı: {', '.join(missing)}")
+        st.stop()
+
+    with st.spinner("Tarih aralığı hesaplanıyor..."):
+        min_ts, max_ts, total_rows = stream_date_range(uploaded_file)
+
+    if min_ts is None:
+        st.error("❌ 'Create Date' sütunu tarih formatında değil. Lütfen kontrol edin.")
+        st.stop()
+
+    st.markdown("### 🗓️ Tarih Aralığı Filtreleme")
+    col1, col2 = st.columns(2)
+    with col1:
+        start_date = st.date_input("Başlangıç tarihi", min_ts.date())
+    with col2:
+        end_date = st.date_input("Bitiş tarihi", max_ts.date())
+
+    if start_date > end_date:
+        st.error("❌ Başlangıç tarihi bitiş tarihinden sonra olamaz.")
+        st.stop()
+
+    st.info(f"📅 Dosyada {total_rows} kayıt var. Seçilen aralık: {start_date} → {end_date}")
+
+    resolve = identity_toggle()
+    limit, anomaly_threshold = limit_inputs()
+
+    # Skorlar dosya + tarih aralığı başına bir kez hesaplanır; limit ve eşik değişiklikleri işi yeniden başlatmaz
+    score_key = (upload_hash(uploaded_file), resolve, start_date, end_date)
+    job = jobs.latest("fraud", score_key)
+    # Aynı anahtarla sırada, çalışan veya bitmiş iş varsa dosya yeniden diske yazılmaz
+    if st.button("Fraud Kontrolünü Başlat") and (job is None or job.status not in (jobs.QUEUED, jobs.RUNNING, jobs.DONE)):
+        path = spill_upload(uploaded_file)
+        job = jobs.submit("fraud", f"Fraud kontrolü · {uploaded_file.name}", stream_scores_job, path,
+                          start_date, end_date, resolve, key=score_key, process=True)
+        if job is None:
+            os.remove(path)
+
+    if job is None or not jobs.job_status(job):
+        return
+    scored, rows, unparseable = job.result
+
+    if rows == 0:
+        st.warning(f"⚠️ {start_date} → {end_date} tarihleri arasında hiçbir kayıt bulunamadı.")
+        st.stop()
+
+    st.info(f"📅 Seçilen aralıkta {rows} kayıt, {len(scored)} farklı kullanıcı işlendi.")
+    if unparseable:
+        st.warning(f"⚠️ {unparseable} satırda 'Total' sayıya çevrilemedi; bu satırlar toplama katılmadı.")
+
+    show_fraud_results(scored, limit, anomaly_threshold, score_key)
+
+
+LIMIT_MODE = "💰 Toplam Limit"
+VELOCITY_MODE = "⚡ Hız (Velocity)"
+
+
+def velocity_section(filtered_df, data_key, prepare=None):
+    """
+    Kayan pencerelerde (1s / 24s / 7g) tutar ve adet eşiği aşan işlemleri bulur.
+    data_key: filtrelenmiş verinin anahtarı (dosya + tarih aralığı + kimlik birleştirme).
+    prepare: verilirse (ör. kimlik çözümleme) yalnızca sonuç önbellekte yokken veriye uygulanır.
+    Sonuç eşiklerle birlikte saklanır; indirme dosyası hazırlanırken sonuçlar ekranda kalır.
+    """
+    st.markdown("### ⚡ Pencere Eşikleri")
+    st.caption("Her işlem için müşterinin o işlemle biten pencere içindeki toplamı ve işlem sayısı kontrol edilir. "
+               "0 girilen eşik kullanılmaz.")
+
+    windows = {}
+    for name, (duration, sum_limit, count_limit) in DEFAULT_VELOCITY_WINDOWS.items():
+        col1, col2 = st.columns(2)
+        with col1:
+            window_sum = st.number_input(f"{name} tutar eşiği", min_value=0.0, value=sum_limit, step=500.0,
+                                         key=f"vel_sum_{name}")
+        with col2:
+            window_count = st.number_input(f"{name} işlem adedi eşiği", min_value=0, value=count_limit, step=1,
+                                           key=f"vel_count_{name}")
+        windows[name] = (duration, window_sum or None, window_count or None)
+
+    velocity_key = (data_key, tuple(windows.items()))
+    if st.button("Hız Kontrolünü Başlat"):
+        if "name-surname" not in filtered_df.columns or "total" not in filtered_df.columns:
+            st.error("❌ Gerekli sütunlar ('Name-Surname' ve 'Total') bulunamadı.")
+            st.stop()
+        st.session_state["velocity_key"] = velocity_key
+
+    # Veri veya eşikler değiştiyse eski sonuç gösterilmez, kontrol yeniden başlatılmalı
+    if st.session_state.get("velocity_key") != velocity_key:
+        return
+
+    def build():
+        frame = prepare(filtered_df) if prepare else filtered_df
+        total, total_report = parse_numeric(frame["total"], return_report=True)
+        with stage("velocity"):
+            stats, offending = velocity_windows(frame.assign(total=total), windows)
+        return velocity_summary(stats, windows), offending, total_report["unparseable"]
+
+    summary, offending, unparseable = _VELOCITY_CACHE.get_or_create(velocity_key, build)
+    if unparseable:
+        st.warning(f"⚠️ {unparseable} satırda 'Total' sayıya çevrilemedi; bu satırlar tutar toplamına katılmadı.")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Eşik Aşan Müşteri", f"{len(summary)}")
+    with col2:
+        st.metric("Şüpheli İşlem", f"{len(offending)}")
+
+    if summary.empty:
+        st.success("✅ Hiçbir pencerede eşik aşılmadı.")
+        return
+
+    st.error(f"🚨 {len(summary)} müşteride pencere eşiği aşıldı!")
+    st.markdown("### 🧍 Müşteri Özeti")
+    st.dataframe(summary, use_container_width=True)
+
+    st.markdown("### 🧾 Şüpheli İşlemler")
+    st.dataframe(offending, use_container_width=True)
+
+    st.write("📥 Şüpheli İşlemler")
+    export_section(velocity_key, offending, "velocity_list", key="exp_velocity")
+
 
 def fraud_page():
 
@@ -10,30 +454,40 @@ def fraud_page():
 
     uploaded_file = st.file_uploader("📂 Excel veya CSV dosyanızı yükleyin", type=["xlsx", "csv"])
 
-    if uploaded_file:
+    large_mode = False
+    if uploaded_file and uploaded_file.name.endswith(".csv"):
+        large_mode = st.toggle(
+            "🚀 Büyük dosya modu (dosyayı belleğe almadan, parça parça işle)",
+            value=uploaded_file.size > LARGE_FILE_BYTES,
+        )
 
-        if uploaded_file.name.endswith(".csv"):
-            df = pd.read_csv(uploaded_file)
-        else:
-            df = pd.read_excel(uploaded_file)
+    if uploaded_file and large_mode:
+        streaming_fraud_section(uploaded_file)
+
+    elif uploaded_file:
+
+        file_key = upload_hash(uploaded_file)
+        df = read_upload_frame(uploaded_file, file_key)
 
         st.success("✅ Dosya başarıyla yüklendi!")
         st.dataframe(df.head(), use_container_width=True)
 
-        df.columns = df.columns.str.strip().str.lower()
-
         if "create date" not in df.columns:
             st.error("❌ 'Create Date' sütunu bulunamadı. Lütfen kontrol edin.")
             st.stop()
 
         try:
-            df["create date"] = pd.to_datetime(df["create date"])
+            date_index = date_indexed_frame(df, file_key)
         except Exception:
             st.error("❌ 'Create Date' sütunu tarih formatında değil. Lütfen kontrol edin.")
             st.stop()
 
-        min_date = df["create date"].min().date()
-        max_date = df["create date"].max().date()
+        if date_index.min_date is None:
+            st.error("❌ 'Create Date' sütununda geçerli tarih bulunamadı.")
+            st.stop()
+
+        min_date = date_index.min_date
+        max_date = date_index.max_date
 
         st.markdown("### 🗓️ Tarih Aralığı Filtreleme")
         col1, col2 = st.columns(2)
@@ -46,8 +500,8 @@ def fraud_page():
             st.error("❌ Başlangıç tarihi bitiş tarihinden sonra olamaz.")
             st.stop()
 
-        mask = (df["create date"].dt.date >= start_date) & (df["create date"].dt.date <= end_date)
-        filtered_df = df.loc[mask]
+        # Sıralı veride ikili arama: tarih seçicileri her değiştiğinde tüm satırlar taranmaz
+        filtered_df = date_index.slice(start_date, end_date)
 
         if filtered_df.empty:
             st.warning(f"⚠️ {start_date} → {end_date} tarihleri arasında hiçbir kayıt bulunamadı.")
@@ -55,100 +509,37 @@ def fraud_page():
 
         st.info(f"📅 Seçilen aralık: {start_date} → {end_date} ({len(filtered_df)} kayıt)")
 
-        limit = st.number_input("🚨 Fraud limitini belirleyin (örnek: 900.00)", min_value=0.0, step=100.0)
+        resolve = identity_toggle()
+        day_keys = date_index.day_slice(start_date, end_date)
+        # Kimlikler yalnızca sonuç önbellekte yokken çözümlenir; anahtar ham dosya + seçimdir
+        prepare = resolve_with_spinner if resolve and "name-surname" in filtered_df.columns else None
+
+        detection_mode = st.radio("🔎 Tespit Modu:", [LIMIT_MODE, VELOCITY_MODE], horizontal=True)
+
+        if detection_mode == VELOCITY_MODE:
+            velocity_section(filtered_df, (file_key, resolve, start_date, end_date), prepare)
+            limit = None
+        else:
+            limit, anomaly_threshold = limit_inputs()
 
-        if st.button("Fraud Kontrolünü Başlat"):
+        # Skorlar dosya + tarih aralığı başına saklanır; sonuçlar düğmeye basıldıktan sonra
+        # (ör. indirme dosyası hazırlanırken) veri değişene kadar ekranda kalır
+        score_key = ((file_key, resolve), start_date, end_date)
+        if limit is not None and st.button("Fraud Kontrolünü Başlat"):
 
             if "name-surname" not in filtered_df.columns or "total" not in filtered_df.columns:
                 st.error("❌ Gerekli sütunlar ('Name-Surname' ve 'Total') bulunamadı.")
                 st.stop()
+            st.session_state["fraud_score_key"] = score_key
 
-            filtered_df["total"] = (
-                filtered_df["total"]
-                .astype(str)
-                .str.replace(".", "", regex=False)
-                .str.replace(",", ".", regex=False)
-                .str.extract(r"([0-9]+\.?[0-9]*)", expand=False)
-                .astype(float)
+        if limit is not None and st.session_state.get("fraud_score_key") == score_key:
+            scored, _, unparseable = cached_customer_scores(
+                *score_key, lambda: frame_customer_features(prepare(filtered_df) if prepare else filtered_df, day_keys),
             )
+            if unparseable:
+                st.warning(f"⚠️ {unparseable} satırda 'Total' sayıya çevrilemedi; bu satırlar toplama katılmadı.")
 
-            grouped = filtered_df.groupby("name-surname", as_index=False)["total"].sum()
-
-            grouped = grouped.sort_values(by="total", ascending=False).head(20)
-
-            frauds = grouped[grouped["total"] > limit]
-            normal = grouped[grouped["total"] <= limit]
-
-            total_users = len(grouped)
-            fraud_count = len(frauds)
-            normal_count = len(normal)
-
-            if fraud_count > 0:
-                st.error(f"🚨 {fraud_count} adet olası fraud tespit edildi!")
-                st.dataframe(frauds, use_container_width=True)
-            else:
-                st.success("✅ Hiçbir fraud tespit edilmedi.")
-
-            fraud_ratio = (fraud_count / total_users) * 100 if total_users > 0 else 0
-            normal_ratio = 100 - fraud_ratio
-
-            st.markdown("### 📊 Fraud / Normal İşlem Oranı")
-            col1, col2 = st.columns(2)
-            with col1:
-                st.metric("Fraud Oranı", f"{fraud_ratio:.2f}%")
-            with col2:
-                st.metric("Normal Oranı", f"{normal_ratio:.2f}%")
-
-            if total_users > 0:
-                fig, ax = plt.subplots()
-                ax.pie(
-                    [fraud_count, normal_count],
-                    labels=["Fraud", "Normal"],
-                    autopct="%1.1f%%",
-                    colors=["#FF4B4B", "#4CAF50"],
-                    startangle=90,
-                    explode=(0.1, 0)
-                )
-                ax.axis("equal")
-                st.pyplot(fig)
-
-            st.markdown("### 🧍‍♂️ Kullanıcı Bazlı Toplam Total Grafiği")
-            colors = grouped["total"].apply(lambda x: "#FF4B4B" if x > limit else "#4CAF50")
-            fig2, ax2 = plt.subplots(figsize=(10, 5))
-            ax2.bar(grouped["name-surname"], grouped["total"], color=colors)
-            ax2.axhline(y=limit, color="orange", linestyle="--", label=f"Limit ({limit})")
-            ax2.set_ylabel("Toplam Total")
-            ax2.set_xlabel("Kullanıcılar")
-            ax2.set_xticks(range(len(grouped)))
-            ax2.set_xticklabels(grouped["name-surname"], rotation=45, ha="right")
-            ax2.legend()
-            st.pyplot(fig2)
-
-            st.markdown("### 📥 Rapor İndir")
-
-            def convert_df_to_excel(df):
-                output = BytesIO()
-                df.to_excel(output, index=False, engine='openpyxl')
-                output.seek(0)
-                return output
-
-            if fraud_count > 0:
-                excel_fraud = convert_df_to_excel(frauds)
-                st.download_button(
-                    label="📥 Fraud Liste Excel Olarak İndir",
-                    data=excel_fraud,
-                    file_name="fraud_list.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
-
-            if normal_count > 0:
-                excel_normal = convert_df_to_excel(normal)
-                st.download_button(
-                    label="📥 Normal Liste Excel Olarak İndir",
-                    data=excel_normal,
-                    file_name="normal_list.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+            show_fraud_results(scored, limit, anomaly_threshold, score_key)
 
     else:
         st.info("Lütfen bir dosya yükleyin ve limiti girin.")
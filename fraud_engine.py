@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+
+# =========================================================
+# Hız (Velocity) Tabanlı Fraud Tespiti
+# =========================================================
+# Her işlem için, aynı müşterinin o işlemle biten son 1 saat / 24 saat / 7 gün
+# içindeki toplam tutarı ve işlem sayısı hesaplanır. Müşteri başına Python
+# döngüsü yoktur: veri bir kez (müşteri, zaman) sırasına dizilir, pencere
+# başlangıçları searchsorted ile, toplamlar kümülatif toplam farkıyla bulunur.
+
+# pencere adı -> (süre, tutar eşiği, adet eşiği); eşik None ise o kural kullanılmaz
+DEFAULT_VELOCITY_WINDOWS = {
+    "1h": (pd.Timedelta(hours=1), 5_000.0, 5),
+    "24h": (pd.Timedelta(hours=24), 20_000.0, 20),
+    "7d": (pd.Timedelta(days=7), 50_000.0, 50),
+}
+
+# Müşteri kodu üst bitlere, saniye cinsinden göreli zaman alt 34 bite yazılır
+_TIME_BITS = 34
+
+
+def velocity_windows(df, windows=None, customer_col="name-surname", time_col="create date", amount_col="total"):
+    """
+    Kayan pencere toplamlarını hesaplar ve eşik aşımlarını işaretler.
+
+    Dönüş: (stats, offending)
+    - stats: (müşteri, zaman) sırasına dizilmiş işlemler; her pencere için
+      <ad>_sum, <ad>_count ve <ad>_breach sütunları eklenir.
+    - offending: eşiği aşan herhangi bir pencerenin içinde kalan işlemler;
+      'velocity_rules' sütunu hangi pencerelerin aşıldığını gösterir.
+    """
+    windows = windows or DEFAULT_VELOCITY_WINDOWS
+    data = df[df[customer_col].notna() & df[time_col].notna()]
+
+    codes, _ = pd.factorize(data[customer_col])
+    seconds = data[time_col].to_numpy(dtype="datetime64[s]").astype(np.int64)
+    relative = seconds - seconds.min() if len(seconds) else seconds
+
+    order = np.lexsort((relative, codes))
+    stats = data.iloc[order].reset_index(drop=True)
+    keys = (codes[order].astype(np.int64) << _TIME_BITS) | relative[order]
+
+    amounts = np.nan_to_num(stats[amount_col].to_numpy(dtype=float))
+    cumulative = np.concatenate([[0.0], np.cumsum(amounts)])
+    positions = np.arange(len(stats))
+
+    in_breach = np.zeros(len(stats), dtype=bool)
+    rule_labels = np.full(len(stats), "", dtype=object)
+
+    for name, (duration, sum_limit, count_limit) in windows.items():
+        width = int(pd.Timedelta(duration).total_seconds())
+        # Pencere (t - süre, t] aralığıdır; anahtar yapısı sayesinde başka müşteriye taşmaz
+        starts = np.searchsorted(keys, keys - width, side="right")
+        window_sum = cumulative[positions + 1] - cumulative[starts]
+        window_count = positions + 1 - starts
+
+        breach = np.zeros(len(stats), dtype=bool)
+        if sum_limit is not None:
+            breach |= window_sum > sum_limit
+        if count_limit is not None:
+            breach |= window_count > count_limit
+
+        stats[f"{name}_sum"] = window_sum
+        stats[f"{name}_count"] = window_count
+        stats[f"{name}_breach"] = breach
+
+        # Aşım olan pencerelerin içindeki tüm işlemler (fark dizisiyle) işaretlenir
+        marks = np.zeros(len(stats) + 1, dtype=np.int64)
+        np.add.at(marks, starts[breach], 1)
+        np.add.at(marks, positions[breach] + 1, -1)
+        in_window = np.cumsum(marks[:-1]) > 0
+
+        in_breach |= in_window
+        rule_labels = np.where(in_window, rule_labels + np.where(rule_labels == "", "", ", ") + name, rule_labels)
+
+    offending = stats[in_breach].assign(velocity_rules=rule_labels[in_breach])
+    return stats, offending
+
+
+def velocity_summary(stats, windows=None, customer_col="name-surname"):
+    """Müşteri bazında aşım sayıları ve pencerelerde görülen en yüksek toplam/adet."""
+    windows = windows or DEFAULT_VELOCITY_WINDOWS
+    breach_cols = [f"{name}_breach" for name in windows]
+    breached = stats[stats[breach_cols].any(axis=1)]
+
+    agg = {f"{name}_breaches": (f"{name}_breach", "sum") for name in windows}
+    agg.update({f"{name}_max_sum": (f"{name}_sum", "max") for name in windows})
+    agg.update({f"{name}_max_count": (f"{name}_count", "max") for name in windows})
+    summary = breached.groupby(customer_col).agg(**agg)
+    return summary.sort_values(by=[f"{name}_breaches" for name in windows], ascending=False).reset_index()
+
+
+# =========================================================
+# İstatistiksel Anomali Skoru (Robust Z / MAD)
+# =========================================================
+# Sabit limit yalnızca toplam tutara bakar. Burada tüm müşteriler için işlem
+# özellikleri vektörel olarak çıkarılır ve her özellik popülasyonun medyanına
+# ve MAD'ine (medyan mutlak sapma) göre ölçeklenir. Tutarlar çarpık dağıldığı
+# için z-skorları log1p ölçeğinde hesaplanır.
+
+FEATURE_COLUMNS = ["total", "tx_count", "mean_ticket", "max_ticket", "distinct_days"]
+# Iglewicz & Hoaglin'in önerdiği eşik: |z| > 3.5 aykırı kabul edilir
+DEFAULT_ANOMALY_THRESHOLD = 3.5
+_MAD_SCALE = 0.6745
+_MEAN_AD_SCALE = 1.253314
+
+
+def partial_features(df, customer_col="name-surname", time_col="create date", amount_col="total", day_keys=None):
+    """
+    Birleştirilebilir ara özellikler. Dönüş: (agg, day_pairs)
+    - agg: müşteri indeksli total / tx_count / max_ticket
+    - day_pairs: benzersiz (müşteri, gün) çiftleri (farklı gün sayısı için)
+    day_keys verilirse (df ile hizalı, ör. DateIndex.day_slice) günler yeniden hesaplanmaz.
+    """
+    has_customer = df[customer_col].notna().to_numpy()
+    data = df[has_customer]
+    amounts = pd.Series(np.nan_to_num(data[amount_col].to_numpy(dtype=float)), index=data.index)
+    grouped = amounts.groupby(data[customer_col], sort=False)
+    agg = pd.DataFrame({
+        "total": grouped.sum(),
+        "tx_count": grouped.size(),
+        "max_ticket": grouped.max(),
+    })
+    agg.index.name = customer_col
+
+    if day_keys is not None:
+        days = np.asarray(day_keys)[has_customer]
+    else:
+        days = pd.to_datetime(data[time_col], errors="coerce").dt.floor("D").to_numpy()
+    day_pairs = pd.DataFrame({customer_col: data[customer_col].to_numpy(), "day": days})
+    day_pairs = day_pairs[day_pairs["day"].notna()].drop_duplicates()
+    return agg, day_pairs
+
+
+def merge_partial_features(parts):
+    """partial_features çıktılarını (ör. CSV parçaları) tek bir ara sonuçta birleştirir."""
+    aggs, pairs = zip(*parts)
+    agg = pd.concat(aggs).groupby(level=0, sort=False).agg({"total": "sum", "tx_count": "sum", "max_ticket": "max"})
+    return agg, pd.concat(pairs, ignore_index=True).drop_duplicates()
+
+
+def relabel_partial_features(agg, day_pairs, mapping, customer_col="name-surname"):
+    """Ara sonucu ham isimden çözümlenmiş kimliğe (mapping: isim -> kimlik) taşır; aynı gün iki kez sayılmaz."""
+    agg = agg.groupby(agg.index.map(mapping), sort=False).agg({"total": "sum", "tx_count": "sum", "max_ticket": "max"})
+    agg.index.name = customer_col
+    day_pairs = day_pairs.assign(**{customer_col: day_pairs[customer_col].map(mapping)}).drop_duplicates()
+    return agg, day_pairs
+
+
+def finalize_features(agg, day_pairs, customer_col="name-surname"):
+    """Ara sonuçtan müşteri başına FEATURE_COLUMNS tablosunu üretir."""
+    features = agg.copy()
+    features["mean_ticket"] = features["total"] / features["tx_count"]
+    distinct_days = day_pairs.groupby(customer_col, sort=False).size()
+    features["distinct_days"] = distinct_days.reindex(features.index, fill_value=0)
+    return features[FEATURE_COLUMNS].rename_axis(customer_col).reset_index()
+
+
+def customer_features(df, customer_col="name-surname", time_col="create date", amount_col="total", day_keys=None):
+    """Tüm müşteriler için total, işlem sayısı, ortalama/en yüksek sepet ve farklı gün sayısı."""
+    agg, day_pairs = partial_features(df, customer_col, time_col, amount_col, day_keys)
+    return finalize_features(agg, day_pairs, customer_col)
+
+
+def robust_z(values):
+    """
+    Medyan/MAD tabanlı z-skoru. MAD sıfırsa (müşterilerin yarısından fazlası aynı
+    değerdeyse) ortalama mutlak sapmaya, o da sıfırsa 0'a düşülür.
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return values
+    median = np.median(values)
+    deviation = values - median
+    mad = np.median(np.abs(deviation))
+    if mad > 0:
+        return _MAD_SCALE * deviation / mad
+    mean_ad = np.mean(np.abs(deviation))
+    if mean_ad > 0:
+        return deviation / (_MEAN_AD_SCALE * mean_ad)
+    return np.zeros_like(values)
+
+
+def score_customers(features):
+    """
+    Her özellik için z_<özellik> sütunu ekler. anomaly_score en yüksek pozitif
+    z-skorudur (yalnızca ortalamanın üstündeki sapmalar şüphelidir), top_feature
+    bu skoru veren özelliktir. Sonuç skora göre sıralanır ve rank eklenir.
+    """
+    scored = features.copy()
+    z_columns = [f"z_{name}" for name in FEATURE_COLUMNS]
+    for name, z_name in zip(FEATURE_COLUMNS, z_columns):
+        scored[z_name] = robust_z(np.log1p(np.clip(scored[name].to_numpy(dtype=float), 0, None)))
+
+    z_values = scored[z_columns].to_numpy()
+    if len(scored):
+        scored["anomaly_score"] = np.clip(z_values.max(axis=1), 0, None)
+        scored["top_feature"] = np.array(FEATURE_COLUMNS)[z_values.argmax(axis=1)]
+    else:
+        scored["anomaly_score"] = pd.Series(dtype=float)
+        scored["top_feature"] = pd.Series(dtype=object)
+
+    scored = scored.sort_values(by=["anomaly_score", "total"], ascending=False, kind="stable").reset_index(drop=True)
+    scored.insert(0, "rank", np.arange(1, len(scored) + 1))
+    return scored
@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from bot_steps import STEP_TIMEOUT, StepFailed
+from jobs import report_progress
+from perf import stage
+
+# =========================================================
+# HTTP Seviyesinde Checkout (Selenium'suz)
+# =========================================================
+# Momento checkout'unu tarayıcı açmadan, doğrudan sayfa ve form uçlarına istek
+# atarak çalıştırır. Her checkout kendi çerez kavanozuna (requests.Session) sahiptir;
+# TCP/TLS bağlantıları ise tüm oturumların paylaştığı tek bir HTTPAdapter havuzundan
+# gelir. Adım kayıtları bot_steps.run_steps ile aynı biçimdedir, böylece yük testi
+# iki motoru aynı tablolarla raporlar. Arayüz doğrulaması için Selenium yolu kalır.
+# Form uçları (/giris-yap POST, /api/otp, /api/basket, /api/order) staging_stub'daki
+# taklide göre yazıldı, gerçek staging'de henüz doğrulanmadı. Doğrulanana kadar motor
+# yalnızca yerel taklide karşı çalışır; BOT_HTTP_ENDPOINTS_CONFIRMED=1 bu sınırı kaldırır.
+
+ENDPOINTS_CONFIRMED = os.environ.get("BOT_HTTP_ENDPOINTS_CONFIRMED") == "1"
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 100
+USER_AGENT = "edizmnt-http-checkout/1.0"
+
+_ADAPTER = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+
+
+class HttpStep:
+    """
+    method/path: istek. data: "{phone}" gibi bağlamla biçimlenen form alanları.
+    expect_json_ok: yanıt {"ok": true} içermeli (form uçları için).
+    """
+
+    def __init__(self, name, method, path, data=None, expect_json_ok=False, message=None, timeout=STEP_TIMEOUT):
+        self.name = name
+        self.action = method.lower()
+        self.target = path
+        self.data = data
+        self.expect_json_ok = expect_json_ok
+        self.message = message
+        self.timeout = timeout
+
+    def execute(self, session, base_url, context):
+        data = {k: str(v).format(**context) for k, v in self.data.items()} if self.data else None
+        response = session.request(self.action, base_url + self.target, data=data, timeout=self.timeout)
+        response.raise_for_status()
+        if self.expect_json_ok and not response.json().get("ok"):
+            raise ValueError(f"Beklenmeyen yanıt: {response.text[:200]}")
+        return response
+
+
+# Selenium CHECKOUT_STEPS ile aynı senaryo; sayfa ziyaretleri tarayıcının yüklediği
+# HTML'i, POST'lar sayfadaki butonların gönderdiği formları karşılar.
+HTTP_CHECKOUT_STEPS = [
+    HttpStep("login_page", "GET", "/giris-yap", message="Giriş sayfası alınıyor..."),
+    HttpStep("login_submit", "POST", "/giris-yap", {"username": "{phone}", "password": "{password}"},
+             expect_json_ok=True, message="Telefon ve şifre gönderiliyor..."),
+    HttpStep("otp_submit", "POST", "/api/otp", {"code": "1234"}, expect_json_ok=True, message="OTP doğrulanıyor..."),
+    HttpStep("category_page", "GET", "/gumus", message="Gümüş kategorisi alınıyor..."),
+    HttpStep("product_page", "GET", "/minted-50-gr-gumus", message="Ürün sayfası alınıyor..."),
+    HttpStep("add_to_basket", "POST", "/api/basket", {"product": "minted-50-gr-gumus", "quantity": 1},
+             expect_json_ok=True, message="Ürün sepete ekleniyor..."),
+    HttpStep("address_page", "GET", "/adres", message="Adres sayfası alınıyor..."),
+    HttpStep("cart_page", "GET", "/sepet", message="Sepet sayfası alınıyor..."),
+    HttpStep("payment_page", "GET", "/odeme", message="Ödeme sayfası alınıyor..."),
+    HttpStep("complete_order", "POST", "/api/order",
+             {"payment_method": "momento", "momentoNumber": "{momento_code}", "contract": 1, "contract2": 1},
+             expect_json_ok=True, message="Momento ile sipariş tamamlanıyor..."),
+]
+
+
+def target_allowed(base_url):
+    """Uçlar doğrulanmadıysa yalnızca yerel (staging taklidi) adreslere izin verilir."""
+    return ENDPOINTS_CONFIRMED or urlparse(base_url).hostname in LOCAL_HOSTS
+
+
+def new_session():
+    """
+    Boş çerezli, bağlantıları paylaşılan havuzdan alan oturum. Oturum kapatılmamalıdır:
+    Session.close() bağlı adaptörleri, yani tüm oturumların paylaştığı havuzu da kapatır.
+    """
+    session = requests.Session()
+    session.mount("http://", _ADAPTER)
+    session.mount("https://", _ADAPTER)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def run_http_checkout(base_url, context, steps=None, log=None, records=None):
+    """
+    Adımları tek bir çerez oturumuyla sırayla çalıştırır. records'a adım başına
+    {step, action, seconds, status, url} eklenir. Hata olursa StepFailed fırlatılır.
+    """
+    if not target_allowed(base_url):
+        raise ValueError("HTTP motorunun form uçları gerçek staging'de henüz doğrulanmadı; "
+                         "yalnızca yerel staging taklidine karşı çalıştırılabilir.")
+    records = [] if records is None else records
+    steps = steps or HTTP_CHECKOUT_STEPS
+    # Oturum bitince yalnızca çerezleriyle birlikte bırakılır; bağlantılar havuzda kalır
+    session = new_session()
+    for i, step in enumerate(steps):
+        if step.message and log:
+            log(step.message)
+        report_progress(i / len(steps), step.message or step.name)
+        status = "ok"
+        start = time.perf_counter()
+        try:
+            with stage(f"http_{step.name}"):
+                step.execute(session, base_url, context)
+        except Exception as e:
+            status = f"error: {type(e).__name__}"
+            raise StepFailed(step, e) from e
+        finally:
+            record = {
+                "step": step.name,
+                "action": step.action,
+                "seconds": round(time.perf_counter() - start, 4),
+                "status": status,
+                "url": step.target,
+            }
+            records.append(record)
+            logging.info(json.dumps({"event": "http_step", **record}, ensure_ascii=False))
+    return records
@@ -0,0 +1,194 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from cache import LRUCache, content_hash
+
+# =========================================================
+# Müşteri Kimlik Çözümleme (Bulanık İsim Eşleştirme)
+# =========================================================
+# "Ahmet Yılmaz", "AHMET YILMAZ", "ahmet  yilmaz" ve "Ahmet Yilmazz" aynı kişinin
+# toplamlarını böler. İsimler önce katlanır (casefold + Türkçe harf katlama +
+# boşluk), sonra benzer anahtarlar sıralı komşuluk (sorted neighbourhood)
+# bloklamasıyla kümelenir: her anahtar yalnızca sıralamada yakınındaki birkaç
+# anahtarla karşılaştırılır, O(n²) karşılaştırma yapılmaz. customer_id varsa
+# aynı kimliği taşıyan isimler doğrudan aynı kümeye girer.
+
+DEFAULT_SIMILARITY = 0.9
+DEFAULT_WINDOW = 4
+
+_TR_FOLD = str.maketrans({"ç": "c", "ğ": "g", "ı": "i", "ö": "o", "ş": "s", "ü": "u"})
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_BLANK_IDS = {"", "nan", "none", "null", "0"}
+
+# (benzersiz isim/kimlik çiftleri, eşik, pencere) -> {(isim, kimlik): temsilci isim}
+_IDENTITY_CACHE = LRUCache(max_entries=8)
+
+
+def fold_name(text):
+    """
+    Karşılaştırma anahtarı: küçük harf, Türkçe harfler ASCII'ye katlanmış,
+    noktalama atılmış, kelimeler alfabetik sıralı ("Yılmaz, Ahmet" -> "ahmet yilmaz").
+    """
+    text = str(text).replace("İ", "i").replace("I", "ı").casefold().translate(_TR_FOLD)
+    text = "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+    return " ".join(sorted(_NON_ALNUM.sub(" ", text).split()))
+
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, node):
+        root = node
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[node] != root:
+            self.parent[node], node = root, self.parent[node]
+        return root
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def _within_edits(a, b, max_edits):
+    """Levenshtein mesafesi max_edits'i aşmıyor mu? Bantlı DP, bant aşılınca erken çıkar."""
+    if abs(len(a) - len(b)) > max_edits:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        low, high = max(1, i - max_edits), min(len(b), i + max_edits)
+        current = [i] + [max_edits + 1] * len(b)
+        for j in range(low, high + 1):
+            cost = 0 if char_a == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+        if min(current[low - 1:high + 1]) > max_edits:
+            return False
+        previous = current
+    return previous[len(b)] <= max_edits
+
+
+def _within_one_edit(a, b):
+    """En sık durum (tek harf hatası) için doğrusal kontrol."""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > 1:
+        return False
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:]
+    return a[i:] == b[i + 1:]
+
+
+def _similar(a, b, threshold):
+    """Benzerlik = 1 - düzenleme mesafesi / uzun olanın uzunluğu (eşik 0.9 -> her 10 harfte 1 hata)."""
+    max_edits = int((1 - threshold) * max(len(a), len(b)) + 1e-9)
+    if max_edits == 0:
+        return False
+    if max_edits == 1:
+        return _within_one_edit(a, b)
+    return _within_edits(a, b, max_edits)
+
+
+def candidate_pairs(keys, window=DEFAULT_WINDOW):
+    """
+    Sıralı komşuluk bloklaması: anahtarlar hem düz hem ters çevrilmiş halleriyle
+    sıralanır (baştaki yazım hataları için) ve her anahtar sonraki window-1 anahtarla eşlenir.
+    """
+    keys = np.asarray(keys, dtype=object)
+    pairs = set()
+    for sort_keys in (keys, np.array([k[::-1] for k in keys], dtype=object)):
+        order = np.argsort(sort_keys, kind="stable")
+        for offset in range(1, window):
+            for a, b in zip(order[:-offset], order[offset:]):
+                pairs.add((min(a, b), max(a, b)))
+    return pairs
+
+
+def cluster_keys(keys, threshold=DEFAULT_SIMILARITY, window=DEFAULT_WINDOW, union_find=None):
+    """Benzer anahtarları birleştirir; union_find verilirse (ör. customer_id birleşimleri) üzerine ekler."""
+    union_find = union_find or _UnionFind(len(keys))
+    keys = list(keys)
+    for a, b in candidate_pairs(keys, window):
+        if keys[a] and keys[b] and _similar(keys[a], keys[b], threshold):
+            union_find.union(a, b)
+    return union_find
+
+
+def mask_blank_ids(ids):
+    """Boş / "nan" / "0" gibi yer tutucu kimlikleri NA yapar (ids: string dtype seri)."""
+    return ids.mask(ids.str.lower().isin(_BLANK_IDS))
+
+
+def clean_customer_ids(customer_ids):
+    """Boş / "nan" / "0" gibi anlamsız müşteri numaralarını NA yapar."""
+    return mask_blank_ids(customer_ids.astype("string").str.strip())
+
+
+def _build_mapping(pairs, counts, threshold, window):
+    """pairs: benzersiz (isim, kimlik) çiftleri; counts: her çiftin satır sayısı."""
+    names = pd.Series([name for name, _ in pairs], dtype=object)
+    ids = pd.Series([cid for _, cid in pairs], dtype=object)
+
+    keys = pd.Series([fold_name(n) if pd.notna(n) else "" for n in names], dtype=object)
+    key_codes, key_uniques = pd.factorize(keys)
+    id_codes, id_uniques = pd.factorize(ids, use_na_sentinel=True)
+
+    # Düğümler: katlanmış isim anahtarları + customer_id'ler
+    n_keys = len(key_uniques)
+    union_find = _UnionFind(n_keys + len(id_uniques))
+    has_name = (keys != "").to_numpy()
+    # İsimsiz satırlar yalnızca kimlik düğümüyle bağlanır; boş isim anahtarı ortak düğüm olmaz
+    for key_code, id_code, named in zip(key_codes, id_codes, has_name):
+        if id_code >= 0 and named:
+            union_find.union(key_code, n_keys + id_code)
+    cluster_keys(list(key_uniques), threshold, window, union_find)
+
+    nodes = np.where(has_name, key_codes, np.where(id_codes >= 0, n_keys + id_codes, -1))
+    roots = np.array([union_find.find(node) if node >= 0 else -1 for node in nodes])
+
+    # Temsilci: kümede en çok satırda geçen yazım (eşitlikte katlanmış hali en sık olan); isimsiz kümelerde kimlik
+    frame = pd.DataFrame({"root": roots, "name": names, "key": keys, "id": ids, "rows": counts, "has_name": has_name})
+    frame = frame[frame["root"] >= 0]
+    named = frame[frame["has_name"]]
+    representative = named.groupby(["root", "name", "key"])["rows"].sum().reset_index()
+    representative["key_rows"] = representative.groupby(["root", "key"])["rows"].transform("sum")
+    representative = representative.sort_values(["root", "rows", "key_rows", "name"], ascending=[True, False, False, True])
+    representative = representative.drop_duplicates("root").set_index("root")["name"]
+    id_only = frame[~frame["root"].isin(representative.index)].drop_duplicates("root").set_index("root")["id"]
+    representative = pd.concat([representative, "ID " + id_only.astype(str)])
+
+    labels = pd.Series(roots).map(representative)
+    return {pair: label for pair, label in zip(pairs, labels)}
+
+
+def resolve_identities(names, customer_ids=None, threshold=DEFAULT_SIMILARITY, window=DEFAULT_WINDOW):
+    """
+    Her satır için çözümlenmiş müşteri adını (kümenin temsilci yazımı) döndürür.
+    İsim ve kimliği boş satırlar NaN kalır. Eşleme, benzersiz (isim, kimlik) kümesi
+    başına önbelleğe alınır; aynı veriyle yeniden çalıştırmada kümeleme tekrarlanmaz.
+    """
+    if customer_ids is None:
+        customer_ids = pd.Series(pd.NA, index=names.index, dtype="string")
+    frame = pd.DataFrame({"name": names.to_numpy(dtype=object), "id": clean_customer_ids(customer_ids).to_numpy(dtype=object)})
+    frame = frame.where(frame.notna(), None)
+
+    grouped = frame.groupby(["name", "id"], dropna=False, sort=False)
+    inverse = grouped.ngroup().to_numpy()
+    unique = grouped.size()
+    pairs = list(unique.index)
+    pairs = [(None if pd.isna(n) else n, None if pd.isna(i) else i) for n, i in pairs]
+
+    key = (content_hash("\x1e".join(sorted(f"{n}\x1f{i}" for n, i in pairs)).encode("utf-8")), threshold, window)
+    mapping = _IDENTITY_CACHE.get_or_create(key, lambda: _build_mapping(pairs, unique.to_numpy(), threshold, window))
+
+    labels = np.array([mapping.get(pair, np.nan) for pair in pairs], dtype=object)
+    return pd.Series(labels[inverse], index=names.index, name=names.name)
@@ -5,6 +5,9 @@ import json
 from pathlib import Path
 import importlib
 
+import jobs
+import perf
+
 # =========================================================
 # Kullanıcı Yönetimi – JSON Dosyası
 # =========================================================
@@ -102,16 +105,102 @@ def user_management():
             st.success("Kullanıcı silindi!")
             st.rerun()
 
+# =========================================================
+# Performans Sayfası (yalnızca admin)
+# =========================================================
+
+def performance_page():
+    st.subheader("⏱️ Performans")
+    st.caption("Her sayfa çalıştırması ve içindeki aşamalar (yükleme, normalizasyon, ödeme eşleştirme, "
+               f"toplama, grafik, dışa aktarma, bot adımları) `{perf.PERF_LOG}` dosyasına kaydedilir.")
+
+    limit = st.number_input("İncelenecek son çalıştırma sayısı", min_value=10, max_value=5000, value=500, step=50)
+    runs = perf.load_runs(limit=int(limit))
+    if not runs:
+        st.info("Henüz kayıt yok.")
+        return
+
+    runs_df = perf.runs_frame(runs)
+    stages_df = perf.stages_frame(runs)
+
+    pages = sorted(runs_df["name"].dropna().unique())
+    selected = st.multiselect("Sayfa", pages, default=pages)
+    runs_df = runs_df[runs_df["name"].isin(selected)]
+    stages_df = stages_df[stages_df["name"].isin(selected)]
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Çalıştırma", f"{len(runs_df):,}")
+    col2.metric("p95 süre", f"{runs_df['seconds'].quantile(0.95):.2f} sn" if len(runs_df) else "-")
+    col3.metric("En yüksek RSS", f"{runs_df['peak_rss_mb'].max():,.0f} MB" if runs_df["peak_rss_mb"].notna().any()
+                else "-")
+
+    st.write("### 📊 Aşama Gecikmeleri (p50 / p90 / p95 / p99)")
+    st.dataframe(perf.stage_percentiles(stages_df), use_container_width=True)
+
+    st.write("### 🕒 Son Çalıştırmalar")
+    st.dataframe(runs_df.iloc[::-1].head(100), use_container_width=True)
+
+    st.write("### 🔍 Çalıştırma Detayı")
+    recent = [run for run in reversed(runs) if run.get("name") in selected][:100]
+    if recent:
+        chosen = st.selectbox(
+            "Çalıştırma", recent,
+            format_func=lambda run: f"{run['started']} · {run['name']} · {run.get('user') or '-'} · {run['seconds']:.2f} sn",
+        )
+        stages = pd.DataFrame(chosen.get("stages", []))
+        if not stages.empty and "offset" in stages.columns:
+            stages = stages.sort_values("offset")
+        st.dataframe(stages, use_container_width=True)
+
+# =========================================================
+# Arka Plan İşleri Sayfası
+# =========================================================
+
+def jobs_page(is_admin):
+    st.subheader("🧵 Arka Plan İşleri")
+    runner = jobs.get_job_runner()
+    stats = runner.stats()
+    st.caption(f"Aynı anda en fazla {stats['max_workers']} iş, kullanıcı başına {stats['max_per_user']} iş çalışır. "
+               "Sonuçlar ilgili sayfada (DB Merge, Fraud Kontrol, Staging Momento Test) gösterilir.")
+
+    col1, col2 = st.columns(2)
+    col1.metric("Çalışan", stats["running"])
+    col2.metric("Sırada", stats["queued"])
+
+    all_users = is_admin and st.toggle("Tüm kullanıcıların işleri", value=False)
+    job_list = runner.jobs(None if all_users else st.session_state["username"])
+    if not job_list:
+        st.info("Henüz iş yok.")
+        return
+
+    st.dataframe(
+        jobs.jobs_frame(job_list),
+        use_container_width=True,
+        hide_index=True,
+        column_config={"ilerleme": st.column_config.ProgressColumn("ilerleme", min_value=0.0, max_value=1.0)},
+    )
+
+    queued = [job for job in job_list if job.status == jobs.QUEUED]
+    if queued:
+        chosen = st.selectbox("Sıradaki iş", queued, format_func=lambda job: f"{job.id} · {job.title}")
+        if st.button("🚫 İşi İptal Et"):
+            runner.cancel(chosen.id, None if is_admin else st.session_state["username"])
+            st.rerun()
+    if any(job.status not in jobs.FINISHED for job in job_list):
+        if st.button("🔄 Yenile"):
+            st.rerun()
+
 # =========================================================
 # Ana Menü Paneli
 # =========================================================
 
 def call_module(module_name: str):
-    """Module import eder ve run() fonksiyonunu çalıştırır."""
+    """Module import eder ve run() fonksiyonunu çalıştırır (süre ve aşamalar perf günlüğüne yazılır)."""
     try:
         module = importlib.import_module(module_name)
         if hasattr(module, "run"):
-            module.run()
+            with perf.perf_run(module_name, user=st.session_state.get("username")):
+                module.run()
         else:
             st.error(f"❌ {module_name}.py içinde run() fonksiyonu yok!")
     except Exception as e:
@@ -121,17 +210,24 @@ def main_panel():
     st.title("🏠 Admin Paneli")
     st.success(f"Hoş geldin, **{st.session_state['username']}** 👋")
 
-    menu = st.sidebar.radio(
-        "Menü",
-        [
-            "Fraud Kontrol",
-            "DB Merge",
-            "OCR Dekont Okuma",
-            "Staging Momento Test",
-            "Kullanıcı Yönetimi",
-            "Çıkış"
-        ]
-    )
+    is_admin = load_users().get(st.session_state["username"], {}).get("role") == "admin"
+    menu_items = [
+        "Fraud Kontrol",
+        "DB Merge",
+        "OCR Dekont Okuma",
+        "Staging Momento Test",
+        "Arka Plan İşleri",
+        "Kullanıcı Yönetimi",
+    ]
+    if is_admin:
+        menu_items.append("Performans")
+    menu_items.append("Çıkış")
+
+    menu = st.sidebar.radio("Menü", menu_items)
+    active = [job for job in jobs.get_job_runner().jobs(st.session_state["username"])
+              if job.status not in jobs.FINISHED]
+    if active:
+        st.sidebar.caption(f"⚙️ {len(active)} arka plan işiniz sürüyor")
 
     if menu == "Fraud Kontrol":
         call_module("fc")
@@ -145,9 +241,15 @@ def main_panel():
     elif menu == "Staging Momento Test":
         call_module("bot")
 
+    elif menu == "Arka Plan İşleri":
+        jobs_page(is_admin)
+
     elif menu == "Kullanıcı Yönetimi":
         user_management()
 
+    elif menu == "Performans" and is_admin:
+        performance_page()
+
     elif menu == "Çıkış":
         st.session_state.clear()
         st.rerun()
@@ -0,0 +1,476 @@
+import atexit
+import contextvars
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+import perf
+from cache import LRUCache
+
+# =========================================================
+# Arka Plan İş Çalıştırıcı
+# =========================================================
+# Uzun işler (DB birleştirme, PDF, büyük CSV fraud kontrolü, bot / yük testi)
+# Streamlit betik iş parçacığında değil burada çalışır; sayfa işi gönderir, iş
+# kimliğini alır ve durumunu yoklar. Sıra adil tutulur: bir iş ancak toplamda
+# JOB_MAX_WORKERS'tan, o kullanıcı için JOB_MAX_PER_USER'dan az iş çalışıyorsa
+# başlar, böylece bir kullanıcının ağır işleri diğerlerini aç bırakmaz.
+# process=True işler ayrı süreçte çalışır (GIL'i tutan saf CPU işleri için;
+# fonksiyon modül düzeyinde, argüman ve sonuç pickle'lanabilir olmalı, ilerleme
+# bildirilemez). Sonuçlar job_store/ altına yazılır ve bellekten atılır; sayfa yeniden
+# çalıştığında, kullanıcı başka sayfaya gidip döndüğünde veya sunucu yeniden başladığında
+# diskten okunur. Son okunan birkaç sonuç küçük bir LRU önbellekte tutulur.
+
+JOB_MAX_WORKERS = int(os.environ.get("JOB_MAX_WORKERS", "4"))
+JOB_MAX_PER_USER = int(os.environ.get("JOB_MAX_PER_USER", "2"))
+JOB_MAX_PROCESSES = min(2, os.cpu_count() or 1)
+JOB_MAX_QUEUED_PER_USER = 10
+JOB_HISTORY = 100
+JOB_STORE = Path("job_store")
+POLL_SECONDS = 1.0
+RESULT_CACHE_MAX_ENTRIES = 4
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = {DONE, FAILED, CANCELLED}
+STATUS_LABELS = {QUEUED: "⏳ Sırada", RUNNING: "⚙️ Çalışıyor", DONE: "✅ Bitti", FAILED: "❌ Hata",
+                 CANCELLED: "🚫 İptal"}
+
+_CURRENT_JOB = contextvars.ContextVar("current_job", default=None)
+_NO_RESULT = object()
+# iş kimliği -> diskten okunmuş sonuç
+_RESULT_CACHE = LRUCache(max_entries=RESULT_CACHE_MAX_ENTRIES)
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+def _key_text(key):
+    # Anahtarlar (dosya hash'leri, tarih aralıkları...) kalıcı listeye yazılabilsin diye metne çevrilir
+    return None if key is None else json.dumps(key, default=str)
+
+
+class Job:
+    def __init__(self, user, kind, title, key=None, process=False, persist=True):
+        self.id = uuid.uuid4().hex[:12]
+        self.user = user
+        self.kind = kind
+        self.title = title
+        self.key = _key_text(key)
+        self.process = process
+        self.persist = persist
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.store_dir = JOB_STORE
+        self._result = _NO_RESULT
+
+    @property
+    def done(self):
+        return self.status == DONE
+
+    @property
+    def seconds(self):
+        if self.started is None:
+            return None
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def result(self):
+        """
+        İşin dönüş değeri. Kaydedilmeyen (persist=False) işlerde bellekten, diğerlerinde
+        job_store'dan (son okunanlar önbellekten) gelir; yoksa None.
+        """
+        if self._result is not _NO_RESULT:
+            return self._result
+        if not self.done:
+            return None
+        return _RESULT_CACHE.get_or_create(self.id, self._load_result)
+
+    def _load_result(self):
+        path = self.store_dir / f"{self.id}.pkl"
+        if not path.exists():
+            return None
+        try:
+            return pickle.loads(path.read_bytes())
+        except Exception as e:
+            logging.warning(f"İş sonucu okunamadı ({self.id}): {e}")
+            return None
+
+    def to_record(self):
+        return {
+            "id": self.id, "user": self.user, "kind": self.kind, "title": self.title,
+            "key": self.key,
+            "status": self.status, "progress": self.progress, "message": self.message, "error": self.error,
+            "created": self.created, "started": self.started, "finished": self.finished,
+        }
+
+    @classmethod
+    def from_record(cls, record):
+        job = cls(record["user"], record["kind"], record["title"])
+        job.id = record["id"]
+        job.key = record["key"]
+        for field in ("status", "progress", "message", "error", "created", "started", "finished"):
+            setattr(job, field, record.get(field))
+        return job
+
+
+def report_progress(fraction=None, message=None):
+    """Çalışan işin ilerlemesini (0-1) ve mesajını günceller. İş dışında çağrılırsa etkisizdir."""
+    job = _CURRENT_JOB.get()
+    if job is None:
+        return
+    if fraction is not None:
+        job.progress = min(max(float(fraction), 0.0), 1.0)
+    if message is not None:
+        job.message = message
+
+
+def progress_reporter():
+    """
+    report_progress'in o anki işe bağlı hali. İşin kendi açtığı iş parçacıklarında
+    (contextvar taşınmaz) ilerleme bildirmek için kullanılır.
+    """
+    job = _CURRENT_JOB.get()
+
+    def report(fraction=None, message=None):
+        token = _CURRENT_JOB.set(job)
+        try:
+            report_progress(fraction, message)
+        finally:
+            _CURRENT_JOB.reset(token)
+    return report
+
+
+class JobRunner:
+    def __init__(self, max_workers=JOB_MAX_WORKERS, max_per_user=JOB_MAX_PER_USER,
+                 max_processes=JOB_MAX_PROCESSES, store_dir=JOB_STORE):
+        self.max_workers = max_workers
+        self.max_per_user = max_per_user
+        self.max_processes = max_processes
+        self.store_dir = Path(store_dir)
+        self._threads = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._processes = None
+        self._lock = threading.RLock()
+        self._jobs = {}
+        self._pending = []
+        self._load()
+
+    # -----------------------------------------------------
+    # Gönderme ve zamanlama
+    # -----------------------------------------------------
+
+    def submit(self, user, kind, title, func, *args, key=None, process=False, persist=True, **kwargs):
+        """
+        İşi sıraya koyar ve Job döndürür. key verilirse aynı kullanıcı + tür + key için
+        sırada, çalışan veya başarıyla bitmiş iş varsa yenisi açılmaz, o döndürülür.
+        Kaydedilmeyen (persist=False) bitmiş işler tekrar kullanılmaz: sonuçları süreç
+        önbelleklerinden düşmüş olabilir, yeniden gönderim işi tekrar çalıştırır.
+        """
+        with self._lock:
+            if key is not None:
+                existing = self.latest(user, kind, key)
+                reusable = (QUEUED, RUNNING, DONE) if existing is not None and existing.persist else (QUEUED, RUNNING)
+                if existing is not None and existing.status in reusable:
+                    return existing
+            queued = sum(1 for job, *_ in self._pending if job.user == user)
+            if queued >= JOB_MAX_QUEUED_PER_USER:
+                raise JobQueueFull(f"Sırada zaten {queued} işiniz var; biri bitince tekrar deneyin.")
+
+            job = Job(user, kind, title, key, process, persist)
+            job.store_dir = self.store_dir
+            self._jobs[job.id] = job
+            self._pending.append((job, func, args, kwargs))
+            self._dispatch()
+        return job
+
+    def _running(self, user=None, process=None):
+        return sum(1 for job in self._jobs.values()
+                   if job.status == RUNNING and (user is None or job.user == user)
+                   and (process is None or job.process == process))
+
+    def _dispatch(self):
+        """Sınırlar elverdiği sürece sıradaki ilk uygun işi başlatır (kilit altında çağrılır)."""
+        with self._lock:
+            started = True
+            while started and self._running() < self.max_workers:
+                started = False
+                for i, (job, func, args, kwargs) in enumerate(self._pending):
+                    if self._running(user=job.user) >= self.max_per_user:
+                        continue
+                    if job.process and self._running(process=True) >= self.max_processes:
+                        continue
+                    del self._pending[i]
+                    self._start(job, func, args, kwargs)
+                    started = True
+                    break
+
+    def _start(self, job, func, args, kwargs):
+        job.status = RUNNING
+        job.started = time.time()
+        if not job.process:
+            self._threads.submit(self._run_thread, job, func, args, kwargs)
+            return
+        job.message = "Ayrı süreçte çalışıyor..."
+        try:
+            future = self._get_process_pool().submit(func, *args, **kwargs)
+        except Exception as e:
+            self._reset_process_pool()
+            self._finish(job, error=e)
+            return
+        future.add_done_callback(lambda f: self._finish_process(job, f))
+
+    def _run_thread(self, job, func, args, kwargs):
+        token = _CURRENT_JOB.set(job)
+        try:
+            with perf.perf_run(f"job:{job.kind}", user=job.user, job_id=job.id):
+                result = func(*args, **kwargs)
+        except Exception as e:
+            logging.exception(f"İş başarısız ({job.id} {job.kind})")
+            self._finish(job, error=e)
+        else:
+            self._finish(job, result)
+        finally:
+            _CURRENT_JOB.reset(token)
+
+    def _finish_process(self, job, future):
+        if future.cancelled():
+            return self._finish(job, error=RuntimeError("İş iptal edildi"))
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            self._reset_process_pool()
+        self._finish(job, future.result() if error is None else None, error)
+
+    def _finish(self, job, result=None, error=None):
+        job.finished = time.time()
+        if error is None:
+            job._result = result
+            job.progress = 1.0
+            job.status = DONE
+        else:
+            job.error = f"{type(error).__name__}: {error}"
+            job.status = FAILED
+        if job.persist:
+            self._persist(job)
+        with self._lock:
+            self._trim()
+            self._save_index()
+            self._dispatch()
+
+    def _get_process_pool(self):
+        if self._processes is None:
+            # Streamlit sunucusu çok iş parçacıklı olduğu için süreçler "spawn" ile açılır
+            self._processes = ProcessPoolExecutor(max_workers=self.max_processes,
+                                                  mp_context=multiprocessing.get_context("spawn"))
+        return self._processes
+
+    def _reset_process_pool(self):
+        with self._lock:
+            if self._processes is not None:
+                self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+
+    def cancel(self, job_id, user=None):
+        """Yalnızca sıradaki (başlamamış) işler iptal edilebilir."""
+        with self._lock:
+            for i, (job, *_) in enumerate(self._pending):
+                if job.id == job_id and (user is None or job.user == user):
+                    del self._pending[i]
+                    job.status = CANCELLED
+                    job.finished = time.time()
+                    self._save_index()
+                    return True
+        return False
+
+    def shutdown(self):
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        self._reset_process_pool()
+
+    # -----------------------------------------------------
+    # Sorgular
+    # -----------------------------------------------------
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, user=None, kind=None):
+        """İşler, en yeniden eskiye."""
+        with self._lock:
+            jobs = [job for job in self._jobs.values()
+                    if (user is None or job.user == user) and (kind is None or job.kind == kind)]
+        return sorted(jobs, key=lambda job: job.created, reverse=True)
+
+    def latest(self, user, kind, key=None):
+        """Kullanıcının o türdeki en yeni işi (key verilirse o key için)."""
+        key = _key_text(key)
+        return next((job for job in self.jobs(user, kind) if key is None or job.key == key), None)
+
+    def stats(self):
+        with self._lock:
+            return {"running": self._running(), "queued": len(self._pending), "max_workers": self.max_workers,
+                    "max_per_user": self.max_per_user}
+
+    # -----------------------------------------------------
+    # Kalıcılık
+    # -----------------------------------------------------
+
+    def _persist(self, job):
+        """Sonucu diske yazar ve iş nesnesinden bırakır (yazılamazsa bellekte kalır)."""
+        if job.status != DONE:
+            return
+        try:
+            self.store_dir.mkdir(exist_ok=True)
+            (self.store_dir / f"{job.id}.pkl").write_bytes(pickle.dumps(job._result))
+        except Exception as e:
+            logging.warning(f"İş sonucu kaydedilemedi ({job.id}): {e}")
+            return
+        # Sayfa sonucu hemen okuyacağı için önbelleğe konur; önbellekten düşünce diskten okunur
+        _RESULT_CACHE.put(job.id, job._result)
+        job._result = _NO_RESULT
+
+    def _trim(self):
+        """JOB_HISTORY'yi aşan en eski bitmiş işleri ve sonuç dosyalarını siler."""
+        finished = sorted((job for job in self._jobs.values() if job.status in FINISHED), key=lambda job: job.created)
+        for job in finished[:max(len(finished) - JOB_HISTORY, 0)]:
+            del self._jobs[job.id]
+            (self.store_dir / f"{job.id}.pkl").unlink(missing_ok=True)
+
+    def _save_index(self):
+        records = [job.to_record() for job in self._jobs.values() if job.persist]
+        try:
+            self.store_dir.mkdir(exist_ok=True)
+            tmp = self.store_dir / "jobs.json.tmp"
+            tmp.write_text(json.dumps(records, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(self.store_dir / "jobs.json")
+        except OSError as e:
+            logging.warning(f"İş listesi kaydedilemedi: {e}")
+
+    def _load(self):
+        path = self.store_dir / "jobs.json"
+        if not path.exists():
+            return
+        try:
+            records = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"İş listesi okunamadı: {e}")
+            return
+        for record in records:
+            job = Job.from_record(record)
+            job.store_dir = self.store_dir
+            if job.status not in FINISHED:
+                job.status = FAILED
+                job.error = "Sunucu yeniden başladığı için iş yarıda kaldı."
+                job.finished = job.finished or time.time()
+            self._jobs[job.id] = job
+
+
+_RUNNER = None
+_RUNNER_LOCK = threading.Lock()
+
+
+def get_job_runner():
+    """Süreç genelinde tek çalıştırıcı (Streamlit yeniden çalıştırmalarında ve oturumlar arasında korunur)."""
+    global _RUNNER
+    with _RUNNER_LOCK:
+        if _RUNNER is None:
+            _RUNNER = JobRunner()
+            atexit.register(_RUNNER.shutdown)
+        return _RUNNER
+
+
+# =========================================================
+# Streamlit Yardımcıları
+# =========================================================
+
+def current_user():
+    return st.session_state.get("username") or "anonim"
+
+
+def submit(kind, title, func, *args, **kwargs):
+    """O anki kullanıcı adına iş gönderir; sıra doluysa hata gösterip None döndürür."""
+    try:
+        return get_job_runner().submit(current_user(), kind, title, func, *args, **kwargs)
+    except JobQueueFull as e:
+        st.error(f"❌ {e}")
+        return None
+
+
+def latest(kind, key=None):
+    return get_job_runner().latest(current_user(), kind, key)
+
+
+def _progress_text(job):
+    parts = [f"{STATUS_LABELS[job.status]} · {job.title}"]
+    if job.message:
+        parts.append(job.message)
+    if job.seconds is not None:
+        parts.append(f"{job.seconds:.0f} sn")
+    return " · ".join(parts)
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def _poll(job_id):
+    job = get_job_runner().get(job_id)
+    if job is None or job.status in FINISHED:
+        # İş bitti: sayfanın tamamı sonuçla yeniden çalışsın
+        st.rerun()
+    st.progress(job.progress or 0.0, text=_progress_text(job))
+    if job.status == QUEUED:
+        stats = get_job_runner().stats()
+        st.caption(f"Sırada bekliyor ({stats['running']}/{stats['max_workers']} iş çalışıyor, "
+                   f"kullanıcı başına en fazla {stats['max_per_user']}).")
+        if st.button("İptal", key=f"cancel_{job_id}"):
+            get_job_runner().cancel(job_id, job.user)
+            st.rerun()
+
+
+def job_status(job):
+    """
+    İşin durumunu gösterir. Bitmemişse ilerleme çubuğu her POLL_SECONDS'ta yenilenir ve iş
+    bitince sayfa yeniden çalışır. Dönüş: iş başarıyla bittiyse True.
+    """
+    if job is None:
+        return False
+    if job.status == DONE:
+        st.caption(f"{STATUS_LABELS[DONE]} · {job.title} · {job.seconds or 0:.1f} sn · iş {job.id}")
+        return True
+    if job.status == FAILED:
+        st.error(f"❌ {job.title} başarısız: {job.error}")
+        return False
+    if job.status == CANCELLED:
+        st.info(f"🚫 {job.title} iptal edildi.")
+        return False
+    _poll(job.id)
+    return False
+
+
+def jobs_frame(jobs):
+    rows = [{
+        "iş": job.id,
+        "kullanıcı": job.user,
+        "tür": job.kind,
+        "başlık": job.title,
+        "durum": STATUS_LABELS.get(job.status, job.status),
+        "ilerleme": job.progress or 0.0,
+        "mesaj": job.error or job.message,
+        "oluşturma": datetime.fromtimestamp(job.created).strftime("%Y-%m-%d %H:%M:%S"),
+        "süre_sn": round(job.seconds, 1) if job.seconds is not None else None,
+    } for job in jobs]
+    return pd.DataFrame(rows)
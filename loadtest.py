@@ -0,0 +1,282 @@
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import pandas as pd
+import streamlit as st
+
+import jobs
+from bot import BASE_URL, checkout_steps, start_bot, start_http_bot
+from driver_pool import DriverPool, reset_driver
+from http_checkout import ENDPOINTS_CONFIRMED
+from staging_stub import start_stub_server
+
+# =========================================================
+# Momento Checkout Yük Testi
+# =========================================================
+# K sanal kullanıcı, test hesapları listesinden sırayla hesap alarak start_bot
+# akışını eşzamanlı çalıştırır. Tarayıcılar bu teste özel, boyutu sınırlı bir
+# DriverPool'dan alınır (kullanıcı sayısı havuzdan büyükse sıra beklenir).
+# engine="http" ile tarayıcı yerine http_checkout kullanılır (havuz gerekmez).
+# ramp_up süresince kullanıcılar eşit aralıklarla başlatılır. Sonuç: verim,
+# başarı oranı ve checkout / adım bazında p50/p95/p99 gecikmeler.
+
+MAX_USERS = 50
+PERCENTILES = [0.5, 0.95, 0.99]
+
+
+def parse_accounts(text):
+    """
+    Her satır: telefon,şifre,momento_kodu (virgül, noktalı virgül veya sekme ile).
+    Boş ve # ile başlayan satırlar atlanır; eksik alanlı satırlar hata verir.
+    """
+    accounts = []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = [p.strip() for p in line.replace(";", ",").replace("\t", ",").split(",")]
+        if len(parts) != 3 or not all(parts):
+            raise ValueError(f"{line_no}. satır 'telefon,şifre,momento_kodu' biçiminde değil: {line}")
+        accounts.append({"phone": parts[0], "password": parts[1], "momento_code": parts[2]})
+    return accounts
+
+
+def stub_accounts(count):
+    """Staging taklidi hesap doğrulamadığından yer tutucu hesaplar yeterlidir."""
+    return [{"phone": f"5550000{i:03d}", "password": "test", "momento_code": f"{i:06d}"} for i in range(count)]
+
+
+def _virtual_user(user, iterations, delay, accounts, checkout, t0, results, lock, progress):
+    time.sleep(delay)
+    for iteration in range(iterations):
+        account = accounts[(user * iterations + iteration) % len(accounts)]
+        timings = []
+        started = time.perf_counter()
+        result = checkout(account, timings)
+        seconds = time.perf_counter() - started
+        step_seconds = sum(r["seconds"] for r in timings)
+        with lock:
+            results.append({
+                "user": user,
+                "iteration": iteration,
+                "account": account["phone"],
+                "ok": result is True,
+                "error": None if result is True else result,
+                "offset": round(started - t0, 3),
+                "seconds": round(seconds, 4),
+                # Tarayıcı bekleme + açma/temizleme süresi (adımlar dışındaki her şey)
+                "queue_seconds": round(max(seconds - step_seconds, 0.0), 4),
+                "timings": timings,
+            })
+            done = len(results)
+        if progress:
+            progress(done, f"{done} checkout tamamlandı")
+
+
+def run_load(accounts, users, pool_size=2, ramp_up=0.0, iterations=1, base_url=BASE_URL, engine="browser",
+             progress=None):
+    """
+    users sanal kullanıcıyı çalıştırır; tarayıcı motorunda en fazla pool_size tarayıcı açılır.
+    progress(biten, mesaj): her checkout sonrası çağrılır. Dönüş: summarize() çıktısı.
+    Test bitince havuzdaki tarayıcılar kapatılır.
+    """
+    if not accounts:
+        raise ValueError("En az bir test hesabı gerekli.")
+    users = max(1, min(users, MAX_USERS))
+    pool = DriverPool(size=max(1, pool_size), reset=partial(reset_driver, origins=[base_url]))
+    if engine == "http":
+        def checkout(account, timings):
+            return start_http_bot(account["phone"], account["password"], account["momento_code"], None,
+                                  timings=timings, base_url=base_url)
+    else:
+        steps = checkout_steps(base_url)
+
+        def checkout(account, timings):
+            return start_bot(account["phone"], account["password"], account["momento_code"], None,
+                             pool=pool, timings=timings, steps=steps)
+    results = []
+    lock = threading.Lock()
+
+    t0 = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=users, thread_name_prefix="vu") as executor:
+            futures = [
+                executor.submit(_virtual_user, user, iterations, ramp_up * user / users, accounts, checkout,
+                                t0, results, lock, progress)
+                for user in range(users)
+            ]
+            for future in futures:
+                future.result()
+        wall_seconds = time.perf_counter() - t0
+    finally:
+        pool.shutdown()
+
+    return summarize(results, wall_seconds, engine=engine, users=users, pool_size=pool.size, ramp_up=ramp_up,
+                     base_url=base_url, pool_stats=pool.stats())
+
+
+def _percentile_table(df, by, value="seconds"):
+    grouped = df.groupby(by, sort=False)
+    table = grouped[value].quantile(PERCENTILES).unstack()
+    table.columns = [f"p{int(q * 100)}_s" for q in PERCENTILES]
+    table.insert(0, "count", grouped.size())
+    table["max_s"] = grouped[value].max()
+    return table
+
+
+def summarize(results, wall_seconds, **meta):
+    """
+    Dönüş: {"summary": genel metrikler, "checkouts": checkout başına satır,
+    "steps": adım bazında adet / hata / p50-p95-p99 tablosu}.
+    """
+    checkouts = pd.DataFrame([{k: v for k, v in r.items() if k != "timings"} for r in results],
+                             columns=["user", "iteration", "account", "ok", "error", "offset", "seconds",
+                                      "queue_seconds"])
+    step_rows = [dict(t, user=r["user"], iteration=r["iteration"]) for r in results for t in r["timings"]]
+    step_df = pd.DataFrame(step_rows, columns=["user", "iteration", "step", "action", "seconds", "status", "url"])
+
+    succeeded = int(checkouts["ok"].sum())
+    summary = {
+        **meta,
+        "checkouts": len(checkouts),
+        "succeeded": succeeded,
+        "success_rate": round(succeeded / len(checkouts), 4) if len(checkouts) else 0.0,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_per_min": round(succeeded / wall_seconds * 60, 2) if wall_seconds else 0.0,
+    }
+    if succeeded:
+        ok_seconds = checkouts.loc[checkouts["ok"], "seconds"]
+        for q in PERCENTILES:
+            summary[f"checkout_p{int(q * 100)}_s"] = round(float(ok_seconds.quantile(q)), 4)
+
+    steps = pd.DataFrame()
+    if not step_df.empty:
+        steps = _percentile_table(step_df, "step")
+        steps.insert(1, "errors", step_df[step_df["status"] != "ok"].groupby("step").size())
+        steps["errors"] = steps["errors"].fillna(0).astype(int)
+        steps = steps.round(4).reset_index()
+
+    return {"summary": summary, "checkouts": checkouts, "steps": steps}
+
+
+def load_job(accounts, users, pool_size, ramp_up, iterations, engine, use_stub):
+    """Arka plan işi: yük testi (istenirse yerel staging taklidi açılıp kapatılır)."""
+    report_progress = jobs.progress_reporter()
+    total = users * iterations
+    server = start_stub_server(latency=0.05) if use_stub else None
+    try:
+        return run_load(accounts, users, pool_size, ramp_up, iterations, server.url if server else BASE_URL, engine,
+                        progress=lambda done, message: report_progress(done / total, message))
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+
+
+def load_test_panel(engine="browser"):
+    """Bot sayfasındaki 'Yük testi' modu."""
+    st.subheader("🚦 Yük Testi")
+    accounts_text = st.text_area("Test hesapları (her satır: telefon,şifre,momento_kodu)", height=120)
+
+    col1, col2, col3, col4 = st.columns(4)
+    users = col1.number_input("Sanal kullanıcı", 1, MAX_USERS, 4)
+    pool_size = col2.number_input("Tarayıcı havuzu", 1, 10, 2, disabled=engine == "http")
+    ramp_up = col3.number_input("Ramp-up (sn)", 0.0, 600.0, 0.0, step=1.0)
+    iterations = col4.number_input("Kullanıcı başına alım", 1, 20, 1)
+    stub_only = engine == "http" and not ENDPOINTS_CONFIRMED
+    use_stub = st.checkbox("Yerel staging taklidine karşı çalıştır", value=True, disabled=stub_only,
+                           help="Gerçek staging yerine yerelde açılan taklit sunucu kullanılır; hesaplar gerekmez."
+                                + (" HTTP motorunun uçları gerçek staging'de doğrulanmadığından zorunludur."
+                                   if stub_only else ""))
+    use_stub = use_stub or stub_only
+
+    if st.button("Yük Testini Başlat"):
+        try:
+            accounts = parse_accounts(accounts_text)
+        except ValueError as e:
+            st.error(str(e))
+            accounts = None
+        if use_stub and accounts == []:
+            accounts = stub_accounts(int(users))
+        if accounts == []:
+            st.error("Lütfen en az bir test hesabı girin!")
+        elif accounts:
+            jobs.submit("loadtest", f"Yük testi · {int(users)} kullanıcı × {int(iterations)} · {engine}", load_job,
+                        accounts, int(users), int(pool_size), float(ramp_up), int(iterations), engine, use_stub)
+
+    job = jobs.latest("loadtest")
+    if job is None or not jobs.job_status(job):
+        return
+    report = job.result
+    summary = report["summary"]
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Başarılı / Toplam", f"{summary['succeeded']} / {summary['checkouts']}")
+    m2.metric("Başarı Oranı", f"%{summary['success_rate'] * 100:.1f}")
+    m3.metric("Verim", f"{summary['throughput_per_min']:.1f} alım/dk")
+    m4.metric("Checkout p95", f"{summary['checkout_p95_s']:.2f} sn" if summary["succeeded"] else "-")
+
+    st.markdown("#### Adım Gecikmeleri")
+    st.dataframe(report["steps"], use_container_width=True, hide_index=True)
+    st.markdown("#### Checkout'lar")
+    st.dataframe(report["checkouts"], use_container_width=True, hide_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Momento checkout akışı için eşzamanlı yük testi")
+    parser.add_argument("--users", type=int, default=4, help="Eşzamanlı sanal kullanıcı sayısı")
+    parser.add_argument("--engine", choices=["browser", "http"], default="browser",
+                        help="browser: Selenium + tarayıcı havuzu, http: tarayıcısız form istekleri")
+    parser.add_argument("--pool", type=int, default=2, help="Aynı anda açık en fazla tarayıcı")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Tüm kullanıcıların başlatılacağı süre (sn)")
+    parser.add_argument("--iterations", type=int, default=1, help="Kullanıcı başına checkout sayısı")
+    parser.add_argument("--accounts", help="telefon,şifre,momento_kodu satırlarından oluşan dosya")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--stub", action="store_true", help="Yerel staging taklidine karşı çalıştır")
+    parser.add_argument("--stub-latency", type=float, default=0.05, help="Taklit sunucuda istek başına gecikme (sn)")
+    parser.add_argument("--json", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    if args.engine == "http" and not args.stub and not ENDPOINTS_CONFIRMED:
+        parser.error("HTTP motorunun form uçları gerçek staging'de doğrulanmadı; --stub ile çalıştırın "
+                     "(doğrulandıysa BOT_HTTP_ENDPOINTS_CONFIRMED=1)")
+
+    if args.accounts:
+        with open(args.accounts, encoding="utf-8") as f:
+            accounts = parse_accounts(f.read())
+    elif args.stub:
+        accounts = stub_accounts(args.users)
+    else:
+        parser.error("--accounts gerekli (ya da --stub ile taklit hesaplar kullanılır)")
+
+    server = start_stub_server(latency=args.stub_latency) if args.stub else None
+    try:
+        report = run_load(accounts, args.users, args.pool, args.ramp_up, args.iterations,
+                          server.url if server else args.base_url, args.engine)
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+
+    summary = report["summary"]
+    if server:
+        summary["stub_counts"] = server.counts
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if not report["steps"].empty:
+        print(report["steps"].to_string(index=False))
+    errors = report["checkouts"].loc[~report["checkouts"]["ok"], "error"]
+    for error in errors.value_counts().head(5).index:
+        print(f"HATA: {error}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "checkouts": report["checkouts"].to_dict("records"),
+                       "steps": report["steps"].to_dict("records")}, f, ensure_ascii=False, indent=2, default=str)
+        print(f"Sonuçlar yazıldı: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
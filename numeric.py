@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+# =========================================================
+# Türkçe / Uluslararası Sayı Ayrıştırıcı
+# =========================================================
+# "1.234,56", "1,234.56", "1234,5", "₺ 900", "12.50 TL" gibi karışık biçimleri
+# çözer. Sayısal sütunlara hiç dokunmaz; metin sütunlarında her farklı değer
+# yalnızca bir kez ayrıştırılır. Ondalık ayırıcı hücre bazında değil sütun
+# bazında belirlenir, belirsiz değerler ("1.234") bu karara göre okunur.
+
+TR_LOCALE = "tr"  # ondalık ",", binlik "."
+EN_LOCALE = "en"  # ondalık ".", binlik ","
+DEFAULT_LOCALE = TR_LOCALE
+
+_THOUSANDS_ONLY = r"^-?\d{1,3}(?:[.,]\d{3})+$"
+
+
+def _separator_features(cleaned):
+    """Ayırıcı maskelerini bir kez hesaplar (locale tespiti ve ayrıştırma ortak kullanır)."""
+    has_comma = cleaned.str.contains(",", regex=False)
+    has_dot = cleaned.str.contains(".", regex=False)
+    return {
+        "has_comma": has_comma,
+        "has_dot": has_dot,
+        "both": has_comma & has_dot,
+        # Virgülden sonra nokta gelmiyorsa son ayırıcı virgüldür
+        "comma_last": cleaned.str.contains(r",[^.]*$"),
+        "comma_count": cleaned.str.count(","),
+        "dot_count": cleaned.str.count(r"\."),
+        "thousands_like": cleaned.str.match(_THOUSANDS_ONLY),
+    }
+
+
+def detect_locale(cleaned, features=None):
+    """
+    Temizlenmiş benzersiz metinlerden sütunun ondalık ayırıcısını oylayarak bulur.
+    Kanıt yoksa DEFAULT_LOCALE döner.
+    """
+    f = features or _separator_features(cleaned)
+    has_comma, has_dot, both, comma_last = f["has_comma"], f["has_dot"], f["both"], f["comma_last"]
+    comma_count, dot_count, thousands_like = f["comma_count"], f["dot_count"], f["thousands_like"]
+
+    tr_votes = (
+        (both & comma_last).sum()
+        + (has_comma & ~has_dot & (comma_count == 1) & ~thousands_like).sum()
+        + (has_dot & ~has_comma & (dot_count > 1)).sum()
+    )
+    en_votes = (
+        (both & ~comma_last).sum()
+        + (has_dot & ~has_comma & (dot_count == 1) & ~thousands_like).sum()
+        + (has_comma & ~has_dot & (comma_count > 1)).sum()
+    )
+
+    if tr_votes == en_votes:
+        return DEFAULT_LOCALE
+    return TR_LOCALE if tr_votes > en_votes else EN_LOCALE
+
+
+def _parse_strings(values, locale=None):
+    """Benzersiz metin dizisini float dizisine çevirir. Dönüş: (değerler, locale)"""
+    raw = pd.Series(values, dtype="string")
+    cleaned = raw.str.replace(r"[^0-9,.\-]", "", regex=True)
+    f = _separator_features(cleaned)
+    locale = locale or detect_locale(cleaned, f)
+    thousands_sep = "." if locale == TR_LOCALE else ","
+    has_comma, has_dot, both, comma_last = f["has_comma"], f["has_dot"], f["both"], f["comma_last"]
+
+    # 1) İki ayırıcı birden: sondaki her zaman ondalıktır
+    tr_style = cleaned.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    en_style = cleaned.str.replace(",", "", regex=False)
+    result = en_style.where(~(both & comma_last), tr_style)
+
+    # 2) Tek tür ayırıcı: birden fazla geçiyorsa binliktir; tek geçiyorsa sütunun
+    #    ondalığıysa ondalık, değilse yalnızca "1.234" kalıbındaysa binlik kabul edilir
+    single = ~both & (has_comma | has_dot)
+    sep_count = f["comma_count"] + f["dot_count"]
+    is_thousands_sep = (has_comma & (thousands_sep == ",")) | (has_dot & (thousands_sep == "."))
+    as_thousands = single & ((sep_count > 1) | (is_thousands_sep & f["thousands_like"]))
+    without_seps = cleaned.str.replace(",", "", regex=False).str.replace(".", "", regex=False)
+    as_decimal = cleaned.str.replace(",", ".", regex=False)
+
+    result = result.where(~single, as_decimal)
+    result = result.where(~as_thousands, without_seps)
+
+    parsed = pd.to_numeric(result.where(result != "", None), errors="coerce")
+    return parsed.to_numpy(dtype=float, na_value=np.nan), locale
+
+
+def parse_numeric(series, locale=None, return_report=False):
+    """
+    Seriyi float'a çevirir. Boş hücreler ve çözülemeyen değerler NaN olur (0 ile doldurulmaz).
+    return_report=True ise (seri, rapor) döner; rapor: locale, unparseable (satır sayısı), examples.
+    """
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        result = series.astype(float)
+        if return_report:
+            return result, {"locale": None, "unparseable": 0, "examples": []}
+        return result
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    uniques = np.asarray(uniques, dtype=object)
+    parsed = np.full(len(uniques), np.nan)
+
+    # Hücre zaten sayıysa (openpyxl karışık sütunlarda int/float döndürür) doğrudan kullanılır
+    kinds = pd.Series(uniques, dtype=object).map(type)
+    is_number = kinds.isin([int, float, np.int64, np.float64]).to_numpy()
+    parsed[is_number] = uniques[is_number].astype(float)
+
+    text = pd.Series(uniques[~is_number], dtype=object).astype(str).str.strip().to_numpy(dtype=object)
+    detected = None
+    if len(text):
+        parsed[~is_number], detected = _parse_strings(text, locale)
+
+    # Boş olmayan ama sayıya çevrilemeyen değerler raporlanır
+    failed = np.zeros(len(uniques), dtype=bool)
+    failed[~is_number] = np.isnan(parsed[~is_number]) & (text != "")
+
+    values = np.append(parsed, np.nan)[codes]
+    result = pd.Series(values, index=series.index, name=series.name)
+    if not return_report:
+        return result
+
+    failed_rows = int(np.append(failed, False)[codes].sum())
+    report = {
+        "locale": detected,
+        "unparseable": failed_rows,
+        "examples": [str(u) for u in uniques[failed][:5]],
+    }
+    return result, report
@@ -0,0 +1,153 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import matplotlib
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+
+from cache import LRUCache, config_hash, content_hash
+from perf import timed
+
+# =========================================================
+# Bellek İçi PDF Rapor Motoru
+# =========================================================
+# Önbellekte olmayan grafikler iş parçacıklarında paralel olarak PNG baytlarına
+# çizilir (Agg çizimi ve PNG sıkıştırması GIL'i bırakır; alt süreç açılışı ve
+# db/streamlit içe aktarma maliyeti ödenmez) ve diske yazılmadan (BytesIO ile) PDF'e gömülür. Unicode TTF yazı tipi bulunursa Türkçe
+# karakterler korunur; bulunamazsa çekirdek yazı tipi + ASCII katlamaya düşülür.
+# Üretilen PDF, (özet, grafik PNG özetleri) anahtarıyla saklanır.
+
+RASTER_MAX_WORKERS = min(6, os.cpu_count() or 1)
+PDF_CACHE_MAX_ENTRIES = 8
+_PDF_CACHE = LRUCache(max_entries=PDF_CACHE_MAX_ENTRIES)
+
+# matplotlib DejaVu Sans'ı her kurulumla birlikte getirir; ayrı bir font dosyası gerekmez
+FONT_FAMILY = "DejaVu"
+FONT_CANDIDATES = {
+    "": ["DejaVuSans.ttf"],
+    "B": ["DejaVuSans-Bold.ttf"],
+}
+FONT_DIRS = [
+    os.path.join(matplotlib.get_data_path(), "fonts", "ttf"),
+    "/usr/share/fonts/truetype/dejavu",
+]
+
+
+def find_unicode_fonts():
+    """{stil: ttf yolu}; normal ve kalın stilin ikisi de bulunamazsa None."""
+    fonts = {}
+    for style, names in FONT_CANDIDATES.items():
+        for folder in FONT_DIRS:
+            path = next((os.path.join(folder, n) for n in names if os.path.isfile(os.path.join(folder, n))), None)
+            if path:
+                fonts[style] = path
+                break
+    return fonts if len(fonts) == len(FONT_CANDIDATES) else None
+
+
+UNICODE_FONTS = find_unicode_fonts()
+
+
+# PDF için Türkçe Karakter Temizleyici (yalnızca Unicode yazı tipi yoksa kullanılır)
+def clean_text_for_pdf(text):
+    if not isinstance(text, str):
+        return str(text)
+    replacements = {
+        'ş': 's', 'Ş': 'S', 'ı': 'i', 'İ': 'I', 'ğ': 'g', 'Ğ': 'G',
+        'ü': 'u', 'Ü': 'U', 'ö': 'o', 'Ö': 'O', 'ç': 'c', 'Ç': 'C'
+    }
+    for search, replace in replacements.items():
+        text = text.replace(search, replace)
+    return text.encode("latin-1", "replace").decode("latin-1")
+
+
+def rasterize(draw_func, *args):
+    """draw_func(*args) ile figürü çizer ve PNG baytlarını döndürür."""
+    buffer = BytesIO()
+    # Çizim fonksiyonları tight_layout uyguladığı için bbox_inches="tight" (ikinci bir çizim turu) gerekmez
+    draw_func(*args).savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+@timed("chart_render")
+def rasterize_all(charts, chart_cache, max_workers=RASTER_MAX_WORKERS):
+    """
+    charts: [(başlık, (önbellek anahtarı, draw_func, args))]. draw_func pyplot'a
+    kaydedilmeyen bir Figure döndürmelidir (iş parçacıkları ortak durum paylaşmaz).
+    Önbellekte olmayanlar paralel çizilir ve chart_cache'e yazılır.
+    Dönüş: [(başlık, PNG)] aynı sırayla.
+    """
+    pngs = {}
+    missing = []
+    for _, (cache_key, draw_func, args) in charts:
+        png = chart_cache.get(cache_key)
+        if png is not None:
+            pngs[cache_key] = png
+        elif cache_key not in pngs:
+            pngs[cache_key] = None
+            missing.append((cache_key, draw_func, args))
+
+    if len(missing) > 1 and max_workers > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as pool:
+            futures = [(cache_key, pool.submit(rasterize, draw_func, *args)) for cache_key, draw_func, args in missing]
+            for cache_key, future in futures:
+                pngs[cache_key] = future.result()
+
+    # Tek grafik veya tek çekirdek: aynı iş parçacığında çizilir
+    for cache_key, draw_func, args in missing:
+        if pngs[cache_key] is None:
+            pngs[cache_key] = rasterize(draw_func, *args)
+        chart_cache.put(cache_key, pngs[cache_key])
+
+    return [(title, pngs[cache_key]) for title, (cache_key, _, _) in charts]
+
+
+def _setup_fonts(pdf):
+    """Unicode yazı tipini kaydeder. Dönüş: (aile adı, metin dönüştürücü)."""
+    if UNICODE_FONTS:
+        for style, path in UNICODE_FONTS.items():
+            pdf.add_font(FONT_FAMILY, style, path)
+        return FONT_FAMILY, str
+    return "Helvetica", clean_text_for_pdf
+
+
+@timed("pdf_build")
+def build_pdf(summary_data, figures, title="Sell ve Buy Raporu"):
+    """figures: (başlık, PNG baytları) çiftleri. Dönüş: PDF baytları."""
+    pdf = FPDF()
+    family, text = _setup_fonts(pdf)
+    pdf.add_page()
+
+    # Başlık
+    pdf.set_font(family, "B", 16)
+    pdf.cell(190, 10, text(title), new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+    pdf.ln(10)
+
+    # Özet Tablo
+    pdf.set_font(family, "", 12)
+    pdf.cell(190, 10, text("GENEL ÖZET:"), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_font(family, "", 10)
+    for key, value in summary_data.items():
+        pdf.cell(100, 8, text(f"{key}: {value}"), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.ln(5)
+
+    # Grafikleri Sırayla Ekle
+    for figure_title, png in figures:
+        if png:
+            pdf.add_page()
+            pdf.set_font(family, "B", 14)
+            pdf.cell(190, 10, text(figure_title), new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+            pdf.image(BytesIO(png), x=10, y=30, w=190)
+
+    return bytes(pdf.output())
+
+
+def create_pdf_report(summary_data, charts, chart_cache):
+    """
+    charts: rasterize_all() biçiminde grafik tanımları. Eksik grafikler paralel çizilir;
+    aynı özet ve aynı grafikler için PDF yeniden üretilmez.
+    """
+    figures = rasterize_all(charts, chart_cache)
+    key = (config_hash(summary_data), tuple((title, content_hash(png) if png else None) for title, png in figures))
+    return _PDF_CACHE.get_or_create(key, lambda: build_pdf(summary_data, figures))
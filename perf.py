@@ -0,0 +1,293 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# =========================================================
+# Aşama Bazlı Süre / Bellek Ölçümü
+# =========================================================
+# Bir "çalıştırma" (run) bir sayfanın tek bir Streamlit yeniden çalıştırmasıdır
+# (index.call_module içinde açılır). Kod içindeki stage("...") blokları ve
+# @timed fonksiyonları o çalıştırmanın aşamaları olarak kaydedilir; açık bir
+# çalıştırma yoksa hiçbir şey yapmazlar. RSS, süreç genelinde tek bir arka plan
+# iş parçacığıyla ve yalnızca açık çalıştırma varken örneklenir; tracemalloc
+# pahalı olduğu için yalnızca PERF_TRACEMALLOC=1 ile açılır. Her çalıştırma
+# perf_log.jsonl dosyasına tek satırlık bir JSON kaydı olarak eklenir.
+
+PERF_LOG = Path("perf_log.jsonl")
+PERF_LOG_MAX_BYTES = 5 * 1024 * 1024
+# Aşaması olmayan ve bundan kısa süren çalıştırmalar (önbellekten dönen yeniden
+# çalıştırmalar) kaydedilmez
+PERF_MIN_RUN_SECONDS = 0.5
+RSS_SAMPLE_INTERVAL = 0.01
+TRACE_MEMORY = os.environ.get("PERF_TRACEMALLOC") == "1"
+
+_CURRENT_RUN = contextvars.ContextVar("perf_run", default=None)
+_LOG_LOCK = threading.Lock()
+_MB = 1024 ** 2
+
+
+def current_rss():
+    """Sürecin yerleşik bellek (RSS) kullanımı, bayt. /proc yoksa None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+@contextmanager
+def sample_peak_rss(interval=RSS_SAMPLE_INTERVAL, on_sample=None):
+    """
+    Blok süresince RSS'i arka planda örnekler; sonuç["peak"] en yüksek değerdir (bayt).
+    on_sample(rss) verilirse her örnekte çağrılır.
+    """
+    result = {"peak": current_rss()}
+    stop = threading.Event()
+
+    def _sample():
+        while not stop.wait(interval):
+            rss = current_rss()
+            if rss is None:
+                continue
+            result["peak"] = max(result["peak"], rss)
+            if on_sample:
+                on_sample(rss)
+
+    sampler = None
+    if result["peak"] is not None:
+        sampler = threading.Thread(target=_sample, daemon=True)
+        sampler.start()
+    try:
+        yield result
+    finally:
+        stop.set()
+        if sampler:
+            sampler.join()
+            result["peak"] = max(result["peak"], current_rss() or 0)
+
+
+class _RssSampler:
+    """
+    Süreç genelinde tek RSS örnekleyici. RSS sürecin tamamına ait olduğundan her sayfa
+    çalıştırması için ayrı iş parçacığı açılmaz; tek örnek tüm açık çalıştırmalara iletilir.
+    Açık çalıştırma yokken iş parçacığı bekler, örnekleme yapmaz.
+    """
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._runs = set()
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread = None
+
+    def add(self, run):
+        with self._lock:
+            self._runs.add(run)
+            self._active.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="perf-rss", daemon=True)
+                self._thread.start()
+
+    def remove(self, run):
+        with self._lock:
+            self._runs.discard(run)
+            if not self._runs:
+                self._active.clear()
+
+    def _loop(self):
+        while True:
+            self._active.wait()
+            time.sleep(self.interval)
+            rss = current_rss()
+            if rss is None:
+                continue
+            with self._lock:
+                runs = list(self._runs)
+            for run in runs:
+                run.observe_rss(rss)
+
+
+_RSS_SAMPLER = _RssSampler()
+
+
+class _Run:
+    def __init__(self, name, meta):
+        self.name = name
+        self.meta = meta
+        self.stages = []
+        self.active = []
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.peak_rss = current_rss()
+
+    def observe_rss(self, rss):
+        with self.lock:
+            self.peak_rss = max(self.peak_rss, rss)
+            for stage_record in self.active:
+                stage_record["_peak_rss"] = max(stage_record["_peak_rss"], rss)
+
+
+@contextmanager
+def perf_run(name, log_path=None, **meta):
+    """
+    Bir çalıştırmanın süresini, aşamalarını ve tepe belleğini ölçüp günlüğe yazar.
+    meta: kullanıcı adı gibi kayda eklenecek alanlar.
+    """
+    run = _Run(name, meta)
+    token = _CURRENT_RUN.set(run)
+    started = datetime.now()
+    rss_start = run.peak_rss
+    if TRACE_MEMORY:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        traced_start = tracemalloc.get_traced_memory()[0]
+
+    status = "ok"
+    start = time.perf_counter()
+    # /proc olmayan sistemlerde RSS ölçülemez, örnekleyici hiç başlatılmaz
+    if rss_start is not None:
+        _RSS_SAMPLER.add(run)
+    try:
+        yield run
+    except Exception as e:
+        status = f"error: {type(e).__name__}"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        _RSS_SAMPLER.remove(run)
+        _CURRENT_RUN.reset(token)
+        if run.stages or seconds >= PERF_MIN_RUN_SECONDS:
+            record = {
+                "run_id": uuid.uuid4().hex[:12],
+                "name": name,
+                "started": started.isoformat(timespec="seconds"),
+                "seconds": round(seconds, 4),
+                "status": status,
+                "rss_start_mb": _to_mb(rss_start),
+                "peak_rss_mb": _to_mb(None if rss_start is None else max(run.peak_rss, current_rss() or 0)),
+                "peak_traced_mb": None,
+                "stages": run.stages,
+                **meta,
+            }
+            if TRACE_MEMORY:
+                record["peak_traced_mb"] = _to_mb(tracemalloc.get_traced_memory()[1] - traced_start)
+            write_record(record, log_path)
+
+
+@contextmanager
+def stage(name):
+    """Açık çalıştırmaya bir aşama ekler (süre + aşama sırasındaki tepe RSS). Çalıştırma yoksa etkisizdir."""
+    run = _CURRENT_RUN.get()
+    if run is None:
+        yield
+        return
+
+    rss_start = current_rss() or 0
+    record = {"stage": name, "depth": len(run.active), "_peak_rss": rss_start}
+    with run.lock:
+        run.active.append(record)
+    status = "ok"
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        status = f"error: {type(e).__name__}"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        with run.lock:
+            run.active.remove(record)
+        peak = max(record.pop("_peak_rss"), current_rss() or 0)
+        record.update(offset=round(start - run.start, 4), seconds=round(seconds, 4), status=status,
+                      rss_delta_mb=_to_mb(peak - rss_start))
+        run.stages.append(record)
+
+
+def timed(name=None):
+    """Fonksiyonu bir aşama olarak ölçen dekoratör: @timed("normalize")."""
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _to_mb(value):
+    return None if value is None else round(value / _MB, 2)
+
+
+# =========================================================
+# Günlük Dosyası
+# =========================================================
+
+def write_record(record, log_path=None):
+    """Kaydı JSON satırı olarak ekler. Dosya sınırı aşarsa en yeni yarısı tutulur."""
+    path = Path(log_path or PERF_LOG)
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    with _LOG_LOCK:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+        if path.stat().st_size > PERF_LOG_MAX_BYTES:
+            lines = path.read_text(encoding="utf-8").splitlines()
+            path.write_text("\n".join(lines[len(lines) // 2:]) + "\n", encoding="utf-8")
+
+
+def load_runs(limit=500, log_path=None):
+    """En yeni `limit` çalıştırma kaydı (eskiden yeniye). Bozuk satırlar atlanır."""
+    path = Path(log_path or PERF_LOG)
+    if not path.exists():
+        return []
+    with _LOG_LOCK:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    runs = []
+    for line in lines[-limit:]:
+        try:
+            runs.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return runs
+
+
+def runs_frame(runs):
+    """Çalıştırma başına bir satır."""
+    columns = ["started", "name", "user", "seconds", "status", "peak_rss_mb", "peak_traced_mb", "stage_count"]
+    rows = [dict(run, stage_count=len(run.get("stages", []))) for run in runs]
+    return pd.DataFrame(rows).reindex(columns=columns)
+
+
+def stages_frame(runs):
+    """Aşama başına bir satır (çalıştırma adı ve zamanıyla)."""
+    rows = [
+        dict(stage_record, run_id=run.get("run_id"), name=run.get("name"), started=run.get("started"))
+        for run in runs for stage_record in run.get("stages", [])
+    ]
+    return pd.DataFrame(rows, columns=["run_id", "name", "started", "stage", "depth", "offset", "seconds", "status",
+                                       "rss_delta_mb"]).astype({"seconds": float, "rss_delta_mb": float})
+
+
+def stage_percentiles(stages):
+    """(sayfa, aşama) bazında adet, p50/p90/p95/p99 gecikme, en uzun süre ve en yüksek RSS artışı."""
+    if stages.empty:
+        return pd.DataFrame()
+    grouped = stages.groupby(["name", "stage"])
+    summary = grouped["seconds"].quantile([0.5, 0.9, 0.95, 0.99]).unstack()
+    summary.columns = ["p50_s", "p90_s", "p95_s", "p99_s"]
+    summary.insert(0, "count", grouped.size())
+    summary["max_s"] = grouped["seconds"].max()
+    summary["max_rss_delta_mb"] = grouped["rss_delta_mb"].max()
+    return summary.sort_values("p95_s", ascending=False).reset_index()
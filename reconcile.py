@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+from identity import fold_name, mask_blank_ids
+
+# =========================================================
+# TR ↔ MC Sipariş Mutabakatı
+# =========================================================
+# Normalize edilmiş TR (sol) ve MC (sağ) satırları önce (process_type, order_id)
+# üzerinden hash join ile eşlenir. Numarası tutmayan veya hiç olmayan satırlar
+# için yedek anahtar: aynı işlem tipi + aynı müşteri (katlanmış isim) + aynı gün
+# ve tutar toleransı (merge_asof ile en yakın tutar). Sonuç dört kümedir:
+# matched, amount_mismatch, missing_right (TR'de var, MC'de yok),
+# missing_left (MC'de var, TR'de yok).
+
+LEFT_SOURCE = "TR"
+RIGHT_SOURCE = "MC"
+JOIN_KEYS = ["process_type", "order_id"]
+DEFAULT_AMOUNT_TOLERANCE = 0.01
+
+RESULT_SETS = ["matched", "amount_mismatch", "missing_right", "missing_left"]
+
+
+def normalize_order_ids(series):
+    """Sipariş numaralarını karşılaştırılabilir metne çevirir ("123.0" -> "123"); boş / "0" gibi yer tutucular NA olur."""
+    return mask_blank_ids(series.astype("string").str.strip().str.replace(r"\.0$", "", regex=True))
+
+
+def _customer_keys(names):
+    """Katlanmış müşteri adı; her farklı isim bir kez katlanır."""
+    codes, uniques = pd.factorize(names)
+    folded = np.array([fold_name(name) for name in uniques] + [""], dtype=object)
+    keys = folded[codes]
+    return np.where(keys == "", None, keys)
+
+
+def _collapse(df, amount_col):
+    """Aynı siparişin birden fazla satırı (ör. sepet kalemleri) tek satıra indirilir; çoklu eşleşme patlaması önlenir."""
+    return df.groupby(JOIN_KEYS, sort=False).agg(
+        total=(amount_col, "sum"),
+        rows=(amount_col, "size"),
+        customer_name=("customer_name", "first"),
+        order_date=("order_date", "min"),
+    ).reset_index()
+
+
+def _prepare(df, amount_col):
+    df = df.assign(order_id=normalize_order_ids(df["order_id"]))
+    df[amount_col] = pd.to_numeric(df[amount_col], errors="coerce").fillna(0.0)
+    keyed = _collapse(df[df["order_id"].notna()], amount_col)
+    unkeyed = df[df["order_id"].isna()].assign(rows=1).rename(columns={amount_col: "total"})
+    return keyed, unkeyed[keyed.columns]
+
+
+def _fallback_match(left, right, amount_tolerance):
+    """Müşteri + gün bazında, tutarı tolerans içindeki en yakın karşı satırla eşler (her satır en fazla bir kez)."""
+    def keyed(frame):
+        frame = frame.assign(customer_key=_customer_keys(frame["customer_name"]),
+                             day=pd.to_datetime(frame["order_date"]).dt.normalize())
+        frame = frame[frame["customer_key"].notna() & frame["day"].notna()]
+        return frame.sort_values("total", kind="stable")
+
+    left_keyed, right_keyed = keyed(left.reset_index(names="_left")), keyed(right.reset_index(names="_right"))
+    if left_keyed.empty or right_keyed.empty:
+        return pd.DataFrame(columns=["_left", "_right"])
+
+    pairs = pd.merge_asof(
+        left_keyed[["_left", "total", "process_type", "customer_key", "day"]],
+        right_keyed[["_right", "total", "process_type", "customer_key", "day"]].rename(columns={"total": "total_right"}),
+        left_on="total", right_on="total_right",
+        by=["process_type", "customer_key", "day"],
+        direction="nearest", tolerance=amount_tolerance,
+    ).dropna(subset=["_right"])
+
+    # Bir sağ satırı birden fazla sol satır seçtiyse en yakın tutarlı olan kalır
+    pairs["gap"] = (pairs["total"] - pairs["total_right"]).abs()
+    pairs = pairs.sort_values("gap", kind="stable").drop_duplicates("_right")
+    return pairs[["_left", "_right"]].astype({"_left": int, "_right": int})
+
+
+def _side(df, suffix):
+    columns = ["order_id", "customer_name", "order_date", "total", "rows"]
+    return df[["process_type"] + columns].rename(columns={col: f"{col}_{suffix}" for col in columns})
+
+
+def reconcile(df, amount_col="total_price", amount_tolerance=DEFAULT_AMOUNT_TOLERANCE, use_fallback=True):
+    """
+    Birleşik veriyi (source sütunu TR / MC) kaynaklar arasında mutabakata sokar.
+    Dönüş: {"matched", "amount_mismatch", "missing_right", "missing_left"} DataFrame'leri.
+    Eşleşen satırlarda match_type ("order_id" / "fallback") ve diff (TR - MC) bulunur.
+    """
+    columns = JOIN_KEYS + ["customer_name", "order_date", amount_col]
+    left_keyed, left_unkeyed = _prepare(df.loc[df["source"] == LEFT_SOURCE, columns], amount_col)
+    right_keyed, right_unkeyed = _prepare(df.loc[df["source"] == RIGHT_SOURCE, columns], amount_col)
+
+    # 1) Hash join: (process_type, order_id)
+    joined = left_keyed.merge(right_keyed, on=JOIN_KEYS, how="outer", suffixes=("_tr", "_mc"), indicator=True)
+    both = joined[joined["_merge"] == "both"].drop(columns="_merge")
+    both = both.assign(order_id_tr=both["order_id"], order_id_mc=both["order_id"], match_type="order_id")
+    both = both.drop(columns="order_id")
+
+    left_only = pd.concat([
+        left_keyed.merge(joined.loc[joined["_merge"] == "left_only", JOIN_KEYS], on=JOIN_KEYS),
+        left_unkeyed,
+    ], ignore_index=True)
+    right_only = pd.concat([
+        right_keyed.merge(joined.loc[joined["_merge"] == "right_only", JOIN_KEYS], on=JOIN_KEYS),
+        right_unkeyed,
+    ], ignore_index=True)
+
+    # 2) Yedek anahtar: müşteri + gün + tutar toleransı
+    fallback = pd.DataFrame(columns=JOIN_KEYS)
+    if use_fallback:
+        pairs = _fallback_match(left_only, right_only, amount_tolerance)
+        if len(pairs):
+            left_part = _side(left_only.loc[pairs["_left"].to_numpy()].reset_index(drop=True), "tr")
+            right_part = _side(right_only.loc[pairs["_right"].to_numpy()].reset_index(drop=True), "mc")
+            fallback = pd.concat([left_part, right_part.drop(columns="process_type")], axis=1)
+            fallback["match_type"] = "fallback"
+            left_only = left_only.drop(index=pairs["_left"].to_numpy())
+            right_only = right_only.drop(index=pairs["_right"].to_numpy())
+
+    pairs_frame = pd.concat([both, fallback], ignore_index=True) if len(fallback) else both.reset_index(drop=True)
+    pairs_frame["diff"] = pairs_frame["total_tr"] - pairs_frame["total_mc"]
+    ordered = ["process_type", "match_type", "order_id_tr", "order_id_mc", "customer_name_tr", "customer_name_mc",
+               "order_date_tr", "order_date_mc", "total_tr", "total_mc", "diff", "rows_tr", "rows_mc"]
+    pairs_frame = pairs_frame[ordered]
+
+    within = pairs_frame["diff"].abs() <= amount_tolerance
+    return {
+        "matched": pairs_frame[within].reset_index(drop=True),
+        "amount_mismatch": pairs_frame[~within].sort_values("diff", key=np.abs, ascending=False).reset_index(drop=True),
+        "missing_right": left_only.reset_index(drop=True),
+        "missing_left": right_only.reset_index(drop=True),
+    }
@@ -0,0 +1,226 @@
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+# =========================================================
+# Yerel Staging Taklidi (Yük Testi İçin)
+# =========================================================
+# bot.CHECKOUT_STEPS'in kullandığı sayfaları ve seçicileri (username/password,
+# OTP kutuları, .cartbutton-add-basket, momento butonu, sözleşmeler, "Alışverişi
+# Tamamla") aynı adreslerle sunan küçük bir HTTP sunucusu. Sayfalardaki butonlar
+# form uçlarına (POST /giris-yap, /api/otp, /api/basket, /api/order) istek atar;
+# bu uçlar http_checkout'un da kullandığı uçlardır. Oturum çerezle tutulur: OTP
+# doğrulanmadan sepete ekleme, sepet boşken veya Momento kodu olmadan sipariş
+# reddedilir. Her isteğe gecikme ve sipariş isteğine hata oranı eklenebilir.
+
+PAGE_TEMPLATE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{title}</title></head>
+<body><h1>{title}</h1>{body}</body></html>"""
+
+LOGIN_BODY = """
+<form id="login" onsubmit="return false;">
+  <input id="username"><input id="password" type="password">
+  <button onclick="login()"><span>Devam Et</span></button>
+</form>
+<div id="otp" style="display:none">
+  <input id="code" maxlength="1"><input id="code2" maxlength="1">
+  <input id="code3" maxlength="1"><input id="code4" maxlength="1">
+  <button class="otp-submit-button button-disabled" disabled onclick="verify()">Doğrula</button>
+</div>
+<script>
+const value = id => document.getElementById(id).value;
+function login() {
+  fetch('/giris-yap', {method: 'POST', body: new URLSearchParams({username: value('username'),
+                                                                  password: value('password')})})
+    .then(() => document.getElementById('otp').style.display = 'block');
+}
+function verify() {
+  const code = ['code', 'code2', 'code3', 'code4'].map(value).join('');
+  fetch('/api/otp', {method: 'POST', body: new URLSearchParams({code})}).then(() => location.href = '/');
+}
+</script>
+"""
+
+PRODUCT_BODY = """
+<button class="cartbutton-add-basket"
+        onclick="fetch('/api/basket', {method: 'POST', body: new URLSearchParams({product: 'minted-50-gr-gumus',
+                                                                                 quantity: '1'})})">Sepete Ekle</button>
+"""
+
+PAYMENT_BODY = """
+<button onclick="document.getElementById('momento').style.display='block'">
+  <img src="/static/momento-logo.png" alt="Momento">
+</button>
+<div id="momento" style="display:none"><input id="momentoNumber"></div>
+<input type="checkbox" id="_contract"><input type="checkbox" id="_contract2">
+<button onclick="order()"><span>Alışverişi Tamamla</span></button>
+<script>
+function order() {
+  const body = new URLSearchParams({payment_method: 'momento',
+                                    momentoNumber: document.getElementById('momentoNumber').value,
+                                    contract: document.getElementById('_contract').checked ? '1' : '',
+                                    contract2: document.getElementById('_contract2').checked ? '1' : ''});
+  fetch('/api/order', {method: 'POST', body}).then(r => document.title = r.ok ? 'OK' : 'HATA');
+}
+</script>
+"""
+
+PAGES = {
+    "/": ("Ana Sayfa", ""),
+    "/giris-yap": ("Giriş Yap", LOGIN_BODY),
+    "/gumus": ("Gümüş", '<a href="/minted-50-gr-gumus">Minted 50 gr Gümüş</a>'),
+    "/minted-50-gr-gumus": ("Minted 50 gr Gümüş", PRODUCT_BODY),
+    "/adres": ("Adres", "<p>Teslimat adresi</p>"),
+    "/sepet": ("Sepet", "<p>Sepetiniz</p>"),
+    "/odeme": ("Ödeme", PAYMENT_BODY),
+}
+
+
+class StagingStub(ThreadingHTTPServer):
+    daemon_threads = True
+    # Eşzamanlı sanal kullanıcılarda varsayılan 5'lik bağlantı kuyruğu taşar (SYN tekrarları 1-3 sn ekler)
+    request_queue_size = 256
+
+    def __init__(self, address, latency=0.0, jitter=0.0, error_rate=0.0):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "logins": 0, "baskets": 0, "orders": 0, "failed_orders": 0, "rejected": 0}
+        # oturum kimliği -> {"phone", "verified", "basket"}
+        self.sessions = {}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive: istemcinin bağlantı havuzu gerçekten yeniden kullanılsın
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _delay(self):
+        server = self.server
+        server.count("requests")
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.uniform(0, server.jitter))
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8", headers=()):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._delay()
+        path = self.path.split("?", 1)[0]
+        if path in PAGES:
+            title, body = PAGES[path]
+            self._send(200, PAGE_TEMPLATE.format(title=title, body=body))
+        elif path.startswith("/static/"):
+            self._send(200, b"", "image/png")
+        else:
+            self._send(404, PAGE_TEMPLATE.format(title="Bulunamadı", body=""))
+
+    def _session(self):
+        cookie = SimpleCookie(self.headers.get("Cookie") or "")
+        session_id = cookie["session"].value if "session" in cookie else None
+        with self.server.lock:
+            return session_id, self.server.sessions.get(session_id)
+
+    def _json(self, status, payload, headers=()):
+        self._send(status, json.dumps(payload, ensure_ascii=False), "application/json", headers)
+
+    def _reject(self, status, reason):
+        self.server.count("rejected")
+        self._json(status, {"ok": False, "error": reason})
+
+    def do_POST(self):
+        self._delay()
+        length = int(self.headers.get("Content-Length") or 0)
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()} if length else {}
+        path = self.path.split("?", 1)[0]
+        _, session = self._session()
+
+        if path == "/giris-yap":
+            if not form.get("username") or not form.get("password"):
+                return self._reject(400, "telefon ve şifre gerekli")
+            session_id = uuid.uuid4().hex
+            with self.server.lock:
+                self.server.sessions[session_id] = {"phone": form["username"], "verified": False, "basket": 0}
+            self.server.count("logins")
+            return self._json(200, {"ok": True, "otp_required": True},
+                              [("Set-Cookie", f"session={session_id}; Path=/; HttpOnly")])
+
+        if session is None:
+            return self._reject(401, "oturum yok")
+
+        if path == "/api/otp":
+            if len(form.get("code", "")) != 4:
+                return self._reject(400, "OTP kodu 4 haneli olmalı")
+            session["verified"] = True
+        elif not session["verified"]:
+            return self._reject(401, "OTP doğrulanmadı")
+        elif path == "/api/basket":
+            session["basket"] += int(form.get("quantity") or 1)
+            self.server.count("baskets")
+        elif path == "/api/order":
+            if not session["basket"]:
+                return self._reject(409, "sepet boş")
+            if not form.get("momentoNumber") or not (form.get("contract") and form.get("contract2")):
+                return self._reject(400, "Momento kodu ve sözleşme onayı gerekli")
+            if random.random() < self.server.error_rate:
+                self.server.count("failed_orders")
+                return self._json(500, {"ok": False, "error": "ödeme sağlayıcı hatası"})
+            session["basket"] = 0
+            self.server.count("orders")
+        else:
+            return self._reject(404, "bilinmeyen uç")
+        self._json(200, {"ok": True})
+
+
+def start_stub_server(host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0):
+    """Sunucuyu arka plan iş parçacığında başlatır. Kapatmak için server.shutdown()."""
+    server = StagingStub((host, port), latency=latency, jitter=jitter, error_rate=error_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Minted staging sayfalarını taklit eden yerel sunucu")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="İstek başına sabit gecikme (sn)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="İstek başına rastgele ek gecikme üst sınırı (sn)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Başarısız dönecek sipariş oranı")
+    args = parser.parse_args()
+
+    server = StagingStub((args.host, args.port), args.latency, args.jitter, args.error_rate)
+    print(f"Staging taklidi: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(server.counts)
+
+
+if __name__ == "__main__":
+    main()
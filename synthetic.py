@@ -0,0 +1,176 @@
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+# =========================================================
+# Sentetik Veri Üreticileri (Benchmark İçin)
+# =========================================================
+# Gerçek ihracatlara benzeyen TR / MC Buy-Sell tabloları ve fraud CSV'leri üretir:
+# karışık başlıklar, Türkçe sayı biçimleri ("1.234,56 TL"), Mpay* ödeme metinleri,
+# Türkçe karakterli ve farklı yazımlı müşteri isimleri. Üretim vektöreldir; metin
+# değerleri sınırlı havuzlardan seçildiği için milyonlarca satır birkaç saniyede çıkar.
+
+RAW_PAYMENT_VALUES = [
+    "MpayCreditCard", "MpayMomento", "MpayMoneyPay", "Mpaymultigift", "MpayMultinet", "MpayTokenFlex",
+    "MpayVodafone", "MpayPaywall", "credit-card", "Credit Card", "Havale", "EFT", "wallet", "Cüzdan",
+    "Partialpayment", "cash", "other", "Bonus Kart", "World", "unknown provider", "", " ", None, np.nan,
+]
+
+FIRST_NAMES = ["Ahmet", "Mehmet", "Ayşe", "Fatma", "Emine", "Hüseyin", "İbrahim", "Şükrü", "Gül", "Çağla",
+               "Özge", "Ümit", "Ömer", "Ece", "Burak", "Zeynep", "Elif", "Mustafa", "Ali", "Yağmur"]
+LAST_NAMES = ["Yılmaz", "Kaya", "Demir", "Şahin", "Çelik", "Yıldız", "Öztürk", "Aydın", "Özdemir", "Arslan",
+              "Doğan", "Kılıç", "Aslan", "Çetin", "Kara", "Koç", "Kurt", "Özkan", "Şimşek", "Polat"]
+PRODUCTS = ["Gram Altın", "Çeyrek Altın", "Yarım Altın", "Tam Altın", "Cumhuriyet Altını", "22 Ayar Bilezik",
+            "Gümüş Külçe", "Ata Lira", "Reşat Altın", "14 Ayar Kolye"]
+PARTNERS = ["Kuyumcu A", "Kuyumcu B", "Darphane", "Rafineri C", "Partner D"]
+STATUSES = ["completed", "Tamamlandı", "cancelled", "pending"]
+
+def format_tr(values, suffix=""):
+    """Sayıları Türkçe biçimde ("12.345,67") metne çevirir. Satırlara değil havuza uygulanır."""
+    text = pd.Series(values).map("{:,.2f}".format)
+    text = text.str.replace(",", "_", regex=False).str.replace(".", ",", regex=False).str.replace("_", ".", regex=False)
+    return (text + suffix).to_numpy(dtype=object)
+
+
+def _pool_pick(rng, pool, rows):
+    pool = np.asarray(pool, dtype=object)
+    return pool[rng.integers(0, len(pool), size=rows)]
+
+
+def customer_pool(customers, seed=3, variant_share=0.05):
+    """
+    (isim, müşteri no) havuzu. variant_share kadar müşterinin ikinci bir yazımı
+    (küçük harf / Türkçe karaktersiz) aynı müşteri numarasıyla havuza eklenir.
+    """
+    rng = np.random.default_rng(seed)
+    first = _pool_pick(rng, FIRST_NAMES, customers)
+    last = _pool_pick(rng, LAST_NAMES, customers)
+    suffix = rng.integers(1, 10_000, size=customers).astype(str)
+    names = pd.Series(first + " " + last + " " + suffix)
+    ids = np.arange(100_000, 100_000 + customers)
+
+    variants = rng.random(customers) < variant_share
+    folded = names[variants].str.lower().str.translate(str.maketrans("ıİşŞğĞüÜöÖçÇ", "iIsSgGuUoOcC"))
+    return (np.concatenate([names.to_numpy(dtype=object), folded.to_numpy(dtype=object)]),
+            np.concatenate([ids, ids[variants]]))
+
+
+def _dates(rng, rows, days=180, start="2025-01-01"):
+    seconds = rng.integers(0, days * 86_400, size=rows)
+    return pd.Timestamp(start) + pd.to_timedelta(seconds, unit="s")
+
+
+def _amount_pool(rng, distinct=20_000):
+    # Tutarlar çarpık dağılır: çoğu küçük işlem, az sayıda büyük işlem
+    return np.round(rng.lognormal(mean=7.0, sigma=1.2, size=distinct), 2)
+
+
+def make_orders(rows, source, process_type, seed=0, customers=None, order_ids=None):
+    """
+    Tek bir TR veya MC Buy/Sell ihracatını ham (normalize edilmemiş) DataFrame olarak üretir.
+    Başlıklar ADVANCED_MAPPING alias'larından bilerek farklı yazılır (büyük/küçük harf,
+    boşluk, tire); TR'deki 'Notlar' hiçbir alias'a uymaz.
+    order_ids verilirse sipariş numaraları oradan seçilir (TR ↔ MC ortak siparişler için).
+    """
+    rng = np.random.default_rng(seed)
+    names, ids = customer_pool(customers or max(rows // 20, 50))
+    pick = rng.integers(0, len(names), size=rows)
+    amounts = rng.integers(1, 20, size=rows)
+    pool = _amount_pool(rng)
+    amount_idx = rng.integers(0, len(pool), size=rows)
+    totals = pool[amount_idx]
+    dates = _dates(rng, rows)
+    if order_ids is None:
+        order_ids = np.arange(1_000_000, 1_000_000 + rows)
+
+    if source == "TR":
+        data = {
+            "ID": pd.Series(order_ids[:rows]).map("{:,}".format).str.replace(",", ".", regex=False),
+            "customer_id": ids[pick],
+            "Customer": names[pick],
+            "Product": _pool_pick(rng, PRODUCTS, rows),
+            "Amount": amounts,
+            "Total": np.where(rng.random(rows) < 0.5, format_tr(pool)[amount_idx], format_tr(pool, " TL")[amount_idx]),
+            "Currency": "TRY",
+            "Payment Type": _pool_pick(rng, RAW_PAYMENT_VALUES, rows),
+            "Order Date": dates.astype(str),
+            "Status": _pool_pick(rng, STATUSES, rows),
+            "Komisyon": format_tr(np.round(pool * 0.02, 2))[amount_idx],
+            "Notlar": "",
+        }
+    else:
+        data = {
+            "order_id": order_ids[:rows].astype(float),
+            "user_id": ids[pick],
+            "name-surname": names[pick],
+            "product_name": _pool_pick(rng, PRODUCTS, rows),
+            "qty": amounts,
+            "grand_total": totals,
+            "para birimi": "TRY",
+            "payment_method": _pool_pick(rng, RAW_PAYMENT_VALUES, rows),
+            "created_at": dates,
+            "durum": _pool_pick(rng, STATUSES, rows),
+            "provider_name": _pool_pick(rng, PARTNERS, rows),
+            "comission": np.round(totals * 0.02, 2),
+        }
+    return pd.DataFrame(data)
+
+
+def make_db_merge_sources(rows, seed=0, shared_share=0.8):
+    """
+    DB Merge için dört ihracat: [(df, source, process_type)]. Toplam satır sayısı ~rows.
+    MC siparişlerinin shared_share kadarı TR ile aynı numarayı taşır (mutabakat için).
+    """
+    per_file = max(rows // 4, 1)
+    customers = max(rows // 40, 50)
+    sources = []
+    for i, process_type in enumerate(["Buy", "Sell"]):
+        base = 1_000_000 + i * 10_000_000
+        tr_ids = np.arange(base, base + per_file)
+        rng = np.random.default_rng(seed + i)
+        shared = rng.random(per_file) < shared_share
+        mc_ids = np.where(shared, tr_ids, tr_ids + 5_000_000)
+        sources.append((make_orders(per_file, "TR", process_type, seed + 10 + i, customers, tr_ids), "TR", process_type))
+        sources.append((make_orders(per_file, "MC", process_type, seed + 20 + i, customers, mc_ids), "MC", process_type))
+    return sources
+
+
+def make_fraud_frame(rows, seed=1, customers=None, burst_share=0.01):
+    """
+    Fraud kontrol ekranının beklediği biçimde işlemler. burst_share kadar satır,
+    az sayıda müşteriye kısa sürede yoğunlaşır (velocity ve anomali modları için).
+    """
+    rng = np.random.default_rng(seed)
+    names, ids = customer_pool(customers or max(rows // 15, 50), seed=seed + 5)
+    pick = rng.integers(0, len(names), size=rows)
+    pool = _amount_pool(rng)
+    amount_idx = rng.integers(0, len(pool), size=rows)
+    dates = _dates(rng, rows, days=90)
+
+    bursts = rng.random(rows) < burst_share
+    hot = rng.integers(0, max(len(names) // 500, 1), size=int(bursts.sum()))
+    pick[bursts] = hot
+    dates = dates.where(~bursts, pd.Timestamp("2025-02-14 10:00") + pd.to_timedelta(
+        rng.integers(0, 3_600, size=rows), unit="s"))
+
+    return pd.DataFrame({
+        "Create Date": dates.astype(str),
+        "Name-Surname": names[pick],
+        "Total": format_tr(pool)[amount_idx],
+        "Customer ID": ids[pick],
+        "Payment Type": _pool_pick(rng, RAW_PAYMENT_VALUES[:8], rows),
+    })
+
+
+class NamedBytesIO(BytesIO):
+    """Streamlit UploadedFile yerine geçen bellek içi dosya (name, size, getvalue)."""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+
+def to_csv_upload(df, name="fraud.csv"):
+    return NamedBytesIO(df.to_csv(index=False).encode("utf-8"), name)